@@ -8,38 +8,358 @@ Created on Sun Feb  18 02:37:00 2024
 Description : A file containing functions capable of analyzing a full dataset of images.
 """
 # import random needed packages that should already be installed
+import os
 import numpy as np
-from PIL import Image
+from collections import deque
+from functools import partial
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
 
 # import from other modules in the package
 from gaussbean.analysis import single
+from gaussbean.utils import io_utils, roi_utils, profile_utils
 
 #########################
 ### START OF FUNCTIONS
 #########################
 
-def full_set_proj(imglist, xmargins, ymargins, fwrange=1.3):
+def _track_frame(analyze, arrayimg, tracker, centroid, params):
+    """ Analyzes ONE image with its crop cut straight around where the tracker expects the beam, and only searches the whole initial crop for the beam (or uses
+    the centroid guess, if it is already known) if there is no guess yet or the beam isn't found near it. Returns the same as the single image function does
+    with full_output=True, and whether the crop was cut around the tracker's guess. This function shouldn't be called by the user at any point.
+    """
+    guess = tracker.guess()
+    if guess is not None:
+        # the single image functions take the centroid guess in the coordinates of the initial crop
+        origin = roi_utils.initial_roi(arrayimg, params['initcrop'])
+        try:
+            xFWHM, yFWHM, finalimg, info = analyze(imgar=arrayimg, centroid=(guess[0] - origin.x0, guess[1] - origin.y0), full_output=True, **params)
+        except IndexError:
+            info = None
+        if info is not None and np.isfinite([xFWHM, yFWHM]).all() and tracker.found(guess, (info['absx'], info['absy']), params['xmargins'],
+                                                                                        params['ymargins']):
+            tracker.update(info['absx'], info['absy'], tracked=True)
+            return(xFWHM, yFWHM, finalimg, info, True)
+
+    # the beam wasn't where we expected it (or we don't know yet where to expect it), so search for it the usual way
+    xFWHM, yFWHM, finalimg, info = analyze(imgar=arrayimg, centroid=centroid, full_output=True, **params)
+    tracker.update(info['absx'], info['absy'], tracked=False)
+    return(xFWHM, yFWHM, finalimg, info, False)
+
+########################################################
+
+@profile_utils.timed('dataset.frame')
+def _analyze_frame(analyze, stage, source, cache, tracker=None, **params):
+    """ Loads and analyzes ONE image (anything io_utils.load_frame() can read) with one of the single image functions. If a cache_utils.ResultCache is given,
+    the results are served from the cache when this frame has already been analyzed with the same parameters, and the centroid guess (which doesn't depend on
+    the parameters) is reused whenever only the parameters changed. If a roi_utils.BeamTracker is given, the crop is cut around where the beam was in the
+    frames before. This function shouldn't be called by the user at any point.
+    """
+    # without a cache, just load the image and analyze it
+    if cache is None:
+        if tracker is None:
+            return(analyze(imgar=io_utils.load_frame(source), **params))
+        return(_track_frame(analyze, io_utils.load_frame(source), tracker, None, params)[:3])
+
+    # check if this exact analysis has been done before (and has the cropped image stored if the cache is supposed to keep them). A tracked result depends on
+    # where the tracker expected the beam and on how far the tracker lets it be from there, so both are part of the key
+    identity = cache.identity(source)
+    key = cache.key(identity, stage, **(params if tracker is None else dict(params, guess=tracker.guess(), maxshift=tracker.maxshift)))
+    entry = cache.get(key)
+    if entry is not None and (not cache.keepcrops or 'crop' in entry):
+        if tracker is not None:
+            tracker.update(*entry['absolute'].tolist(), tracked=bool(entry['tracked']))
+        return(entry['xFWHM'][()], entry['yFWHM'][()], entry.get('crop'))
+
+    # otherwise, reuse the centroid guess from any earlier analysis of this frame (if there was one) and analyze the image
+    centkey = cache.key(identity, 'centroid', initcrop=params['initcrop'])
+    cententry = cache.get(centkey)
+    centroid = None if cententry is None else tuple(int(c) for c in cententry['centroid'])
+    if tracker is None:
+        xFWHM, yFWHM, finalimg, info = analyze(imgar=io_utils.load_frame(source), centroid=centroid, full_output=True, **params)
+        seeded = False
+    else:
+        xFWHM, yFWHM, finalimg, info, seeded = _track_frame(analyze, io_utils.load_frame(source), tracker, centroid, params)
+
+    # store everything we found for the next time (the centroid guess only if it came from a search of the whole initial crop)
+    if cententry is None and not seeded:
+        cache.put(centkey, centroid=np.array([info['centx'], info['centy']]))
+    arrays = {'xFWHM': xFWHM, 'yFWHM': yFWHM, 'centroid2': np.array([info['centx2'], info['centy2']]), 'absolute': np.array([info['absx'], info['absy']]),
+              'tracked': np.array(seeded)}
+    if cache.keepcrops:
+        arrays['crop'] = finalimg
+    cache.put(key, **arrays)
+
+    # return the same things the single image function does (without the cropped image if the cache doesn't keep them, so a first run gives the same results as
+    # a rerun served from the cache)
+    return(xFWHM, yFWHM, finalimg if cache.keepcrops else None)
+
+########################################################
+
+def _proj_frame(source, xmargins, ymargins, fwrange, cache=None, initcrop=single.INITIAL_CROP, tracker=None):
+    """ Loads and analyzes ONE image (anything io_utils.load_frame() can read) using projections. This is a module-level function so that it can be sent to
+    worker processes; it shouldn't be called by the user at any point.
+    """
+    return(_analyze_frame(single.single_image_proj, 'proj', source, cache, tracker, xmargins=xmargins, ymargins=ymargins, fwrange=fwrange, initcrop=initcrop))
+
+########################################################
+
+def _line_frame(source, xmargins, ymargins, xpixel, ypixel, fwrange, cache=None, initcrop=single.INITIAL_CROP, tracker=None):
+    """ Loads and analyzes ONE image (anything io_utils.load_frame() can read) using lineouts. This is a module-level function so that it can be sent to
+    worker processes; it shouldn't be called by the user at any point.
+    """
+    return(_analyze_frame(single.single_image_line, 'line', source, cache, tracker, xmargins=xmargins, ymargins=ymargins, xpixel=xpixel, ypixel=ypixel,
+                          fwrange=fwrange, initcrop=initcrop))
+
+########################################################
+
+def _tracker(track, workers):
+    """ Returns the roi_utils.BeamTracker asked for by the track parameter of the dataset functions (None for no tracking). Tracking needs every frame to be
+    analyzed after the one before it, so it can only be used with one worker. This function shouldn't be called by the user at any point.
+    """
+    if track and workers != 1:
+        raise ValueError('tracking the beam needs the frames to be analyzed in order, so it can only be used with workers=1, not workers=' + repr(workers))
+    if track is True:
+        return(roi_utils.BeamTracker())
+    return(track or None)
+
+########################################################
+
+def _run_chunk(func, chunk, cropevery):
+    """ Runs a per-frame function over a chunk of (index, frame) pairs and drops the cropped images the user doesn't want to keep BEFORE they are sent
+    back from a worker process. This function shouldn't be called by the user at any point.
+    """
+    results = []
+    for index, source in chunk:
+        xFWHM, yFWHM, croppedimg = func(source)
+
+        # only keep every Nth cropped image (cropevery=0 means we don't keep any of them)
+        if cropevery == 0 or index % cropevery != 0:
+            croppedimg = None
+        # the cropped image is a slice of the whole frame, so copy it out; otherwise every frame we keep a crop of stays in memory as well
+        elif croppedimg is not None:
+            croppedimg = croppedimg.copy()
+        results.append((index, xFWHM, yFWHM, croppedimg))
+    return(results)
+
+########################################################
+
+def _func_cache(func):
+    """ Returns the cache_utils.ResultCache a per-frame function was given (through functools.partial), or None. This function shouldn't be called by the user
+    at any point.
+    """
+    return(func.keywords.get('cache') if isinstance(func, partial) else None)
+
+########################################################
+
+def _worker_chunk(func, chunk, cropevery, trace):
+    """ Runs _run_chunk() in a worker process and sends back, along with the results, what the main process can't see otherwise: the numbers recorded by
+    profile_utils (if trace isn't None, profiling is turned on for the chunk, with trace saying whether to keep trace events) and the hits and misses of the
+    cache the function was given. This function shouldn't be called by the user at any point.
+    """
+    cache = _func_cache(func)
+    hits, misses = (cache.hits, cache.misses) if cache is not None else (0, 0)
+    if trace is not None:
+        profile_utils.reset()
+        profile_utils.enable(trace)
+    try:
+        results = _run_chunk(func, chunk, cropevery)
+    finally:
+        profile_utils.disable()
+    snapshot = profile_utils.collect() if trace is not None else None
+    counts = (cache.hits - hits, cache.misses - misses) if cache is not None else None
+    return(results, snapshot, counts)
+
+########################################################
+
+def _chunk_results(future, cache):
+    """ Returns the results of a chunk run by a worker process, merging what the worker recorded into the profile of this process and adding its cache hits
+    and misses to the cache of this process. This function shouldn't be called by the user at any point.
+    """
+    results, snapshot, counts = future.result()
+    if snapshot is not None:
+        profile_utils.merge(snapshot)
+    if counts is not None and cache is not None:
+        cache.hits += counts[0]
+        cache.misses += counts[1]
+    return(results)
+
+########################################################
+
+def iter_frames(func, imglist, workers=1, chunksize=1, cropevery=1):
+    """ Yields (index, xFWHM, yFWHM, cropped image) for every image in the list, in the SAME ORDER as the image list, no matter how many workers are used. Only
+    a few chunks are ever in flight at once, so memory stays flat however long the run is. This is the engine behind iter_set_proj() and iter_set_line(); use
+    it directly to run your own per-frame analysis (for example one that filters every image first) over a dataset.
+
+        Parameters
+        ----------
+        func : function
+            Module-level function (or functools.partial of one, so it can be sent to worker processes) taking a single frame (anything io_utils.load_frame() can
+            read) and returning (xFWHM, yFWHM, cropped image) for that image.
+        imglist : array
+            Array of image paths, a stack of images or a PrefetchLoader (see io_utils.frame_sources()).
+        workers (OPTIONAL) : integer
+            Number of worker processes to spread decoding and analysis over. One (the default) runs everything in this process; None uses every core.
+        chunksize (OPTIONAL) : integer
+            Number of images handed to a worker process at a time. Larger chunks mean less communication between processes for long runs.
+        cropevery (OPTIONAL) : integer
+            Keep the cropped image of every Nth frame (starting with the first); the rest are returned as None. Zero drops every cropped image.
+    """
+    # split the run up into chunks of (index, frame) pairs; frames of packed stacks are sent to workers as (stack path, index) so no image data is copied. The
+    # chunks are only built as they are needed, so a PrefetchLoader never loads more than its depth ahead
+    frames = enumerate(io_utils.frame_sources(imglist))
+    chunks = iter(lambda: list(islice(frames, chunksize)), [])
+
+    # if only one worker is wanted, just loop over the images in this process like we always have
+    if workers == 1:
+        for chunk in chunks:
+            yield from _run_chunk(func, chunk, cropevery)
+        return
+
+    # if the user doesn't specify the number of workers, use every core on the machine
+    if workers is None:
+        workers = os.cpu_count()
+
+    # keep a couple of chunks per worker queued up and always hand back the OLDEST one first, so the frame order is kept no matter which chunk finishes first.
+    # If profiling is on, it is turned on in the workers as well, and what they record (and the hits and misses of their copies of the cache) is merged in
+    # as their chunks come back
+    trace = profile_utils.tracing() if profile_utils.enabled() else None
+    cache = _func_cache(func)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_worker_chunk, func, chunk, cropevery, trace))
+            if len(pending) >= 2*workers:
+                yield from _chunk_results(pending.popleft(), cache)
+        while pending:
+            yield from _chunk_results(pending.popleft(), cache)
+
+########################################################
+
+def iter_set_proj(imglist, xmargins, ymargins, fwrange=1.3, workers=1, chunksize=1, cropevery=0, cache=None, initcrop=single.INITIAL_CROP, track=False):
+    """ Yields (index, xFWHM, yFWHM, cropped image) for every image in the dataset as soon as it has been analyzed, rather than returning everything at the end.
+    This function is based on projections on each axis of the images.
+
+        Parameters
+        ----------
+        imglist : array
+            Array of images (this needs to be a set of SORTED image paths (so, 1.tiff, 2.tiff, etc.). This can also be a stack packed by io_utils.pack_stack()
+            (either its path or the stack opened with io_utils.open_stack()), in which case the frames are read straight from the stack, or an
+            io_utils.PrefetchLoader, which loads the next frames on background threads while the current one is analyzed.
+        xmargins : integer
+            How many pixels on each side of the beam (in the x-direction, relative to the centroid of the image) to be used as a buffer for cropping.
+        ymargins : integer
+            How many pixels on each side of the beam (in the y-direction, relative to the centroid of the image) to be used as a buffer for cropping.
+        fwrange (OPTIONAL) : float
+            Number which specifies the range the algorithm should look around the maximum of the data to find the "most prominent" peak when calculating the FWHM.
+        workers (OPTIONAL) : integer
+            Number of processes to spread decoding and analysis over. Default is one (no extra processes); None uses every core.
+        chunksize (OPTIONAL) : integer
+            Number of images sent to a worker process at a time (only used when workers isn't one).
+        cropevery (OPTIONAL) : integer
+            Keep the cropped image of every Nth frame; the rest are yielded as None. Default is zero, which doesn't keep any cropped images.
+        cache (OPTIONAL) : ResultCache
+            A cache_utils.ResultCache. Frames that were already analyzed with the same parameters are served from the cache, and the centroid guess of every
+            frame is reused when only the parameters change. With a cache, the cropped images are None unless the cache keeps them (keepcrops=True).
+        initcrop (OPTIONAL) : tuple, None or string
+            The (xpoint, ypoint, xmargins, ymargins) of the initial crop that cuts out the dead pixels of the camera this dataset was taken with (default
+            single.INITIAL_CROP), None for the whole images, or 'auto' to find the beam anywhere in each image (see single.single_image_proj()).
+        track (OPTIONAL) : boolean or BeamTracker
+            Set to True (or pass a roi_utils.BeamTracker to choose its settings) to follow the beam from frame to frame: each crop is cut straight around the
+            refined centroid of the frame before, and the whole initial crop is only searched when the beam isn't found there. In a run where the beam only
+            moves a few pixels from shot to shot, this saves most of the work on every frame. Tracking follows the frames in order, so it can only be used with
+            one worker (a ValueError is raised otherwise).
+    """
+    yield from iter_frames(partial(_proj_frame, xmargins=xmargins, ymargins=ymargins, fwrange=fwrange, cache=cache, initcrop=initcrop,
+                                    tracker=_tracker(track, workers)), imglist, workers=workers, chunksize=chunksize, cropevery=cropevery)
+
+########################################################
+
+def iter_set_line(imglist, xmargins, ymargins, xpixel=0, ypixel=0, fwrange=1.3, workers=1, chunksize=1, cropevery=0, cache=None,
+                  initcrop=single.INITIAL_CROP, track=False):
+    """ Yields (index, xFWHM, yFWHM, cropped image) for every image in the dataset as soon as it has been analyzed, rather than returning everything at the end.
+    This function is based on the lineouts specified by the user or through the centroid of the image.
+
+        Parameters
+        ----------
+        imglist : array
+            Array of image paths (this needs to be a set of SORTED image paths (so, 1.tiff, 2.tiff, etc.). This can also be a stack packed by io_utils.pack_stack()
+            (either its path or the stack opened with io_utils.open_stack()), in which case the frames are read straight from the stack, or an
+            io_utils.PrefetchLoader, which loads the next frames on background threads while the current one is analyzed.
+        xmargins : integer
+            How many pixels on each side of the beam (in the x-direction, relative to the centroid of the image) to be used as a buffer for cropping.
+        ymargins : integer
+            How many pixels on each side of the beam (in the y-direction, relative to the centroid of the image) to be used as a buffer for cropping.
+        xpixel (OPTIONAL) : integer
+            The column of pixels at which a y-lineout will be taken.
+        ypixel (OPTIONAL) : integer
+            The row of pixels at which an x-lineout will be taken.
+        fwrange (OPTIONAL) : float
+            Number which specifies the range the algorithm should look around the maximum of the data to find the "most prominent" peak when calculating the FWHM.
+        workers (OPTIONAL) : integer
+            Number of processes to spread decoding and analysis over. Default is one (no extra processes); None uses every core.
+        chunksize (OPTIONAL) : integer
+            Number of images sent to a worker process at a time (only used when workers isn't one).
+        cropevery (OPTIONAL) : integer
+            Keep the cropped image of every Nth frame; the rest are yielded as None. Default is zero, which doesn't keep any cropped images.
+        cache (OPTIONAL) : ResultCache
+            A cache_utils.ResultCache. Frames that were already analyzed with the same parameters are served from the cache, and the centroid guess of every
+            frame is reused when only the parameters change. With a cache, the cropped images are None unless the cache keeps them (keepcrops=True).
+        initcrop (OPTIONAL) : tuple, None or string
+            The (xpoint, ypoint, xmargins, ymargins) of the initial crop that cuts out the dead pixels of the camera this dataset was taken with (default
+            single.INITIAL_CROP), None for the whole images, or 'auto' to find the beam anywhere in each image (see single.single_image_proj()).
+        track (OPTIONAL) : boolean or BeamTracker
+            Set to True (or pass a roi_utils.BeamTracker to choose its settings) to follow the beam from frame to frame: each crop is cut straight around the
+            refined centroid of the frame before, and the whole initial crop is only searched when the beam isn't found there. In a run where the beam only
+            moves a few pixels from shot to shot, this saves most of the work on every frame. Tracking follows the frames in order, so it can only be used with
+            one worker (a ValueError is raised otherwise).
+    """
+    yield from iter_frames(partial(_line_frame, xmargins=xmargins, ymargins=ymargins, xpixel=xpixel, ypixel=ypixel, fwrange=fwrange, cache=cache,
+                                    initcrop=initcrop, tracker=_tracker(track, workers)), imglist, workers=workers, chunksize=chunksize, cropevery=cropevery)
+
+########################################################
+
+def full_set_proj(imglist, xmargins, ymargins, fwrange=1.3, workers=1, chunksize=1, cache=None, initcrop=single.INITIAL_CROP, track=False):
     """ Returns a list of FWHM values (in microns) for both x- and y-axes as well as all cropped images used for analysis. This function is based on projections on each axis of the images.
 
         Parameters
         ----------
         imglist : array
-            Array of images (this needs to be a set of SORTED image paths (so, 1.tiff, 2.tiff, etc.).
+            Array of images (this needs to be a set of SORTED image paths (so, 1.tiff, 2.tiff, etc.). This can also be a stack packed by io_utils.pack_stack()
+            (either its path or the stack opened with io_utils.open_stack()), in which case the frames are read straight from the stack, or an
+            io_utils.PrefetchLoader, which loads the next frames on background threads while the current one is analyzed.
         xmargins : integer
             How many pixels on each side of the beam (in the x-direction, relative to the centroid of the image) to be used as a buffer for cropping.
         ymargins : integer
             How many pixels on each side of the beam (in the y-direction, relative to the centroid of the image) to be used as a buffer for cropping.
+        fwrange (OPTIONAL) : float
+            Number which specifies the range the algorithm should look around the maximum of the data to find the "most prominent" peak when calculating the FWHM.
+        workers (OPTIONAL) : integer
+            Number of processes to spread decoding and analysis over. Default is one (no extra processes); None uses every core. The results are always in the
+            same order as imglist.
+        chunksize (OPTIONAL) : integer
+            Number of images sent to a worker process at a time (only used when workers isn't one).
+        cache (OPTIONAL) : ResultCache
+            A cache_utils.ResultCache. Frames that were already analyzed with the same parameters are served from the cache, and the centroid guess of every
+            frame is reused when only the parameters change. With a cache, the cropped images are None unless the cache keeps them (keepcrops=True), on the
+            first run as well as on reruns served from the cache, so both give the same results.
+        initcrop (OPTIONAL) : tuple, None or string
+            The (xpoint, ypoint, xmargins, ymargins) of the initial crop that cuts out the dead pixels of the camera this dataset was taken with (default
+            single.INITIAL_CROP), None for the whole images, or 'auto' to find the beam anywhere in each image (see single.single_image_proj()).
+        track (OPTIONAL) : boolean or BeamTracker
+            Set to True (or pass a roi_utils.BeamTracker to choose its settings) to follow the beam from frame to frame: each crop is cut straight around the
+            refined centroid of the frame before, and the whole initial crop is only searched when the beam isn't found there. In a run where the beam only
+            moves a few pixels from shot to shot, this saves most of the work on every frame. Tracking follows the frames in order, so it can only be used with
+            one worker (a ValueError is raised otherwise).
     """
     # create empty lists for FWHM in x- and y-directions as well as an empty list for all of the cropped images
     xlist = []
     ylist = []
     croppedimgs = []
 
-    # for loop that cycles through all of the images and finds the FWHM along each axis (using PROJECTIONS)
-    for i in imglist:
-        # find the FWHM in both transverse dimensions as well as the cropped images used for processing
-        xFWHM, yFWHM, croppedimg = single.single_image_proj(xmargins, ymargins, imgar=np.array(Image.open(i)), fwrange=fwrange)
-
+    # cycle through all of the images and find the FWHM along each axis (using PROJECTIONS), possibly spread over multiple processes
+    for _, xFWHM, yFWHM, croppedimg in iter_set_proj(imglist, xmargins, ymargins, fwrange=fwrange, workers=workers, chunksize=chunksize, cropevery=1, cache=cache,
+                                                     initcrop=initcrop, track=track):
         # append everything to their respective empty lists
         croppedimgs.append(croppedimg)
         xlist.append(xFWHM)
@@ -49,15 +369,18 @@ def full_set_proj(imglist, xmargins, ymargins, fwrange=1.3):
     return(xlist, ylist, croppedimgs)
 
 
-def full_set_line(imglist, xmargins, ymargins, xpixel=0, ypixel=0, fwrange=1.3):
-    """ Returns a list of FWHM values in the x- and y-directions as well as a list of all cropped images used for analysis. This function is based on the lineouts specified by the 
+def full_set_line(imglist, xmargins, ymargins, xpixel=0, ypixel=0, fwrange=1.3, workers=1, chunksize=1, cache=None, initcrop=single.INITIAL_CROP,
+                  track=False):
+    """ Returns a list of FWHM values in the x- and y-directions as well as a list of all cropped images used for analysis. This function is based on the lineouts specified by the
     user or through the centroid of the image.
 
 
         Parameters
         __________
         imglist : array
-            Array of image paths (this needs to be a set of SORTED image paths (so, 1.tiff, 2.tiff, etc.).
+            Array of image paths (this needs to be a set of SORTED image paths (so, 1.tiff, 2.tiff, etc.). This can also be a stack packed by io_utils.pack_stack()
+            (either its path or the stack opened with io_utils.open_stack()), in which case the frames are read straight from the stack, or an
+            io_utils.PrefetchLoader, which loads the next frames on background threads while the current one is analyzed.
         xmargins : integer
             How many pixels on each side of the beam (in the x-direction, relative to the centroid of the image) to be used as a buffer for cropping.
         ymargins : integer
@@ -66,18 +389,34 @@ def full_set_line(imglist, xmargins, ymargins, xpixel=0, ypixel=0, fwrange=1.3):
             The column of pixels at which a y-lineout will be taken.
         ypixel (OPTIONAL) : integer
             The row of pixels at which an x-lineout will be taken.
+        fwrange (OPTIONAL) : float
+            Number which specifies the range the algorithm should look around the maximum of the data to find the "most prominent" peak when calculating the FWHM.
+        workers (OPTIONAL) : integer
+            Number of processes to spread decoding and analysis over. Default is one (no extra processes); None uses every core. The results are always in the
+            same order as imglist.
+        chunksize (OPTIONAL) : integer
+            Number of images sent to a worker process at a time (only used when workers isn't one).
+        cache (OPTIONAL) : ResultCache
+            A cache_utils.ResultCache. Frames that were already analyzed with the same parameters are served from the cache, and the centroid guess of every
+            frame is reused when only the parameters change. With a cache, the cropped images are None unless the cache keeps them (keepcrops=True), on the
+            first run as well as on reruns served from the cache, so both give the same results.
+        initcrop (OPTIONAL) : tuple, None or string
+            The (xpoint, ypoint, xmargins, ymargins) of the initial crop that cuts out the dead pixels of the camera this dataset was taken with (default
+            single.INITIAL_CROP), None for the whole images, or 'auto' to find the beam anywhere in each image (see single.single_image_proj()).
+        track (OPTIONAL) : boolean or BeamTracker
+            Set to True (or pass a roi_utils.BeamTracker to choose its settings) to follow the beam from frame to frame: each crop is cut straight around the
+            refined centroid of the frame before, and the whole initial crop is only searched when the beam isn't found there. In a run where the beam only
+            moves a few pixels from shot to shot, this saves most of the work on every frame. Tracking follows the frames in order, so it can only be used with
+            one worker (a ValueError is raised otherwise).
     """
     # create empty lists for FWHM in x- and y-directions as well as an empty list for all of the cropped images
     xlist = []
     ylist = []
     croppedimgs = []
 
-    # just run the code in a for loop like normal; if x- and y- pixels are not specified, the code in the single image function will just automatically use the centroid instead
-    for i in imglist:
-        # find the FWHM in both transverse dimensions as well as the cropped images used for processing
-        xFWHM, yFWHM, croppedimg = single.single_image_line(xmargins, ymargins, xpixel=xpixel, ypixel=ypixel, imgar=np.array(Image.open(i)),
-                                                            fwrange=fwrange)
-
+    # just run the code like normal (possibly over multiple processes); if x- and y- pixels are not specified, the code in the single image function will just automatically use the centroid instead
+    for _, xFWHM, yFWHM, croppedimg in iter_set_line(imglist, xmargins, ymargins, xpixel=xpixel, ypixel=ypixel, fwrange=fwrange, workers=workers,
+                                                     chunksize=chunksize, cropevery=1, cache=cache, initcrop=initcrop, track=track):
         # append everything to their respective lists
         croppedimgs.append(croppedimg)
         xlist.append(xFWHM)
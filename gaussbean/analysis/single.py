@@ -14,13 +14,50 @@ import sys
 sys.path.append('../utils/')
 
 # import from other modules in the package
-from gaussbean.utils import pre_utils, calc_utils
+from gaussbean.utils import calc_utils, fit_utils, moment_utils, roi_utils, profile_utils
+
+# the initial crop (xpoint, ypoint, xmargins, ymargins) used to cut out as many dead pixels as possible before looking for the beam
+INITIAL_CROP = (1212, 1012, 1000, 988)
 
 #########################
 ### START OF FUNCTIONS
 #########################
 
-def single_image_proj(xmargins, ymargins, fwrange=1.3, imgpath='', imgar=[]):
+def _width(profile, fwrange, method):
+    """ Returns the FWHM of a projection or lineout, either measured from its most prominent peak (method 'peak', which raises an IndexError if there is no such
+    peak) or from a Gaussian fitted to it (method 'fit', which gives NaN if the fit fails). This function shouldn't be called by the user at any point.
+    """
+    if method == 'fit':
+        return(fit_utils.fit_gauss1d_batch(profile)['FWHM'][0])
+    if method == 'peak':
+        return(calc_utils.find_FWHM(profile, fwhmrange=fwrange)[0])
+    raise ValueError("method needs to be 'peak' or 'fit', not " + repr(method))
+
+########################################################
+
+def _initial_crop(arrayimg, initcrop, centroid):
+    """ Returns the initial crop of an image (as an ROI) and the general guess of where the centroid is in it: either the centroid given by the user, the
+    maximum of the projections of the initial crop, or (with initcrop='auto') the beam found by roi_utils.locate_beam() in the whole image. This function
+    shouldn't be called by the user at any point.
+    """
+    # crop out as many dead pixels as possible (as long as the feature is SOMEWHAT in the middle of the image, this should be fine). The crops are ROIs, which
+    # are only views of the original image, so nothing gets copied
+    initialcrop = roi_utils.initial_roi(arrayimg, initcrop)
+
+    # make a general guess as to where the centroid of the image is (unless the user already has one)
+    if centroid is not None:
+        centx, centy = centroid
+    elif initcrop == 'auto':
+        centx, centy = roi_utils.locate_beam(initialcrop.view)
+    else:
+        centx, centy = calc_utils.find_centroid(imgar=initialcrop.view)
+    return(initialcrop, centx, centy)
+
+########################################################
+
+@profile_utils.timed()
+def single_image_proj(xmargins, ymargins, fwrange=1.3, imgpath='', imgar=[], centroid=None, full_output=False, method='peak',
+                      initcrop=INITIAL_CROP):
     """ Runs a data analysis algorithm on a single image. Returns the FWHM in both transverse dimensions as well as the cropped image for
     diagnostics, GIF, or movie purposes. This function is based on the projections on each axis of the image.
 
@@ -34,34 +71,54 @@ def single_image_proj(xmargins, ymargins, fwrange=1.3, imgpath='', imgar=[]):
             The path to the image that the user wants to run through the data analysis algorithm.
         imgar (OPTIONAL) : array
             The image array that the user wants to run through the data analysis algorithm.
+        centroid (OPTIONAL) : tuple
+            An (x, y) guess of the centroid in the coordinates of the initial crop (for example, one saved from an earlier analysis of the same image). If given,
+            the search for the centroid over the whole initial crop is skipped.
+        full_output (OPTIONAL) : boolean
+            If True, a dictionary with the centroid guess (centx, centy, in the initial crop), the accurate centroid (centx2, centy2, in the final cropped
+            image, and absx, absy, in the original image) and the ROI of the final cropped image (roi) is returned as well.
+        method (OPTIONAL) : string
+            How the FWHM values are found: 'peak' (the default) measures the width of the most prominent peak of each projection, and raises an IndexError
+            if there is none; 'fit' fits a Gaussian to each projection (see fit_utils.fit_gauss1d_batch()), which copes better with noisy, low-charge shots and
+            gives NaN instead of an error when the fit fails.
+        initcrop (OPTIONAL) : tuple, None or string
+            The (xpoint, ypoint, xmargins, ymargins) of the initial crop that cuts out the dead pixels of the camera (default INITIAL_CROP), None to use the whole
+            image, or 'auto' to find the beam anywhere in the image with roi_utils.locate_beam() (on a binned copy of the image first, which keeps working
+            when the beam drifts). With None or 'auto', the centroid guess (centx, centy) is in the coordinates of the whole image.
     """
     # set the array of the image to whatever the user specifies (either based on the image path OR an array that the user inputs)
     arrayimg = calc_utils.check_array(imgpath, imgar)
 
-    # crop out as many dead pixels as possible (as long as the feature is SOMEWHAT in the middle of the image, this should be fine)
-    initialcrop = pre_utils.crop_image(1212, 1012, 1000, 988, imgar=arrayimg)
-
-    # make a general guess as to where the centroid of the image is
-    centx, centy = calc_utils.find_centroid(imgar=initialcrop)
+    # crop out the dead pixels and make a general guess as to where the centroid of the image is (unless the user already has one)
+    with profile_utils.stage('single.initial_crop'):
+        initialcrop, centx, centy = _initial_crop(arrayimg, initcrop, centroid)
 
     # crop the image around the centroid guess. This is the image that will be used in the rest of the analysis process
-    finalimg = pre_utils.crop_image(centx, centy, xmargins, ymargins, imgar=initialcrop)
+    finalroi = initialcrop.crop(centx, centy, xmargins, ymargins)
+    finalimg = finalroi.view
 
     # find the centroid AGAIN, but more accurately, so we can get as accurate a measurement of the FWHM as possible
     centx2, centy2 = calc_utils.find_centroid(imgar=finalimg)
     
     # use the projection along the y-axis to find the FWHM value for the beam along the y-axis
-    yFWHM = calc_utils.find_FWHM(calc_utils.find_proj_y(imgar=finalimg), range=fwrange)[0]
+    yFWHM = _width(calc_utils.find_proj_y(imgar=finalimg), fwrange, method)
     
     # use the projection along the x-axis to find the FWHM value for the beam along the x-axis
-    xFWHM = calc_utils.find_FWHM(calc_utils.find_proj_x(imgar=finalimg), range=fwrange)[0]
+    xFWHM = _width(calc_utils.find_proj_x(imgar=finalimg), fwrange, method)
+
+    # if the user wants them, return the centroids as well
+    if full_output:
+        absx, absy = finalroi.to_absolute(centx2, centy2)
+        return(xFWHM, yFWHM, finalimg, {'centx': centx, 'centy': centy, 'centx2': centx2, 'centy2': centy2, 'absx': absx, 'absy': absy, 'roi': finalroi})
 
     # return the FWHM value for the beam along the x- and y- directions, as well as the final cropped image, which can be used for diagnostic purposes
     return(xFWHM, yFWHM, finalimg)
 
 ########################################################
 
-def single_image_line(xmargins, ymargins, xpixel=0, ypixel=0, toavg=0, fwrange=1.3, imgpath='', imgar=[]):
+@profile_utils.timed()
+def single_image_line(xmargins, ymargins, xpixel=0, ypixel=0, toavg=0, fwrange=1.3, imgpath='', imgar=[], centroid=None, full_output=False,
+                      method='peak', initcrop=INITIAL_CROP):
     """ Returns the image path or the array of the image based on what the user has input into the function that's calling check_array(). This function shouldn't be
     called by the user at any point. This function is based on the lineouts specified by the user or through the centroid of the image.
 
@@ -79,32 +136,94 @@ def single_image_line(xmargins, ymargins, xpixel=0, ypixel=0, toavg=0, fwrange=1
             The path to the image that the user wants to run through the analysis algorithm.
         imgar (OPTIONAL) : array
             The image array that the user wants to run through the data analysis algorithm.
+        centroid (OPTIONAL) : tuple
+            An (x, y) guess of the centroid in the coordinates of the initial crop (for example, one saved from an earlier analysis of the same image). If given,
+            the search for the centroid over the whole initial crop is skipped.
+        full_output (OPTIONAL) : boolean
+            If True, a dictionary with the centroid guess (centx, centy, in the initial crop), the accurate centroid (centx2, centy2, in the final cropped
+            image, and absx, absy, in the original image) and the ROI of the final cropped image (roi) is returned as well.
+        method (OPTIONAL) : string
+            How the FWHM values are found: 'peak' (the default) measures the width of the most prominent peak of each lineout, and raises an IndexError
+            if there is none; 'fit' fits a Gaussian to each lineout (see fit_utils.fit_gauss1d_batch()), which copes better with noisy, low-charge shots and
+            gives NaN instead of an error when the fit fails.
+        initcrop (OPTIONAL) : tuple, None or string
+            The (xpoint, ypoint, xmargins, ymargins) of the initial crop that cuts out the dead pixels of the camera (default INITIAL_CROP), None to use the whole
+            image, or 'auto' to find the beam anywhere in the image with roi_utils.locate_beam() (on a binned copy of the image first, which keeps working
+            when the beam drifts). With None or 'auto', the centroid guess (centx, centy) is in the coordinates of the whole image.
     """
     # set the array of the image to whatever the user specifies (either based on the image path OR an array that the user inputs)
     arrayimg = calc_utils.check_array(imgpath, imgar)
 
-    # crop out as many dead pixels as possible (as long as the feature is SOMEWHAT in the middle of the image, this should be fine)
-    initialcrop = pre_utils.crop_image(1212, 1012, 1000, 988, imgar=arrayimg)
-
-    # make a general guess as to where the centroid of the image is
-    centx, centy = calc_utils.find_centroid(imgar=initialcrop)
+    # crop out the dead pixels and make a general guess as to where the centroid of the image is (unless the user already has one)
+    with profile_utils.stage('single.initial_crop'):
+        initialcrop, centx, centy = _initial_crop(arrayimg, initcrop, centroid)
 
     # crop the image around the centroid guess. This is the image that will be used in the rest of the analysis process
-    finalimg = pre_utils.crop_image(centx, centy, xmargins, ymargins, imgar=initialcrop)
+    finalroi = initialcrop.crop(centx, centy, xmargins, ymargins)
+    finalimg = finalroi.view
 
     # find the centroid AGAIN, but more accurately, so we can get as accurate a measurement of the FWHM as possible
     centx2, centy2 = calc_utils.find_centroid(imgar=finalimg)
 
     # if statement to see if the user wants to use their own selected lineouts, or if they want to use the centroid
-    if xpixel == 0 & ypixel == 0:
+    if xpixel == 0 and ypixel == 0:
         xpixel = centx2
         ypixel = centy2
     
     # use the lineout along the y-axis to find the FWHM value for the beam along the y-axis
-    yFWHM = calc_utils.find_FWHM(calc_utils.find_line_y(xpixel, toavg=toavg, imgar=finalimg), range=fwrange)[0]
+    yFWHM = _width(calc_utils.find_line_y(xpixel, toavg=toavg, imgar=finalimg), fwrange, method)
     
     # use the lineout along the x-axis to find the FWHM value for the beam along the x-axis
-    xFWHM = calc_utils.find_FWHM(calc_utils.find_line_x(ypixel, toavg=toavg, imgar=finalimg), range=fwrange)[0]
+    xFWHM = _width(calc_utils.find_line_x(ypixel, toavg=toavg, imgar=finalimg), fwrange, method)
+
+    # if the user wants them, return the centroids as well
+    if full_output:
+        absx, absy = finalroi.to_absolute(centx2, centy2)
+        return(xFWHM, yFWHM, finalimg, {'centx': centx, 'centy': centy, 'centx2': centx2, 'centy2': centy2, 'absx': absx, 'absy': absy, 'roi': finalroi})
 
     # return the FWHM value for the beam along the x- and y- directions, as well as the final cropped image, which can be used for diagnostic purposes
     return(xFWHM, yFWHM, finalimg)
+
+########################################################
+
+@profile_utils.timed()
+def single_image_moments(xmargins=0, ymargins=0, background=0, imgpath='', imgar=[], initcrop=INITIAL_CROP):
+    """ Returns a dictionary with the intensity-weighted beam metrics of a single image (see moment_utils.find_moments()): total counts, sub-pixel centroid, RMS
+    sizes, covariance and tilt. This is an alternative to the centroid/crop flow of the other single image functions: the moments of the initial crop are found in
+    one pass, which already gives a sub-pixel centroid. If margins are given, the image is then cropped around that centroid and the moments are found again on
+    the crop (which keeps the noise far from the beam out of the RMS sizes). The centroid is given in the coordinates of the ORIGINAL image.
+
+        Parameters
+        ----------
+        xmargins (OPTIONAL) : integer
+            A number (in pixels) of how far in the x-direction, on either side of the centroid, the image is cropped for the second pass. Zero (the default, with
+            ymargins also zero) skips the second pass.
+        ymargins (OPTIONAL) : integer
+            A number (in pixels) of how far in the y-direction, on either side of the centroid, the image is cropped for the second pass.
+        background (OPTIONAL) : float
+            A constant background level subtracted from every pixel before the moments are taken.
+        imgpath (OPTIONAL) : string
+            The path to the image that the user wants to run through the data analysis algorithm.
+        imgar (OPTIONAL) : array
+            The image array that the user wants to run through the data analysis algorithm.
+        initcrop (OPTIONAL) : tuple, None or string
+            The (xpoint, ypoint, xmargins, ymargins) of the initial crop (default INITIAL_CROP), None to use the whole image, or 'auto' to crop the first pass
+            around the beam found by roi_utils.locate_beam() (with the margins given, or over the whole image if there are none).
+    """
+    # set the array of the image to whatever the user specifies (either based on the image path OR an array that the user inputs)
+    arrayimg = calc_utils.check_array(imgpath, imgar)
+
+    # crop out as many dead pixels as possible (or crop around the beam, wherever it is) and find the moments of what is left
+    roi = roi_utils.initial_roi(arrayimg, initcrop)
+    if initcrop == 'auto' and (xmargins > 0 or ymargins > 0):
+        roi = roi.crop(*roi_utils.locate_beam(roi.view), xmargins, ymargins)
+    moments = moment_utils.find_moments(imgar=roi.view, background=background)
+
+    # if the user wants, crop around the centroid and find the moments again on just the beam
+    if xmargins > 0 or ymargins > 0:
+        roi = roi.crop(moments['centx'], moments['centy'], xmargins, ymargins)
+        moments = moment_utils.find_moments(imgar=roi.view, background=background)
+
+    # return the moments, with the centroid in the coordinates of the original image
+    moments['centx'], moments['centy'] = roi.to_absolute(moments['centx'], moments['centy'])
+    return(moments)
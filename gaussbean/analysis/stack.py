@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Fri Oct  16 10:00:00 2026
+
+@author: leahghartman
+
+Description : A file containing functions capable of analyzing a whole stack of images (a 3D array of shape (number of images, height, width)) at once.
+"""
+# import random needed packages that should already be installed
+import numpy as np
+
+# import from other modules in the package
+from gaussbean.analysis import single
+from gaussbean.utils import calc_utils, fit_utils, io_utils
+
+# the fields of the structured array returned for every image in the stack; centx/centy are the first centroid guess (in the coordinates of the initial crop) and
+# centx2/centy2 are the more accurate centroid (in the coordinates of the final cropped image), just like in the single image functions
+RESULT_DTYPE = np.dtype([('xFWHM', 'f8'), ('yFWHM', 'f8'), ('centx', 'i8'), ('centy', 'i8'), ('centx2', 'i8'), ('centy2', 'i8')])
+
+#########################
+### START OF FUNCTIONS
+#########################
+
+def _check_stack(stack):
+    """ Returns the stack as a 3D array without copying it (so memory-mapped stacks stay on disk), or the PrefetchLoader it was given. This function shouldn't be called by the user at any point.
+    """
+    # a prefetching loader hands out its frames block by block, so it is used as it is
+    if isinstance(stack, io_utils.PrefetchLoader):
+        return(stack)
+
+    # np.asarray doesn't copy arrays (or memory maps) that are already arrays, but turns a list of 2D image arrays into a 3D stack
+    stackar = np.asarray(stack)
+    if stackar.ndim != 3:
+        raise ValueError('the stack needs to be a 3D array of shape (number of images, height, width), not shape ' + str(stackar.shape))
+    return(stackar)
+
+########################################################
+
+def _blocks(stack, blocksize):
+    """ Yields (index of the first image, block of images) for every block of the stack. A PrefetchLoader loads its blocks on background threads, while arrays are
+    just sliced (which reads only that block of a memory-mapped stack). This function shouldn't be called by the user at any point.
+    """
+    if isinstance(stack, io_utils.PrefetchLoader):
+        start = 0
+        for block in stack.blocks(blocksize):
+            yield start, block
+            start += len(block)
+    else:
+        for start in range(0, stack.shape[0], blocksize):
+            yield start, stack[start:start+blocksize]
+
+########################################################
+
+def _analyze_block(block, xmargins, ymargins, initcrop, profiles):
+    """ Runs the initial crop, the centroid guess, the crop around the centroid and the accurate centroid on every image of a block, and writes the x- and
+    y-profiles given by profiles(finalimg, xproj, yproj, centx2, centy2) into one row per image of two preallocated arrays. The crops are ROIs (views, so no
+    image is copied) cut exactly like in the single image functions; crops cut off at an edge give shorter rows, padded with zeros after their end. Returns the
+    structured result array (without FWHM values filled in yet), the two arrays of profiles and the length of every row of them (zero where there is no
+    profile). This function shouldn't be called by the user at any point.
+    """
+    count = len(block)
+    results = np.zeros(count, dtype=RESULT_DTYPE)
+    xprofiles = np.zeros((count, min(int(np.ceil(2*xmargins)) + 1, block.shape[2])))
+    yprofiles = np.zeros((count, min(int(np.ceil(2*ymargins)) + 1, block.shape[1])))
+    xlengths = np.zeros(count, dtype=np.intp)
+    ylengths = np.zeros(count, dtype=np.intp)
+
+    for i in range(count):
+        # crop out the dead pixels, make a general guess as to where the centroid is and crop the image around it, just like the single image functions do
+        initialroi, centx, centy = single._initial_crop(block[i], initcrop, None)
+        finalimg = initialroi.crop(centx, centy, xmargins, ymargins).view
+
+        # find the centroid AGAIN, but more accurately, from the projections of the cropped image
+        xproj, yproj = calc_utils.project(finalimg, 0), calc_utils.project(finalimg, 1)
+        centx2, centy2 = np.argmax(xproj), np.argmax(yproj)
+        results[i] = (np.nan, np.nan, centx, centy, centx2, centy2)
+
+        # keep the profiles the FWHM values are measured on
+        xprofile, yprofile = profiles(finalimg, xproj, yproj, centx2, centy2)
+        if xprofile is not None:
+            xlengths[i] = len(xprofile)
+            xprofiles[i, :xlengths[i]] = xprofile
+        if yprofile is not None:
+            ylengths[i] = len(yprofile)
+            yprofiles[i, :ylengths[i]] = yprofile
+
+    # return the results so far as well as the profiles (without the columns no row reaches) and their lengths
+    return(results, xprofiles[:, :xlengths.max(initial=0)], yprofiles[:, :ylengths.max(initial=0)], xlengths, ylengths)
+
+########################################################
+
+def _widths(profiles, lengths, fwrange, method):
+    """ Returns the FWHM of every row of a 2D array of projections or lineouts, either measured from the most prominent peak of each row (method 'peak') or from
+    a Gaussian fitted to each row (method 'fit'). Only the first lengths[i] samples of row i are measured, so the rows of crops cut off at an edge are measured
+    on their own. Rows where no FWHM can be found get NaN either way. This function shouldn't be called by the user at any point.
+    """
+    if method == 'fit':
+        batch = lambda rows: fit_utils.fit_gauss1d_batch(rows)['FWHM']
+    elif method == 'peak':
+        batch = lambda rows: calc_utils.find_FWHM_batch(rows, fwhmrange=fwrange)
+    else:
+        raise ValueError("method needs to be 'peak' or 'fit', not " + repr(method))
+
+    # measure every row at once, then measure the (few) shorter rows again without their padding
+    if profiles.shape[1] == 0:
+        return(np.full(len(profiles), np.nan))
+    widths = batch(profiles)
+    for row in np.flatnonzero(lengths < profiles.shape[1]):
+        widths[row] = batch(profiles[row, :lengths[row]])[0] if lengths[row] > 0 else np.nan
+    return(widths)
+
+########################################################
+
+def _lineout(find_line, pixel, toavg, finalimg):
+    """ Returns the lineout calc_utils.find_line_x() or find_line_y() takes from a cropped image, or None where it can't be taken (the rows/columns run past
+    the end of the crop). This function shouldn't be called by the user at any point.
+    """
+    try:
+        return(find_line(pixel, toavg=toavg, imgar=finalimg))
+    except IndexError:
+        return(None)
+
+########################################################
+
+def stack_proj(stack, xmargins, ymargins, fwrange=1.3, blocksize=64, initcrop=single.INITIAL_CROP, method='peak'):
+    """ Returns a structured array with the FWHM values in both transverse dimensions and the centroids of EVERY image in a stack. This does the same analysis as
+    single.single_image_proj() (based on projections on each axis of the images), but a block of images at a time: every image is only cropped (as a view)
+    and projected, and the FWHM values of the whole block are then found at once with calc_utils.find_FWHM_batch(). Images where a FWHM can't be found get NaN
+    rather than raising an error.
+
+        Parameters
+        ----------
+        stack : array
+            3D array of images with shape (number of images, height, width). This can be a memory-mapped array; only one block of images is read at a time. It
+            can also be an io_utils.PrefetchLoader, which loads the next block on background threads while the current one is analyzed.
+        xmargins : integer
+            How many pixels on each side of the beam (in the x-direction, relative to the centroid of the image) to be used as a buffer for cropping.
+        ymargins : integer
+            How many pixels on each side of the beam (in the y-direction, relative to the centroid of the image) to be used as a buffer for cropping.
+        fwrange (OPTIONAL) : float
+            Number which specifies the range the algorithm should look around the maximum of the data to find the "most prominent" peak when calculating the FWHM.
+        blocksize (OPTIONAL) : integer
+            The number of images whose FWHM values are found together at once (and, for memory-mapped stacks, read from disk at once).
+        initcrop (OPTIONAL) : tuple, None or string
+            The (xpoint, ypoint, xmargins, ymargins) of the initial crop used to cut out dead pixels. Default is the same crop the single image functions use.
+            None uses the whole images, and 'auto' finds every beam on a binned copy of its image first (see roi_utils.locate_beam()), which keeps working
+            when the beam drifts. With None or 'auto', centx and centy are in the coordinates of the whole images.
+        method (OPTIONAL) : string
+            How the FWHM values are found: 'peak' (the default) measures the width of the most prominent peak of each projection, 'fit' fits a Gaussian to each
+            projection (see fit_utils.fit_gauss1d_batch()), which copes better with noisy, low-charge shots.
+    """
+    if method not in ('peak', 'fit'):
+        raise ValueError("method needs to be 'peak' or 'fit', not " + repr(method))
+
+    # make sure we have a 3D stack and create the structured array for all of the results
+    stackar = _check_stack(stack)
+    results = np.zeros(len(stackar), dtype=RESULT_DTYPE)
+
+    # analyze the stack one block of images at a time
+    for start, block in _blocks(stackar, blocksize):
+        # the projections of every cropped image are the profiles
+        blockresults, xprofiles, yprofiles, xlengths, ylengths = _analyze_block(block, xmargins, ymargins, initcrop,
+                                                                                lambda finalimg, xproj, yproj, centx2, centy2: (xproj, yproj))
+
+        # use the projections along each axis of every cropped image to find the FWHM values for the whole block at once
+        blockresults['yFWHM'] = _widths(yprofiles, ylengths, fwrange, method)
+        blockresults['xFWHM'] = _widths(xprofiles, xlengths, fwrange, method)
+        results[start:start+blocksize] = blockresults
+
+    # return the results for every image in the stack
+    return(results)
+
+########################################################
+
+def stack_line(stack, xmargins, ymargins, xpixel=0, ypixel=0, toavg=0, fwrange=1.3, blocksize=64, initcrop=single.INITIAL_CROP, method='peak'):
+    """ Returns a structured array with the FWHM values in both transverse dimensions and the centroids of EVERY image in a stack. This does the same analysis as
+    single.single_image_line() (based on the lineouts specified by the user or through the centroid of each image), but a block of images at a time: every
+    image is only cropped (as a view) and its lineouts taken, and the FWHM values of the whole block are then found at once with calc_utils.find_FWHM_batch().
+    Images where a FWHM can't be found get NaN rather than raising an error.
+
+        Parameters
+        ----------
+        stack : array
+            3D array of images with shape (number of images, height, width). This can be a memory-mapped array; only one block of images is read at a time. It
+            can also be an io_utils.PrefetchLoader, which loads the next block on background threads while the current one is analyzed.
+        xmargins : integer
+            How many pixels on each side of the beam (in the x-direction, relative to the centroid of the image) to be used as a buffer for cropping.
+        ymargins : integer
+            How many pixels on each side of the beam (in the y-direction, relative to the centroid of the image) to be used as a buffer for cropping.
+        xpixel (OPTIONAL) : integer
+            Specifies at which COLUMN of the cropped images the y-lineouts are taken. If both xpixel and ypixel are zero, the centroid of each image is used.
+        ypixel (OPTIONAL) : integer
+            Specifies at which ROW of the cropped images the x-lineouts are taken. If both xpixel and ypixel are zero, the centroid of each image is used.
+        toavg (OPTIONAL) : integer
+            Specifies the number of lineouts on EACH SIDE of the original lineout the user wants to create a projection with.
+        fwrange (OPTIONAL) : float
+            Number which specifies the range the algorithm should look around the maximum of the data to find the "most prominent" peak when calculating the FWHM.
+        blocksize (OPTIONAL) : integer
+            The number of images whose FWHM values are found together at once (and, for memory-mapped stacks, read from disk at once).
+        initcrop (OPTIONAL) : tuple, None or string
+            The (xpoint, ypoint, xmargins, ymargins) of the initial crop used to cut out dead pixels. Default is the same crop the single image functions use.
+            None uses the whole images, and 'auto' finds every beam on a binned copy of its image first (see roi_utils.locate_beam()), which keeps working
+            when the beam drifts. With None or 'auto', centx and centy are in the coordinates of the whole images.
+        method (OPTIONAL) : string
+            How the FWHM values are found: 'peak' (the default) measures the width of the most prominent peak of each lineout, 'fit' fits a Gaussian to each
+            lineout (see fit_utils.fit_gauss1d_batch()), which copes better with noisy, low-charge shots.
+    """
+    if method not in ('peak', 'fit'):
+        raise ValueError("method needs to be 'peak' or 'fit', not " + repr(method))
+
+    # make sure we have a 3D stack and create the structured array for all of the results
+    stackar = _check_stack(stack)
+    results = np.zeros(len(stackar), dtype=RESULT_DTYPE)
+
+    def lineouts(finalimg, xproj, yproj, centx2, centy2):
+        linex, liney = (centx2, centy2) if xpixel == 0 and ypixel == 0 else (xpixel, ypixel)
+        return(_lineout(calc_utils.find_line_x, liney, toavg, finalimg), _lineout(calc_utils.find_line_y, linex, toavg, finalimg))
+
+    # analyze the stack one block of images at a time
+    for start, block in _blocks(stackar, blocksize):
+        # take the lineouts through the accurate centroid of every image if the user doesn't select their own, the same way calc_utils does for a single image
+        blockresults, xprofiles, yprofiles, xlengths, ylengths = _analyze_block(block, xmargins, ymargins, initcrop, lineouts)
+
+        # use the lineouts along each axis of every cropped image to find the FWHM values for the whole block at once (NaN where a lineout runs past the end of
+        # the crop)
+        blockresults['yFWHM'] = _widths(yprofiles, ylengths, fwrange, method)
+        blockresults['xFWHM'] = _widths(xprofiles, xlengths, fwrange, method)
+        results[start:start+blocksize] = blockresults
+
+    # return the results for every image in the stack
+    return(results)
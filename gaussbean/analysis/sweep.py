@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Fri Oct  16 13:00:00 2026
+
+@author: leahghartman
+
+Description : A file containing functions that run the analysis of a full dataset over a whole grid of parameters (margins, fwrange, toavg) at once.
+"""
+# import random needed packages that should already be installed
+import os
+import itertools
+import numpy as np
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+# import from other modules in the package
+from gaussbean.analysis import single
+from gaussbean.utils import calc_utils, io_utils, integral_utils
+
+# the fields of every row of the table returned by the sweep functions (one row per combination of parameters and frame)
+SWEEP_DTYPE = np.dtype([('xmargins', 'f8'), ('ymargins', 'f8'), ('fwrange', 'f8'), ('toavg', 'i8'), ('frame', 'i8'), ('xFWHM', 'f8'), ('yFWHM', 'f8')])
+
+#########################
+### START OF FUNCTIONS
+#########################
+
+def _first_width(profile, fwrange):
+    """ Returns the FWHM of a projection or lineout the same way the single image functions do, but with NaN instead of an error when no peak is found. This
+    function shouldn't be called by the user at any point.
+    """
+    widths = calc_utils.find_FWHM(profile, fwhmrange=fwrange)
+    return(widths[0] if len(widths) > 0 else np.nan)
+
+########################################################
+
+def _lineouts(finalimg, integral, linex, liney, toavg):
+    """ Returns the x- and y-lineouts of a crop exactly like calc_utils.find_line_x() and find_line_y() (which dataset.full_set_line() uses) would. Lineouts
+    whose rows/columns all fall inside of the crop are read out of its integral image; the others are left to calc_utils, so a lineout at the edge of the crop
+    comes out the same as it does everywhere else in the package (find_line_x() wraps rows before the first one around to the end of the crop, which the
+    integral image would leave out instead). This function shouldn't be called by the user at any point.
+    """
+    height, width = integral.shape
+    if 0 <= liney - toavg and liney + toavg < height:
+        linexout = integral.line_x(liney, toavg=toavg)
+    else:
+        linexout = calc_utils.find_line_x(liney, toavg=toavg, imgar=finalimg)
+    if 0 <= linex - toavg and linex + toavg < width:
+        lineyout = integral.line_y(linex, toavg=toavg)
+    else:
+        lineyout = calc_utils.find_line_y(linex, toavg=toavg, imgar=finalimg)
+    return(linexout, lineyout)
+
+########################################################
+
+def _sweep_frame(source, grid, mode, xpixel, ypixel, initcrop):
+    """ Runs every combination of parameters in the grid over ONE frame, doing each shared stage only once: the frame is loaded, cropped and searched for its
+    centroid guess once; every (xmargins, ymargins) pair is cropped once; every projection/lineout is found once; and only the FWHM is found once per fwrange.
+    Returns one row of SWEEP_DTYPE per combination, in the order of the grid. This function shouldn't be called by the user at any point.
+    """
+    rows = np.zeros(len(grid), dtype=SWEEP_DTYPE)
+
+    # load the image, crop out the dead pixels and make the general centroid guess ONCE for the whole grid
+    initialroi, centx, centy = single._initial_crop(io_utils.load_frame(source), initcrop, None)
+
+    crops = {}
+    profiles = {}
+    for i, (xmargins, ymargins, fwrange, toavg) in enumerate(grid):
+        # every (xmargins, ymargins) pair is cropped (and searched for its accurate centroid) only the first time it is needed
+        if (xmargins, ymargins) not in crops:
+            finalimg = initialroi.crop(centx, centy, xmargins, ymargins).view
+            linex, liney = (xpixel, ypixel)
+            integral = None
+            if mode == 'line' and xpixel == 0 and ypixel == 0:
+                # if the user doesn't select their own lineouts, take them through the accurate centroid of the cropped image
+                linex, liney = calc_utils.find_centroid(imgar=finalimg)
+            if mode == 'line':
+                # every toavg of the lineouts is then read out of ONE integral image of the crop instead of adding up the rows/columns again each time
+                integral = integral_utils.IntegralImage(finalimg)
+            crops[(xmargins, ymargins)] = (finalimg, integral, linex, liney)
+
+        # the projections/lineouts only depend on the margins (and toavg), so they are also computed once and reused after that
+        if (xmargins, ymargins, toavg) not in profiles:
+            finalimg, integral, linex, liney = crops[(xmargins, ymargins)]
+            if mode == 'proj':
+                profiles[(xmargins, ymargins, toavg)] = (calc_utils.find_proj_x(imgar=finalimg), calc_utils.find_proj_y(imgar=finalimg))
+            else:
+                profiles[(xmargins, ymargins, toavg)] = _lineouts(finalimg, integral, linex, liney, toavg)
+
+        # only the FWHM has to be found for every single combination
+        xprofile, yprofile = profiles[(xmargins, ymargins, toavg)]
+        rows[i] = (xmargins, ymargins, fwrange, toavg, 0, _first_width(xprofile, fwrange), _first_width(yprofile, fwrange))
+
+    # return the rows for this frame
+    return(rows)
+
+########################################################
+
+def _sweep(imglist, grid, mode, xpixel, ypixel, workers, chunksize, initcrop):
+    """ Runs the sweep over every frame and puts together the table, sorted by the parameters and then by frame. This function shouldn't be called by the user at
+    any point.
+    """
+    sources = io_utils.frame_sources(imglist)
+    func = partial(_sweep_frame, grid=grid, mode=mode, xpixel=xpixel, ypixel=ypixel, initcrop=initcrop)
+
+    # run every frame (possibly over multiple processes; executor.map keeps the results in frame order)
+    if workers == 1:
+        framerows = list(map(func, sources))
+    else:
+        with ProcessPoolExecutor(max_workers=workers if workers is not None else os.cpu_count()) as executor:
+            framerows = list(executor.map(func, sources, chunksize=chunksize))
+
+    # put the table together with the parameters changing slowest and the frame changing fastest
+    table = np.zeros((len(grid), len(framerows)), dtype=SWEEP_DTYPE)
+    for frame, rows in enumerate(framerows):
+        rows['frame'] = frame
+        table[:, frame] = rows
+    return(table.ravel())
+
+########################################################
+
+def sweep_proj(imglist, xmargins, ymargins, fwrange=1.3, workers=1, chunksize=1, initcrop=single.INITIAL_CROP):
+    """ Returns a table (a structured array with fields xmargins, ymargins, fwrange, toavg, frame, xFWHM and yFWHM) of the FWHM values of every frame in a dataset
+    for EVERY combination of the given parameters, based on projections on each axis of the images. Each frame is loaded and its centroid guessed only once,
+    and each cropped image is projected only once, so a sweep costs far less than calling dataset.full_set_proj() once per combination. FWHM values that can't
+    be found are NaN.
+
+        Parameters
+        ----------
+        imglist : array
+            Array of images (this needs to be a set of SORTED image paths (so, 1.tiff, 2.tiff, etc.), or anything else dataset.full_set_proj() takes.
+        xmargins : integer or list
+            One or more values of how many pixels on each side of the beam (in the x-direction) are kept when cropping.
+        ymargins : integer or list
+            One or more values of how many pixels on each side of the beam (in the y-direction) are kept when cropping.
+        fwrange (OPTIONAL) : float or list
+            One or more values of the range the algorithm should look around the maximum of the data to find the "most prominent" peak when calculating the FWHM.
+        workers (OPTIONAL) : integer
+            Number of processes to spread the frames over. Default is one (no extra processes); None uses every core.
+        chunksize (OPTIONAL) : integer
+            Number of frames sent to a worker process at a time (only used when workers isn't one).
+        initcrop (OPTIONAL) : tuple, None or string
+            The initial crop that cuts out the dead pixels of the camera, None for the whole images, or 'auto' (see single.single_image_proj()).
+    """
+    grid = list(itertools.product(np.atleast_1d(xmargins).tolist(), np.atleast_1d(ymargins).tolist(), np.atleast_1d(fwrange).tolist(), [0]))
+    return(_sweep(imglist, grid, 'proj', 0, 0, workers, chunksize, initcrop))
+
+########################################################
+
+def sweep_line(imglist, xmargins, ymargins, xpixel=0, ypixel=0, toavg=0, fwrange=1.3, workers=1, chunksize=1, initcrop=single.INITIAL_CROP):
+    """ Returns a table (a structured array with fields xmargins, ymargins, fwrange, toavg, frame, xFWHM and yFWHM) of the FWHM values of every frame in a dataset
+    for EVERY combination of the given parameters, based on the lineouts specified by the user or through the centroid of each image. Each frame is loaded and
+    its centroid guessed only once, and each (xmargins, ymargins) crop is cut and searched for its centroid only once, so a sweep costs far less than calling
+    dataset.full_set_line() once per combination. FWHM values that can't be found are NaN.
+
+        Parameters
+        ----------
+        imglist : array
+            Array of image paths (this needs to be a set of SORTED image paths (so, 1.tiff, 2.tiff, etc.), or anything else dataset.full_set_line() takes.
+        xmargins : integer or list
+            One or more values of how many pixels on each side of the beam (in the x-direction) are kept when cropping.
+        ymargins : integer or list
+            One or more values of how many pixels on each side of the beam (in the y-direction) are kept when cropping.
+        xpixel (OPTIONAL) : integer
+            The column of pixels at which a y-lineout will be taken.
+        ypixel (OPTIONAL) : integer
+            The row of pixels at which an x-lineout will be taken.
+        toavg (OPTIONAL) : integer or list
+            One or more values of the number of lineouts on EACH SIDE of the original lineout to add together.
+        fwrange (OPTIONAL) : float or list
+            One or more values of the range the algorithm should look around the maximum of the data to find the "most prominent" peak when calculating the FWHM.
+        workers (OPTIONAL) : integer
+            Number of processes to spread the frames over. Default is one (no extra processes); None uses every core.
+        chunksize (OPTIONAL) : integer
+            Number of frames sent to a worker process at a time (only used when workers isn't one).
+        initcrop (OPTIONAL) : tuple, None or string
+            The initial crop that cuts out the dead pixels of the camera, None for the whole images, or 'auto' (see single.single_image_proj()).
+    """
+    grid = list(itertools.product(np.atleast_1d(xmargins).tolist(), np.atleast_1d(ymargins).tolist(), np.atleast_1d(fwrange).tolist(),
+                                  np.atleast_1d(toavg).tolist()))
+    return(_sweep(imglist, grid, 'line', xpixel, ypixel, workers, chunksize, initcrop))
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Fri Oct  16 19:00:00 2026
+
+@author: leahghartman
+
+Description : A file containing a live "watch" mode, which analyzes every new image that lands in a directory during acquisition as soon as it is complete.
+"""
+# import random needed packages that should already be installed
+import os
+import csv
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import fnmatch
+import numpy as np
+from collections import deque, OrderedDict
+
+# import from other modules in the package
+from gaussbean.analysis import single
+from gaussbean.utils import calc_utils, io_utils, stats_utils
+
+# the inotify events that mean a file is complete: it was closed after being written, or it was moved into the directory (cameras that write to a temporary
+# name and rename the file when it is done)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = os.O_NONBLOCK
+
+#########################
+### START OF FUNCTIONS
+#########################
+
+def _inotify(directory):
+    """ Returns a non-blocking inotify file descriptor watching a directory for completed files, or None if inotify isn't available (anything but Linux, or a
+    file system that doesn't support it). This function shouldn't be called by the user at any point.
+    """
+    libname = ctypes.util.find_library('c')
+    if libname is None:
+        return(None)
+    try:
+        libc = ctypes.CDLL(libname, use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK)
+    except (OSError, AttributeError):
+        return(None)
+    if fd < 0:
+        return(None)
+    if libc.inotify_add_watch(fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+        os.close(fd)
+        return(None)
+    return(fd)
+
+########################################################
+
+def _read_events(fd, timeout):
+    """ Waits up to timeout seconds for inotify events and returns the names of the files they are about. This function shouldn't be called by the user at any
+    point.
+    """
+    ready, _, _ = select.select([fd], [], [], timeout)
+    if not ready:
+        return([])
+    try:
+        data = os.read(fd, 65536)
+    except OSError as error:
+        if error.errno == errno.EAGAIN:
+            return([])
+        raise
+
+    # every event is a (watch descriptor, mask, cookie, length of the name) header followed by the name, padded with null bytes
+    names = []
+    offset = 0
+    while offset < len(data):
+        _, _, _, length = struct.unpack_from('iIII', data, offset)
+        offset += 16
+        names.append(os.fsdecode(data[offset:offset+length].rstrip(b'\0')))
+        offset += length
+    return(names)
+
+#########################
+### START OF CLASSES
+#########################
+
+class LiveWatch:
+    """ Watches a directory and analyzes every new image with single.single_image_proj() or single.single_image_line() as soon as it is complete. A file counts
+    as complete when it is closed after writing or moved into the directory (using inotify on Linux), or, where inotify isn't available, once its size and
+    modification time stop changing between two polls. The results of every frame (file name, xFWHM, yFWHM and latency, the time from the file being seen as
+    complete to its result) are appended to an output file straight away, kept in a ring buffer of the most recent frames (.results) and added to running
+    statistics (.stats, see stats_utils.RunStats).
+
+    If the analysis can't keep up with the camera, the latency is kept bounded by skipping the oldest waiting frames once more than maxbacklog are waiting;
+    skipped frames are still written out, with NaN values, and counted in .skipped.
+
+        Parameters
+        ----------
+        directory : string
+            The directory the images land in.
+        xmargins : integer
+            How many pixels on each side of the beam (in the x-direction, relative to the centroid of the image) to be used as a buffer for cropping.
+        ymargins : integer
+            How many pixels on each side of the beam (in the y-direction, relative to the centroid of the image) to be used as a buffer for cropping.
+        mode (OPTIONAL) : string
+            Use projections ('proj', the default) or lineouts ('line').
+        output (OPTIONAL) : string
+            A CSV file the results are appended to (the header is written if the file is new). Default is not to write a file.
+        pattern (OPTIONAL) : string
+            The pattern the names of the image files need to match.
+        history (OPTIONAL) : integer
+            The number of most recent frames kept in the ring buffer (and, with inotify, the number of most recent file names remembered so that a file closed
+            twice is only analyzed once).
+        interval (OPTIONAL) : float
+            How often (in seconds) the directory is polled when inotify isn't available. A polled file is only seen as complete one or two intervals after it
+            was finished, so this needs to be well below the repetition period of the camera.
+        maxbacklog (OPTIONAL) : integer
+            The number of complete frames allowed to wait for analysis before the oldest ones are skipped.
+        existing (OPTIONAL) : boolean
+            Whether images that are already in the directory when watching starts are analyzed too.
+        useinotify (OPTIONAL) : boolean
+            Set to False to always poll (for example on network file systems, where inotify doesn't see files written by other machines).
+        params : keyword arguments
+            Any other parameters of the single image function (fwrange, xpixel, ypixel, toavg, method, initcrop).
+    """
+    def __init__(self, directory, xmargins, ymargins, mode='proj', output=None, pattern='*.tif*', history=1000, interval=0.02, maxbacklog=10, existing=False,
+                 useinotify=True, **params):
+        if mode not in ('proj', 'line'):
+            raise ValueError("mode needs to be 'proj' or 'line', not " + repr(mode))
+        self.directory = directory
+        self.pattern = pattern
+        self.interval = interval
+        self.maxbacklog = maxbacklog
+        self.analyze = single.single_image_proj if mode == 'proj' else single.single_image_line
+        self.params = dict(params, xmargins=xmargins, ymargins=ymargins)
+
+        # find_FWHM() only imports scipy.signal the first time it is called, which takes far longer than a camera period, so get that out of the way now
+        calc_utils.find_FWHM(np.array([0.0, 1.0, 0.0]))
+
+        self.results = deque(maxlen=history)
+        self.stats = stats_utils.RunStats(('xFWHM', 'yFWHM', 'latency'))
+        self.skipped = 0
+
+        # use inotify if we can, and fall back to polling if we can't (this is set up BEFORE looking at what is already there, so nothing falls in between)
+        self._fd = _inotify(directory) if useinotify else None
+
+        # the files that are complete and waiting to be analyzed (with the time they were seen as complete), the files we have already dealt with, and (when
+        # polling) the size and modification time of the files that are still being written
+        self._ready = deque()
+        self._done = OrderedDict()
+        self._history = history
+        self._sizes = {}
+        for name in sorted(self._listdir(), key=io_utils.natural_key):
+            self._mark_done(name)
+            if existing:
+                self._ready.append((name, time.perf_counter()))
+
+        # open the output file for appending, and write the header if the file is new
+        self._outfile = None
+        if output is not None:
+            newfile = not os.path.exists(output) or os.path.getsize(output) == 0
+            self._outfile = open(output, 'a', newline='')
+            self._writer = csv.writer(self._outfile)
+            if newfile:
+                self._writer.writerow(['filename', 'xFWHM', 'yFWHM', 'latency'])
+                self._outfile.flush()
+
+    @property
+    def inotify(self):
+        """ Whether the directory is watched with inotify (True) or polled (False).
+        """
+        return(self._fd is not None)
+
+    def _listdir(self):
+        """ Returns the names of the files in the directory matching the pattern.
+        """
+        with os.scandir(self.directory) as it:
+            return([entry.name for entry in it if fnmatch.fnmatch(entry.name, self.pattern) and entry.is_file()])
+
+    def _mark_done(self, name):
+        """ Remembers that a file has been dealt with. With inotify, only the most recent names are remembered (events only ever come for files that were just
+        written, so older names are never needed again); when polling, the names of files that have left the directory are forgotten in _find_complete().
+        """
+        self._done[name] = None
+        if self._fd is not None and len(self._done) > self._history:
+            self._done.popitem(last=False)
+
+    def _find_complete(self, timeout):
+        """ Waits up to timeout seconds for files to be completed and adds them to the files waiting to be analyzed.
+        """
+        if self._fd is not None:
+            names = [name for name in _read_events(self._fd, timeout) if fnmatch.fnmatch(name, self.pattern)]
+            now = time.perf_counter()
+        else:
+            # without inotify, a file is complete once its size and modification time are the same as the last time we looked. The directory is listed on
+            # every poll: its modification time can't be trusted to show new files (it has the same value for files added within one tick of the clock of the
+            # file system, and is cached on NFS), and polling is exactly what is used on those file systems
+            time.sleep(timeout)
+            now = time.perf_counter()
+            names = []
+            listing = self._listdir()
+            for name in listing:
+                if name in self._done:
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                signature = (stat.st_size, stat.st_mtime_ns)
+                if stat.st_size > 0 and self._sizes.get(name) == signature:
+                    names.append(name)
+                else:
+                    self._sizes[name] = signature
+
+            # forget the files that are gone from the directory, so a long watch doesn't remember every file it ever saw
+            present = set(listing)
+            if len(present) < len(self._done) + len(self._sizes):
+                self._done = OrderedDict((name, None) for name in self._done if name in present)
+                self._sizes = {name: signature for name, signature in self._sizes.items() if name in present}
+
+        for name in sorted(names, key=io_utils.natural_key):
+            if name not in self._done:
+                self._mark_done(name)
+                self._sizes.pop(name, None)
+                self._ready.append((name, now))
+
+    def _record(self, name, xFWHM, yFWHM, latency):
+        """ Adds the results of one frame to the ring buffer, the statistics and the output file.
+        """
+        self.results.append((name, xFWHM, yFWHM, latency))
+        self.stats.add(xFWHM=xFWHM, yFWHM=yFWHM, latency=latency)
+        if self._outfile is not None:
+            self._writer.writerow([name, xFWHM, yFWHM, latency])
+            self._outfile.flush()
+
+    def poll(self, timeout=None, limit=None):
+        """ Waits (up to timeout seconds, default is the polling interval) for new complete files, analyzes every one of them and returns their results as a list
+        of (file name, xFWHM, yFWHM, latency in seconds). Frames where no FWHM can be found (or that can't be read) get NaN.
+
+            Parameters
+            ----------
+            timeout (OPTIONAL) : float
+                How long to wait for new files.
+            limit (OPTIONAL) : integer
+                The most frames handled (analyzed or skipped); any others stay waiting for the next poll.
+        """
+        self._find_complete(self.interval if timeout is None else timeout)
+        handled = []
+        limit = len(self._ready) if limit is None else limit
+
+        # keep the latency bounded: if too many frames are waiting, skip the oldest ones
+        while len(self._ready) > self.maxbacklog and len(handled) < limit:
+            name, _ = self._ready.popleft()
+            self.skipped += 1
+            self._record(name, np.nan, np.nan, np.nan)
+            handled.append(self.results[-1])
+
+        while self._ready and len(handled) < limit:
+            name, seen = self._ready.popleft()
+            try:
+                imgar = io_utils.load_frame(os.path.join(self.directory, name))
+                xFWHM, yFWHM, _ = self.analyze(imgar=imgar, **self.params)
+            except (IndexError, OSError, ValueError):
+                xFWHM, yFWHM = np.nan, np.nan
+            self._record(name, float(xFWHM), float(yFWHM), time.perf_counter() - seen)
+            handled.append(self.results[-1])
+        return(handled)
+
+    def run(self, duration=None, maxframes=None, callback=None):
+        """ Keeps analyzing new files until duration seconds have passed or maxframes frames have been handled (or forever, until interrupted with Ctrl-C, if
+        neither is given). Returns the number of frames handled.
+
+            Parameters
+            ----------
+            duration (OPTIONAL) : float
+                How long to watch the directory for, in seconds.
+            maxframes (OPTIONAL) : integer
+                How many frames to handle before stopping.
+            callback (OPTIONAL) : function
+                Called with the (file name, xFWHM, yFWHM, latency) of every frame as soon as it is done (for example to update a live plot).
+        """
+        end = None if duration is None else time.perf_counter() + duration
+        frames = 0
+        try:
+            while (end is None or time.perf_counter() < end) and (maxframes is None or frames < maxframes):
+                timeout = self.interval if end is None else max(min(self.interval, end - time.perf_counter()), 0)
+                for result in self.poll(timeout, None if maxframes is None else maxframes - frames):
+                    frames += 1
+                    if callback is not None:
+                        callback(result)
+        except KeyboardInterrupt:
+            pass
+        return(frames)
+
+    def close(self):
+        """ Stops watching the directory and closes the output file.
+        """
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        if self._outfile is not None:
+            self._outfile.close()
+            self._outfile = None
+
+    def __enter__(self):
+        return(self)
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Fri Oct  16 21:00:00 2026
+
+@author: leahghartman
+
+Description : The "gaussbean-bench" command, a benchmark suite that times every stage of the analysis (decoding, each pre_utils filter, centroid, projections,
+lineouts, FWHM, single images and whole dataset runs) on synthetic frames from synth_utils, and reports the throughput and peak memory of each of them. The
+results can be written to a JSON file and compared against the results of another commit.
+"""
+# import random needed packages that should already be installed
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import itertools
+import subprocess
+import tracemalloc
+import numpy as np
+from importlib.util import find_spec
+
+# import from other modules in the package
+from gaussbean.analysis import single, dataset, stack, sweep
+from gaussbean.utils import calc_utils, pre_utils, io_utils, roi_utils, moment_utils, fit_utils, integral_utils, synth_utils
+
+# the RMS sizes (x, y in pixels) of the beam in the synthetic runs, and how many of them the margins of the crops need to be for the crops to hold the whole beam
+# (with less, the projections are cut off above half of their maximum and no FWHM can be found)
+BEAM_SIGMA = (30.0, 20.0)
+MIN_MARGINS_SIGMA = 3
+
+#########################
+### START OF FUNCTIONS
+#########################
+
+def _metadata():
+    """ Returns a dictionary describing what the benchmarks were run on (commit, versions, machine), so results from different runs can be told apart. This
+    function shouldn't be called by the user at any point.
+    """
+    # the commit is only known if the package is run from a git checkout
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True,
+                                timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+
+    versions = {'python': platform.python_version(), 'numpy': np.__version__}
+    for name in ('scipy', 'PIL', 'cv2'):
+        try:
+            versions[name] = __import__(name).__version__
+        except ImportError:
+            versions[name] = None
+    return({'commit': commit, 'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'machine': platform.platform(), 'processor': platform.processor(),
+            'cpus': os.cpu_count(), 'versions': versions})
+
+########################################################
+
+def _time_call(func, repeat, mintime):
+    """ Returns the median and minimum time (in seconds) of one call of a function. The function is called once to warm up, then every repeat calls it as often
+    as it takes to run for at least mintime seconds. This function shouldn't be called by the user at any point.
+    """
+    func()
+    times = []
+    for _ in range(repeat):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            func()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= mintime:
+                break
+        times.append(elapsed/calls)
+    return(float(np.median(times)), float(np.min(times)))
+
+########################################################
+
+def _peak_memory(func):
+    """ Returns the peak memory (in bytes) allocated during one call of a function, as seen by tracemalloc (which sees every NumPy array, but not memory
+    allocated inside of OpenCV). This function shouldn't be called by the user at any point.
+    """
+    tracemalloc.start()
+    try:
+        func()
+        return(tracemalloc.get_traced_memory()[1])
+    finally:
+        tracemalloc.stop()
+
+########################################################
+
+def _import_time(module, repeat):
+    """ Returns the median time (in seconds) it takes a fresh Python process to import a module, with the time to start Python itself taken off. This function
+    shouldn't be called by the user at any point.
+    """
+    def run(code):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], check=True)
+        return(time.perf_counter() - start)
+
+    empty = np.median([run('pass') for _ in range(repeat)])
+    return(float(np.median([run('import ' + module) for _ in range(repeat)]) - empty))
+
+########################################################
+
+def _cases(data, initcrop, xmargins, ymargins):
+    """ Returns every benchmark as a (group, name, number of items handled per call, function, optional module it needs) tuple. The items are frames, except
+    for the benchmarks working on many profiles at once, where they are profiles. This function shouldn't be called by the user at any point.
+    """
+    frames, paths, stackpath, dark = data['frames'], data['paths'], data['stackpath'], data['dark']
+    frame = frames[0]
+    nframes = len(frames)
+
+    # the same crop and profiles the single image functions would work on
+    initialroi, centx, centy = single._initial_crop(frame, initcrop, None)
+    crop = initialroi.crop(centx, centy, xmargins, ymargins).view
+    smallcrop = initialroi.crop(centx, centy, min(xmargins, 100), min(ymargins, 100)).copy()
+    profile = calc_utils.find_proj_x(imgar=crop)
+    profiles = np.stack([calc_utils.find_proj_x(imgar=single.single_image_proj(xmargins, ymargins, imgar=f, initcrop=initcrop)[2]) for f in frames])
+    background = pre_utils.BackgroundModel('mean').add(dark)
+    nextpath = itertools.cycle(paths).__next__
+    nextindex = itertools.cycle(range(nframes)).__next__
+
+    cases = [
+        ('decode', 'read_image', 1, lambda: io_utils.read_image(nextpath())),
+        ('decode', 'load_frame_stack', 1, lambda: np.array(io_utils.load_frame((stackpath, nextindex())))),
+        ('filter', 'thru_median_scipy', 1, lambda: pre_utils.thru_median(3, imgar=frame, method='scipy')),
+        ('filter', 'thru_median_auto', 1, lambda: pre_utils.thru_median(3, imgar=frame, method='auto'), 'cv2'),
+        ('filter', 'thru_lowpass', 1, lambda: pre_utils.thru_lowpass(40, imgar=frame), 'cv2'),
+        ('filter', 'back_subtract', 1, lambda: pre_utils.back_subtract(origimgar=frame, backimgar=background.background)),
+        ('filter', 'background_model', nframes, lambda: background.subtract(frames)),
+        ('filter', 'crop_image', 1, lambda: pre_utils.crop_image(centx, centy, xmargins, ymargins, imgar=initialroi.view)),
+        ('centroid', 'find_centroid', 1, lambda: calc_utils.find_centroid(imgar=initialroi.view)),
+        ('centroid', 'locate_beam', 1, lambda: roi_utils.locate_beam(frame)),
+        ('centroid', 'find_moments', 1, lambda: moment_utils.find_moments(imgar=crop)),
+        ('projection', 'find_proj_x', 1, lambda: calc_utils.find_proj_x(imgar=crop)),
+        ('projection', 'find_proj_y', 1, lambda: calc_utils.find_proj_y(imgar=crop)),
+        ('projection', 'integral_image', 1, lambda: integral_utils.IntegralImage(crop)),
+        ('lineout', 'find_line_x', 1, lambda: calc_utils.find_line_x(ymargins, toavg=5, imgar=crop)),
+        ('lineout', 'find_line_y', 1, lambda: calc_utils.find_line_y(xmargins, toavg=5, imgar=crop)),
+        ('lineout', 'integral_lines_x', 1, lambda: integral_utils.IntegralImage(crop).lines_x(toavg=5)),
+        ('fwhm', 'find_FWHM', 1, lambda: calc_utils.find_FWHM(profile)),
+        ('fwhm', 'find_FWHM_batch', len(profiles), lambda: calc_utils.find_FWHM_batch(profiles)),
+        ('fwhm', 'fit_gauss1d_batch', len(profiles), lambda: fit_utils.fit_gauss1d_batch(profiles)),
+        ('fwhm', 'fit_gauss2d', 1, lambda: fit_utils.fit_gauss2d(smallcrop)),
+        ('single', 'single_image_proj', 1, lambda: single.single_image_proj(xmargins, ymargins, imgar=frames[nextindex()], initcrop=initcrop)),
+        ('single', 'single_image_proj_auto', 1, lambda: single.single_image_proj(xmargins, ymargins, imgar=frames[nextindex()], initcrop='auto')),
+        ('single', 'single_image_line', 1, lambda: single.single_image_line(xmargins, ymargins, toavg=5, imgar=frames[nextindex()], initcrop=initcrop)),
+        ('single', 'single_image_moments', 1, lambda: single.single_image_moments(xmargins, ymargins, imgar=frames[nextindex()], initcrop=initcrop)),
+        ('dataset', 'full_set_proj_paths', nframes, lambda: dataset.full_set_proj(paths, xmargins, ymargins, initcrop=initcrop)),
+        ('dataset', 'full_set_proj_stack', nframes, lambda: dataset.full_set_proj(stackpath, xmargins, ymargins, initcrop=initcrop)),
+        ('dataset', 'full_set_proj_tracked', nframes, lambda: dataset.full_set_proj(stackpath, xmargins, ymargins, initcrop=initcrop, track=True)),
+        ('dataset', 'full_set_line_stack', nframes, lambda: dataset.full_set_line(stackpath, xmargins, ymargins, initcrop=initcrop)),
+        ('dataset', 'full_set_proj_auto', nframes, lambda: dataset.full_set_proj(stackpath, xmargins, ymargins, initcrop='auto')),
+        ('dataset', 'stack_proj', nframes, lambda: stack.stack_proj(io_utils.open_stack(stackpath), xmargins, ymargins, initcrop=initcrop)),
+        ('dataset', 'stack_proj_auto', nframes, lambda: stack.stack_proj(io_utils.open_stack(stackpath), xmargins, ymargins, initcrop='auto')),
+        ('dataset', 'stack_line', nframes, lambda: stack.stack_line(io_utils.open_stack(stackpath), xmargins, ymargins, initcrop=initcrop)),
+        ('dataset', 'sweep_proj', nframes, lambda: sweep.sweep_proj(stackpath, [xmargins//2, xmargins], [ymargins//2, ymargins], fwrange=[1.2, 1.3, 1.4],
+                                                                   initcrop=initcrop)),
+    ]
+    return([case if len(case) == 5 else case + (None,) for case in cases])
+
+########################################################
+
+def run_benchmarks(frames=20, height=2048, width=2448, bitdepth=8, xmargins=300, ymargins=300, repeat=5, mintime=0.1, only=None, memory=True,
+                   imports=True, seed=0, progress=None):
+    """ Runs the benchmark suite on a synthetic run and returns the results as a dictionary (metadata, config and one entry per benchmark with the median and
+    minimum time per call, the number of items handled per second and the peak memory of one call). Benchmarks that need an optional package that isn't
+    installed (OpenCV) are not run; their entries have no numbers and say why they were skipped under 'skipped'.
+
+        Parameters
+        ----------
+        frames (OPTIONAL) : integer
+            The number of frames in the synthetic run.
+        height, width (OPTIONAL) : integer
+            The size of the frames. With the default size (the size of the camera the package was written for) the default initial crop is used; with any
+            other size, the whole frames are searched.
+        bitdepth (OPTIONAL) : integer
+            The bit depth of the frames (8 gives uint8 frames, anything more uint16).
+        xmargins, ymargins (OPTIONAL) : integer
+            The margins of the crops. These need to be at least MIN_MARGINS_SIGMA times the size of the synthetic beam (BEAM_SIGMA), so that the crops hold the
+            whole beam; smaller margins raise a ValueError.
+        repeat (OPTIONAL) : integer
+            The number of times every benchmark is timed (the median and minimum are reported).
+        mintime (OPTIONAL) : float
+            The minimum time (in seconds) every timing runs for; fast functions are called many times in a row to reach it.
+        only (OPTIONAL) : list
+            Only run the benchmarks whose "group.name" contains one of these strings.
+        memory (OPTIONAL) : boolean
+            Whether to measure the peak memory of every benchmark (which takes one more, slower, call).
+        imports (OPTIONAL) : boolean
+            Whether to measure how long importing the package takes.
+        seed (OPTIONAL) : integer
+            The seed of the synthetic run.
+        progress (OPTIONAL) : function
+            Called with every result as soon as it is done.
+    """
+    if xmargins < MIN_MARGINS_SIGMA*BEAM_SIGMA[0] or ymargins < MIN_MARGINS_SIGMA*BEAM_SIGMA[1]:
+        raise ValueError('the margins need to be at least %g x %g pixels (%d times the size of the synthetic beam), not %g x %g' %
+                         (MIN_MARGINS_SIGMA*BEAM_SIGMA[0], MIN_MARGINS_SIGMA*BEAM_SIGMA[1], MIN_MARGINS_SIGMA, xmargins, ymargins))
+    config = {'frames': frames, 'height': height, 'width': width, 'bitdepth': bitdepth, 'xmargins': xmargins, 'ymargins': ymargins, 'repeat': repeat,
+              'mintime': mintime, 'seed': seed}
+    initcrop = single.INITIAL_CROP if (height, width) == (2048, 2448) else None
+    results = []
+
+    def record(result):
+        results.append(result)
+        if progress is not None:
+            progress(result)
+
+    with tempfile.TemporaryDirectory(prefix='gaussbean-bench-') as workdir:
+        # a drifting, jittering run with a few hot pixels, written out as image files and as a packed stack, plus some dark frames
+        runframes, _ = synth_utils.beam_stack(frames, height, width, sigx=BEAM_SIGMA[0], sigy=BEAM_SIGMA[1], tilt=0.2, hotpixels=20, bitdepth=bitdepth, drift=(0.5, 0.2),
+                                              jitter=2, sizejitter=0.02, seed=seed)
+        dark, _ = synth_utils.beam_stack(4, height, width, amplitude=0, bitdepth=bitdepth, seed=seed + 1)
+        paths = synth_utils.save_frames(runframes, os.path.join(workdir, 'frames'))
+        stackpath = os.path.join(workdir, 'run.npy')
+        io_utils.pack_stack(paths, stackpath)
+        data = {'frames': runframes, 'paths': paths, 'stackpath': stackpath, 'dark': dark}
+
+        for group, name, items, func, needs in _cases(data, initcrop, xmargins, ymargins):
+            fullname = group + '.' + name
+            if only and not any(text in fullname for text in only):
+                continue
+
+            # benchmarks of optional packages that aren't installed are recorded as skipped, so the rest of the suite still runs
+            if needs is not None and find_spec(needs) is None:
+                record({'name': fullname, 'group': group, 'items': items, 'median': None, 'min': None, 'rate': None, 'peak_mb': None,
+                        'skipped': needs + ' is not installed'})
+                continue
+            median, minimum = _time_call(func, repeat, mintime)
+            record({'name': fullname, 'group': group, 'items': items, 'median': median, 'min': minimum, 'rate': items/median,
+                    'peak_mb': _peak_memory(func)/2**20 if memory else None})
+
+    # importing the package is timed in fresh processes
+    if imports and (not only or any(text in 'import.gaussbean' for text in only)):
+        median = _import_time('gaussbean.analysis.dataset', repeat)
+        record({'name': 'import.gaussbean', 'group': 'import', 'items': 1, 'median': median, 'min': median, 'rate': 1/median, 'peak_mb': None})
+
+    return({'metadata': _metadata(), 'config': config, 'results': results})
+
+########################################################
+
+def compare(old, new):
+    """ Returns a list of (name, old rate, new rate, speedup) for every benchmark in both sets of results (speedup above one means the new results are faster).
+    Benchmarks skipped in either set are left out.
+
+        Parameters
+        ----------
+        old : dictionary
+            The results of run_benchmarks() (or a JSON file written by the benchmark command, loaded with json.load()) to compare against.
+        new : dictionary
+            The new results.
+    """
+    oldrates = {result['name']: result['rate'] for result in old['results'] if result['rate'] is not None}
+    return([(result['name'], oldrates[result['name']], result['rate'], result['rate']/oldrates[result['name']]) for result in new['results']
+            if result['name'] in oldrates and result['rate'] is not None])
+
+########################################################
+
+def _format(result):
+    """ Returns one result as a line of the table printed by the benchmark command. This function shouldn't be called by the user at any point.
+    """
+    if result.get('skipped'):
+        return('%-36s skipped (%s)' % (result['name'], result['skipped']))
+    memory = '' if result['peak_mb'] is None else '%9.1f MB' % result['peak_mb']
+    return('%-36s %12.3f ms %12.1f /s%s' % (result['name'], 1e3*result['median'], result['rate'], memory))
+
+########################################################
+
+def build_parser():
+    """ Returns the argument parser of the "gaussbean-bench" command.
+    """
+    parser = argparse.ArgumentParser(prog='gaussbean-bench', description='Time every stage of the GaussBean analysis on synthetic beam frames.')
+    parser.add_argument('--frames', type=int, default=20, help='number of frames in the synthetic run (default: 20)')
+    parser.add_argument('--size', type=int, nargs=2, default=(2048, 2448), metavar=('HEIGHT', 'WIDTH'), help='size of the frames (default: 2048 2448)')
+    parser.add_argument('--bitdepth', type=int, default=8, help='bit depth of the frames (default: 8)')
+    parser.add_argument('--margins', type=int, nargs=2, default=(300, 300), metavar=('XMARGINS', 'YMARGINS'), help='margins of the crops (default: 300 300)')
+    parser.add_argument('--repeat', type=int, default=5, help='number of timings of every benchmark (default: 5)')
+    parser.add_argument('--mintime', type=float, default=0.1, help='minimum length of every timing in seconds (default: 0.1)')
+    parser.add_argument('--only', action='append', metavar='TEXT', help='only run benchmarks whose name contains this (can be given more than once)')
+    parser.add_argument('--no-memory', action='store_true', help="don't measure the peak memory of every benchmark")
+    parser.add_argument('--no-import', action='store_true', help="don't time importing the package")
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic run (default: 0)')
+    parser.add_argument('--json', metavar='PATH', help='write the results to this JSON file')
+    parser.add_argument('--compare', metavar='PATH', help='compare the results against a JSON file written by an earlier run')
+    return(parser)
+
+########################################################
+
+def main(argv=None):
+    """ Runs the "gaussbean-bench" command. Returns the exit code.
+
+        Parameters
+        ----------
+        argv (OPTIONAL) : list
+            The command line arguments (default is the arguments the program was started with).
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.margins[0] < MIN_MARGINS_SIGMA*BEAM_SIGMA[0] or args.margins[1] < MIN_MARGINS_SIGMA*BEAM_SIGMA[1]:
+        parser.error('--margins need to be at least %g %g (%d times the size of the synthetic beam)' % (MIN_MARGINS_SIGMA*BEAM_SIGMA[0],
+                     MIN_MARGINS_SIGMA*BEAM_SIGMA[1], MIN_MARGINS_SIGMA))
+    print('%-36s %15s %15s %12s' % ('benchmark', 'time per call', 'items per s', 'peak memory'))
+    results = run_benchmarks(frames=args.frames, height=args.size[0], width=args.size[1], bitdepth=args.bitdepth, xmargins=args.margins[0],
+                             ymargins=args.margins[1], repeat=args.repeat, mintime=args.mintime, only=args.only, memory=not args.no_memory,
+                             imports=not args.no_import, seed=args.seed, progress=lambda result: print(_format(result), flush=True))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=1)
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        print('\n%-36s %12s %12s %9s   (against %s)' % ('benchmark', 'old /s', 'new /s', 'speedup', old['metadata'].get('commit') or args.compare))
+        if old['config'] != results['config']:
+            print('(the two runs used different settings, so the numbers are not directly comparable)')
+        for name, oldrate, newrate, speedup in compare(old, results):
+            print('%-36s %12.1f %12.1f %8.2fx' % (name, oldrate, newrate, speedup))
+    return(0)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Fri Oct  16 14:00:00 2026
+
+@author: leahghartman
+
+Description : The "gaussbean" command, which runs the analysis of a whole directory of shots without a notebook and writes the results to a file.
+"""
+# import random needed packages that should already be installed
+import os
+import sys
+import csv
+import glob
+import time
+import argparse
+import numpy as np
+from functools import partial
+from importlib.util import find_spec
+from PIL import UnidentifiedImageError
+
+# import from other modules in the package
+from gaussbean.analysis import single, dataset, watch
+from gaussbean.utils import pre_utils, io_utils, stats_utils, profile_utils
+
+#########################
+### START OF FUNCTIONS
+#########################
+
+def find_images(target, pattern='*.tif*'):
+    """ Returns a numerically sorted list of the images in a directory or matching a glob.
+
+        Parameters
+        ----------
+        target : string
+            A directory (every file in it matching the pattern is used) or a glob such as "run5/shot_*.tiff".
+        pattern (OPTIONAL) : string
+            The pattern the files in a directory need to match. Not used if target is a glob.
+    """
+    if os.path.isdir(target):
+        target = os.path.join(target, pattern)
+    return(sorted(glob.glob(target), key=io_utils.natural_key))
+
+########################################################
+
+def _analyze_source(source, mode, xmargins, ymargins, xpixel, ypixel, toavg, fwrange, mediansize, repeatamount, radius, initcrop=single.INITIAL_CROP):
+    """ Loads, filters and analyzes ONE frame for the command line runner. Frames where no FWHM can be found give NaN, and images that can't be read give None,
+    instead of stopping the whole run. This function shouldn't be called by the user at any point.
+    """
+    try:
+        imgar = io_utils.load_frame(source)
+    except (OSError, UnidentifiedImageError, ValueError):
+        # PIL raises OSError (UnidentifiedImageError) for files that aren't images, and OSError or ValueError for truncated ones
+        return(None, None, None)
+
+    # run the image through the filters the user asked for
+    if mediansize > 0:
+        imgar = pre_utils.thru_median(mediansize, repeatamount=repeatamount, imgar=imgar)
+    if radius > 0:
+        imgar = pre_utils.thru_lowpass(radius, imgar=imgar)
+
+    try:
+        if mode == 'proj':
+            xFWHM, yFWHM, _ = single.single_image_proj(xmargins, ymargins, fwrange=fwrange, imgar=imgar, initcrop=initcrop)
+        else:
+            xFWHM, yFWHM, _ = single.single_image_line(xmargins, ymargins, xpixel=xpixel, ypixel=ypixel, toavg=toavg, fwrange=fwrange, imgar=imgar,
+                                                       initcrop=initcrop)
+    except IndexError:
+        xFWHM, yFWHM = np.nan, np.nan
+
+    # the cropped images are never written out, so don't send them back from the worker processes
+    return(xFWHM, yFWHM, None)
+
+########################################################
+
+def _check_format(outpath):
+    """ Returns an error message if the output file can't be written (unknown extension, or a missing optional package), or None if it can. This is checked
+    before the run starts, so a long run never fails at the very end. This function shouldn't be called by the user at any point.
+    """
+    if outpath.endswith('.csv'):
+        return(None)
+    if outpath.endswith('.parquet'):
+        if find_spec('pandas') is None:
+            return('writing Parquet files needs pandas (and pyarrow or fastparquet) to be installed')
+        return(None)
+    if outpath.endswith(('.h5', '.hdf5')):
+        if find_spec('h5py') is None:
+            return('writing HDF5 files needs h5py to be installed')
+        return(None)
+    return('unknown output format for ' + outpath + ' (use .csv, .parquet, .h5 or .hdf5)')
+
+########################################################
+
+def _write_table(outpath, names, rows):
+    """ Writes the rows of results to a Parquet or HDF5 file (chosen by the extension of the output path). This function shouldn't be called by the user at any
+    point.
+    """
+    columns = {'frame': np.array([r[0] for r in rows], dtype=np.int64), 'filename': np.array([r[1] for r in rows], dtype=object),
+               'xFWHM': np.array([r[2] for r in rows], dtype=np.float64), 'yFWHM': np.array([r[3] for r in rows], dtype=np.float64)}
+
+    if outpath.endswith('.parquet'):
+        import pandas as pd
+        pd.DataFrame(columns, columns=names).to_parquet(outpath)
+    else:
+        import h5py
+        with h5py.File(outpath, 'w') as f:
+            for name in names:
+                data = columns[name].astype(h5py.string_dtype()) if name == 'filename' else columns[name]
+                f.create_dataset(name, data=data)
+
+########################################################
+
+def _watch(args, initcrop):
+    """ Runs the "gaussbean --watch" command: analyzes every new image in the target directory as soon as it is complete, until interrupted. Returns the exit
+    code. This function shouldn't be called by the user at any point.
+    """
+    if not os.path.isdir(args.target) or not args.output.endswith('.csv'):
+        print('gaussbean: --watch needs a directory to watch and a .csv output file', file=sys.stderr)
+        return(1)
+    if args.median > 0 or args.lowpass > 0:
+        print('gaussbean: the --median and --lowpass filters are not available with --watch', file=sys.stderr)
+        return(1)
+
+    params = dict(fwrange=args.fwrange, initcrop=initcrop)
+    if args.mode == 'line':
+        params.update(xpixel=args.xpixel, ypixel=args.ypixel, toavg=args.toavg)
+
+    # report the latest frame and the running numbers as the frames come in
+    def report(result):
+        if not args.quiet:
+            name, xFWHM, yFWHM, latency = result
+            print('\r%s: xFWHM %.2f, yFWHM %.2f (%.0f ms) | %d frames, mean xFWHM %.2f, yFWHM %.2f   ' % (name, xFWHM, yFWHM, 1e3*latency, live.stats.frames,
+                  live.stats['xFWHM'].mean, live.stats['yFWHM'].mean), end='', file=sys.stderr, flush=True)
+
+    with watch.LiveWatch(args.target, args.xmargins, args.ymargins, mode=args.mode, output=args.output, pattern=args.pattern, **params) as live:
+        if not args.quiet:
+            print('watching %s (%s), results in %s' % (args.target, 'inotify' if live.inotify else 'polling', args.output), file=sys.stderr)
+        live.run(duration=args.duration, callback=report)
+    if not args.quiet:
+        print('\ndone: %d frames, %d skipped' % (live.stats.frames, live.skipped), file=sys.stderr)
+    return(0)
+
+########################################################
+
+def build_parser():
+    """ Returns the argument parser of the "gaussbean" command.
+    """
+    parser = argparse.ArgumentParser(prog='gaussbean', description='Run the GaussBean FWHM analysis over a whole directory (or glob) of shots.')
+    parser.add_argument('target', help='directory of images, or a glob such as "run5/*.tiff"')
+    parser.add_argument('-o', '--output', required=True, help='output file; the format is chosen by the extension (.csv, .parquet, .h5/.hdf5)')
+    parser.add_argument('--mode', choices=['proj', 'line'], default='proj', help='use projections (default) or lineouts')
+    parser.add_argument('--pattern', default='*.tif*', help='pattern of the image files when target is a directory (default: *.tif*)')
+    parser.add_argument('--xmargins', type=int, required=True, help='pixels kept on each side of the centroid in x')
+    parser.add_argument('--ymargins', type=int, required=True, help='pixels kept on each side of the centroid in y')
+    parser.add_argument('--fwrange', type=float, default=1.3, help='range used to pick the most prominent peak (default: 1.3)')
+    parser.add_argument('--xpixel', type=int, default=0, help='column of the y-lineout (line mode; default: centroid)')
+    parser.add_argument('--ypixel', type=int, default=0, help='row of the x-lineout (line mode; default: centroid)')
+    parser.add_argument('--toavg', type=int, default=0, help='lineouts added on each side of the lineout (line mode)')
+    geometry = parser.add_mutually_exclusive_group()
+    geometry.add_argument('--initcrop', type=int, nargs=4, metavar=('XPOINT', 'YPOINT', 'XMARGINS', 'YMARGINS'),
+                          help='initial crop that cuts out the dead pixels of the camera (default: %d %d %d %d)' % single.INITIAL_CROP)
+    geometry.add_argument('--auto-roi', action='store_true', help='find the beam anywhere in each image instead of using an initial crop')
+    parser.add_argument('--median', type=int, default=0, metavar='SIZE', help='run every image through a median filter of this size first')
+    parser.add_argument('--median-repeat', type=int, default=0, metavar='N', help='number of times the median filter is run')
+    parser.add_argument('--lowpass', type=int, default=0, metavar='RADIUS', help='run every image through a low-pass filter of this radius first')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: every core)')
+    parser.add_argument('--chunksize', type=int, default=8, help='images sent to a worker at a time (default: 8)')
+    parser.add_argument('--watch', action='store_true', help='keep watching the target directory and analyze every new image as soon as it is complete '
+                        '(the results are appended to a .csv output); stop with Ctrl-C')
+    parser.add_argument('--duration', type=float, default=None, help='with --watch, stop after this many seconds')
+    parser.add_argument('--profile', action='store_true', help='time every stage of the analysis and print a table of the times at the end')
+    parser.add_argument('--trace', metavar='PATH', help='keep every call of every stage and write them to this Chrome trace JSON file (open it in '
+                        'chrome://tracing or https://ui.perfetto.dev)')
+    parser.add_argument('-q', '--quiet', action='store_true', help="don't report progress")
+    return(parser)
+
+########################################################
+
+def main(argv=None):
+    """ Runs the "gaussbean" command. Returns the exit code (1 if the run couldn't start, or if any image couldn't be read and was skipped).
+
+        Parameters
+        ----------
+        argv (OPTIONAL) : list
+            The command line arguments (default is the arguments the program was started with).
+    """
+    args = build_parser().parse_args(argv)
+    initcrop = 'auto' if args.auto_roi else tuple(args.initcrop) if args.initcrop else single.INITIAL_CROP
+    if args.watch:
+        return(_watch(args, initcrop))
+
+    imglist = find_images(args.target, args.pattern)
+    if len(imglist) == 0:
+        print('gaussbean: no images found for ' + args.target, file=sys.stderr)
+        return(1)
+
+    outpath = args.output
+    error = _check_format(outpath)
+    if error is not None:
+        print('gaussbean: ' + error, file=sys.stderr)
+        return(1)
+
+    func = partial(_analyze_source, mode=args.mode, xmargins=args.xmargins, ymargins=args.ymargins, xpixel=args.xpixel, ypixel=args.ypixel,
+                   toavg=args.toavg, fwrange=args.fwrange, mediansize=args.median, repeatamount=args.median_repeat, radius=args.lowpass,
+                   initcrop=initcrop)
+    names = ['frame', 'filename', 'xFWHM', 'yFWHM']
+
+    # CSV rows are written as soon as they come in; the other formats are written once the run is done
+    csvfile = open(outpath, 'w', newline='') if outpath.endswith('.csv') else None
+    writer = csv.writer(csvfile) if csvfile is not None else None
+    if writer is not None:
+        writer.writerow(names)
+    rows = []
+
+    # keep running statistics of the results, so the summary at the end doesn't need every result kept around
+    stats = stats_utils.RunStats(('xFWHM', 'yFWHM'))
+    unreadable = []
+    start = lastreport = time.perf_counter()
+    if args.profile or args.trace:
+        profile_utils.reset()
+        profile_utils.enable(trace=args.trace is not None)
+    try:
+        for index, xFWHM, yFWHM, _ in dataset.iter_frames(func, imglist, workers=args.workers, chunksize=args.chunksize, cropevery=0):
+            # images that can't be read (corrupt, truncated or not images at all) are reported and left out of the results
+            if xFWHM is None:
+                unreadable.append(imglist[index])
+                print('\ngaussbean: could not read ' + imglist[index] + ', skipping it', file=sys.stderr)
+            else:
+                row = (index, imglist[index], xFWHM, yFWHM)
+                stats.add(xFWHM=xFWHM, yFWHM=yFWHM)
+                if writer is not None:
+                    writer.writerow(row)
+                else:
+                    rows.append(row)
+
+            # report the progress and throughput about once a second
+            now = time.perf_counter()
+            if not args.quiet and (now - lastreport > 1 or index == len(imglist) - 1):
+                lastreport = now
+                print('\r%d/%d frames (%.1f frames/s)' % (index+1, len(imglist), (index+1)/(now-start)), end='', file=sys.stderr, flush=True)
+    finally:
+        profile_utils.disable()
+        if csvfile is not None:
+            csvfile.close()
+
+    if writer is None:
+        _write_table(outpath, names, rows)
+
+    if not args.quiet:
+        elapsed = time.perf_counter() - start
+        print('\ndone: %d frames in %.1f s (%.1f frames/s), %d without a FWHM, %d unreadable, results in %s' % (len(imglist), elapsed,
+              len(imglist)/elapsed, stats['xFWHM'].failed, len(unreadable), outpath), file=sys.stderr)
+        for name, summary in stats.summary().items():
+            print('%s: mean %.3f, std %.3f, min %.3f, median %.3f, max %.3f' % (name, summary['mean'], summary['std'], summary['min'], summary['p50'],
+                  summary['max']), file=sys.stderr)
+    if args.profile:
+        print('\n' + profile_utils.summary(), file=sys.stderr)
+    if args.trace:
+        profile_utils.write_trace(args.trace)
+
+    # the run still counts as failed if any image couldn't be read, so scripts notice
+    if unreadable:
+        print('gaussbean: %d image(s) could not be read: %s' % (len(unreadable), ', '.join(unreadable)), file=sys.stderr)
+        return(1)
+    return(0)
+
+if __name__ == '__main__':
+    sys.exit(main())
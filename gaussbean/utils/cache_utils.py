@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Fri Oct  16 12:00:00 2026
+
+@author: leahghartman
+
+Description : A file for an on-disk cache of per-frame analysis results, so that rerunning an analysis on the same images doesn't redo work that was already done.
+"""
+# import random needed packages that should already be installed
+import os
+import json
+import time
+import hashlib
+import tempfile
+import numpy as np
+
+# the version of the analysis the cached results come from. It is part of every key, so it NEEDS to be bumped whenever a change to the package changes what any
+# cached stage gives (entries from older versions are then never used again, and are evicted like any other unused entries)
+CACHE_VERSION = 1
+
+#########################
+### START OF CLASSES
+#########################
+
+class ResultCache:
+    """ An opt-in, on-disk cache of per-frame results. Every entry is stored under a key made from WHICH frame it belongs to (the path of the image together with
+    its modification time and size, or a hash of its contents) and WHAT was computed (a stage name and every parameter that went into it). Changing an image or any
+    parameter gives a new key, and so does a new version of the analysis itself (CACHE_VERSION), so stale results are never used. When the cache grows past
+    maxbytes, the least recently used entries are deleted.
+
+    Entries are written atomically, so one cache directory can be shared by several worker processes. The hits and misses of the cache are counted in .hits and
+    .misses (the dataset functions add the counts of their worker processes to them as well).
+
+        Parameters
+        ----------
+        directory : string
+            The directory the cache is stored in (it is created if it doesn't exist).
+        maxbytes (OPTIONAL) : integer
+            The maximum size of the cache on disk in bytes. Default is 1 GB.
+        keepcrops (OPTIONAL) : boolean
+            Whether the cropped images are stored along with the results. Without them, the dataset functions give None as the cropped image of every frame
+            (whether it was served from the cache or not).
+        hashcontent (OPTIONAL) : boolean
+            If True, image files are identified by a hash of their contents instead of their modification time and size. This is slower (every file is read) but
+            still skips decoding and analysis, and survives files being copied or touched.
+    """
+    def __init__(self, directory, maxbytes=2**30, keepcrops=False, hashcontent=False):
+        self.directory = os.path.abspath(directory)
+        self.maxbytes = maxbytes
+        self.keepcrops = keepcrops
+        self.hashcontent = hashcontent
+        self.hits = 0
+        self.misses = 0
+        self._written = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def identity(self, source):
+        """ Returns a string identifying the contents of a frame: an image path, a (stack path, index) pair or an array (see io_utils.frame_sources()).
+
+            Parameters
+            ----------
+            source : string, tuple or array
+                The frame to identify.
+        """
+        # arrays can only be identified by their contents
+        if isinstance(source, np.ndarray):
+            return('array:' + str(source.shape) + source.dtype.str + ':' + hashlib.sha1(np.ascontiguousarray(source).data).hexdigest())
+
+        # frames of packed stacks are identified by the stack file and their index in it
+        if isinstance(source, tuple):
+            stackpath, index = source
+            return(self._file_identity(stackpath) + ':' + str(index))
+
+        return(self._file_identity(source))
+
+    def _file_identity(self, path):
+        """ Returns a string identifying the contents of ONE file, either from its path, modification time and size or from a hash of its contents.
+        """
+        path = os.path.abspath(os.fspath(path))
+        if self.hashcontent:
+            with open(path, 'rb') as f:
+                return('file:' + hashlib.sha1(f.read()).hexdigest())
+        stat = os.stat(path)
+        return('file:' + path + ':' + str(stat.st_mtime_ns) + ':' + str(stat.st_size))
+
+    def key(self, identity, stage, **params):
+        """ Returns the key of a cache entry.
+
+            Parameters
+            ----------
+            identity : string
+                The identity of the frame (from identity()).
+            stage : string
+                The name of whatever was computed (for example "centroid" or "proj").
+            params : keyword arguments
+                Every parameter that went into the computation.
+        """
+        text = json.dumps([CACHE_VERSION, identity, stage, sorted((k, repr(v)) for k, v in params.items())])
+        return(hashlib.sha1(text.encode()).hexdigest())
+
+    def _path(self, key):
+        return(os.path.join(self.directory, key + '.npz'))
+
+    def get(self, key):
+        """ Returns the dictionary of arrays stored under a key, or None if there is no such entry.
+
+            Parameters
+            ----------
+            key : string
+                The key of the entry (from key()).
+        """
+        path = self._path(key)
+        try:
+            with np.load(path) as entry:
+                result = {name: entry[name] for name in entry.files}
+        except (OSError, ValueError, EOFError):
+            self.misses += 1
+            return(None)
+
+        # mark the entry as recently used, so it is the last to be evicted
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return(result)
+
+    def put(self, key, **arrays):
+        """ Stores arrays (given as keyword arguments) under a key.
+
+            Parameters
+            ----------
+            key : string
+                The key of the entry (from key()).
+            arrays : keyword arguments
+                The arrays to store.
+        """
+        # write to a temporary file first and then move it into place, so that other processes never see half of an entry (the temporary file gets a unique
+        # name, so threads and processes writing the same entry at the same time don't write into each other's file)
+        path = self._path(key)
+        with tempfile.NamedTemporaryFile(dir=self.directory, prefix=key + '.', suffix='.tmp', delete=False) as f:
+            tmppath = f.name
+            try:
+                np.savez(f, **arrays)
+            except BaseException:
+                f.close()
+                os.remove(tmppath)
+                raise
+        os.replace(tmppath, path)
+
+        # only look through the whole cache directory once in a while (after roughly a tenth of the cache has been written)
+        self._written += os.path.getsize(path)
+        if self._written > self.maxbytes/10:
+            self.evict()
+
+    def evict(self, tmpage=3600):
+        """ Deletes the least recently used entries until the cache is no bigger than maxbytes, along with any temporary files left behind by writes that were
+        interrupted.
+
+            Parameters
+            ----------
+            tmpage (OPTIONAL) : float
+                How old (in seconds) a temporary file needs to be before it is deleted, so the entries other processes are writing right now are left alone.
+        """
+        self._written = 0
+        entries = []
+        now = time.time()
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith('.tmp'):
+                    try:
+                        if now - entry.stat().st_mtime > tmpage:
+                            os.remove(entry.path)
+                    except OSError:
+                        pass
+                elif entry.name.endswith('.npz'):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        # delete the oldest entries first
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.maxbytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        """ Deletes every entry in the cache, and every temporary file left behind by writes that were interrupted.
+        """
+        for name in os.listdir(self.directory):
+            if name.endswith('.npz') or name.endswith('.tmp'):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
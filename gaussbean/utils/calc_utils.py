@@ -7,12 +7,12 @@ Created on Fri Jan  26 01:00:00 2024
 
 Description : A file for calculations/functions used in both single-image and full-dataset analysis.
 """
-# import random needed packages that should already be installed
+# import random needed packages that should already be installed (scipy.signal takes a long time to import and is only needed by find_FWHM(), so it is imported
+# there instead; the vectorized functions don't need it at all)
 import numpy as np
-import matplotlib.pyplot as plt
-from PIL import Image
-from mpl_toolkits.axes_grid1 import make_axes_locatable
-from scipy.signal import peak_widths, find_peaks
+
+# import from other modules in the package
+from gaussbean.utils import io_utils, profile_utils
 
 #########################
 ### START OF FUNCTIONS
@@ -28,15 +28,54 @@ def check_array(imgpath, imgar):
         imgar : array
             The image array that the user wants to use.
     """
-    # if the length of the image array is empty (the user didn't want to use an array), we use the image path instead
+    # if the length of the image array is empty (the user didn't want to use an array), we use the image path instead (read the same way as every frame of a
+    # dataset, so 16-bit images keep all of their bits)
     if len(imgar) == 0:
-        return(np.array(Image.open(imgpath).convert("L")))
+        return(io_utils.read_image(imgpath))
     # if the length of the image array isn't zero, the user wants to use an array instead of the image path, so we return the array that was input
     else:
         return(imgar)
 
 ########################################################
 
+def accumulator_dtype(dtype, count):
+    """ Returns the dtype to add up count values of an image of the given dtype in (for projections and lineouts): the narrowest integer type that can hold the
+    largest possible sum (32 bits whenever it fits, which covers uint8 and uint16 images of any camera, instead of the 64 bits NumPy uses by default and
+    which are much slower to add up), or at least float32 for floating-point images.
+
+        Parameters
+        ----------
+        dtype : dtype
+            The dtype of the image.
+        count : integer
+            The number of values added together (for example the height of the image for a projection along the x-axis).
+    """
+    dtype = np.dtype(dtype)
+    if dtype.kind == 'b':
+        dtype = np.dtype(np.uint8)
+    if dtype.kind == 'u':
+        return(np.dtype(np.uint32) if np.iinfo(dtype).max*count <= np.iinfo(np.uint32).max else np.dtype(np.uint64))
+    if dtype.kind == 'i':
+        return(np.dtype(np.int32) if -np.iinfo(dtype).min*count <= np.iinfo(np.int32).max else np.dtype(np.int64))
+    return(np.promote_types(dtype, np.float32))
+
+########################################################
+
+def project(arrayimg, axis):
+    """ Returns the sum of an image (or of every image in a stack) along one axis, added up in the dtype chosen by accumulator_dtype().
+
+        Parameters
+        ----------
+        arrayimg : array
+            The image array (or stack of images).
+        axis : integer
+            The axis that is summed over.
+    """
+    return(arrayimg.sum(axis=axis, dtype=accumulator_dtype(arrayimg.dtype, arrayimg.shape[axis])))
+
+########################################################
+
+@profile_utils.timed()
 def find_FWHM(imgdata, fwhmrange=1.3):
     """ Returns the Full-Width at Half-Maximum (FWHM) of a set of data. This function uses the most prominent peak to find the FWHM.
 
@@ -47,20 +86,99 @@ def find_FWHM(imgdata, fwhmrange=1.3):
         fwhmrange (OPTIONAL) : float
             Number which specifies the range the algorithm should look around the maximum of the data to find the "most prominent" peak to use when calculating the FWHM.
     """
+    # scipy.signal is only imported the first time it is needed (after that, this is just a lookup)
+    from scipy.signal import peak_widths, find_peaks
+
     # find the most prominent peak (maximum of the data)
     peakmax = np.max(imgdata)
 
     # use the maximum value (coresponding to the most prominent peak) to find the peak of the curve to find the FWHM of
-    peaks, _ = find_peaks(imgdata, prominence=(peakmax/fwhmrange, peakmax*fwhmrange))
+    with profile_utils.stage('calc_utils.find_peaks'):
+        peaks, _ = find_peaks(imgdata, prominence=(peakmax/fwhmrange, peakmax*fwhmrange))
 
     # find the width (FWHM) of the most prominent peak
-    results_half = peak_widths(imgdata, peaks, rel_height=0.5)
+    with profile_utils.stage('calc_utils.peak_widths'):
+        results_half = peak_widths(imgdata, peaks, rel_height=0.5)
 
     # return the FWHM calculation
     return(results_half[0])
 
 ########################################################
 
+@profile_utils.timed()
+def find_FWHM_batch(profiles, fwhmrange=1.3):
+    """ Returns the Full-Width at Half-Maximum (FWHM) of EVERY row of a 2D array of projections or lineouts at once, as a 1D array with one width per row. This
+    is the vectorized version of find_FWHM()[0]: it measures the highest peak of each row in the same way as scipy's peak_widths() (half of the peak's
+    prominence, with linear interpolation between the samples on either side), but uses a handful of NumPy operations for the whole array instead of scipy
+    calls on every row. find_FWHM()[0] is the LEFTMOST peak that passes the prominence test, so the few rows where another peak to the left of the highest one
+    might pass it too (or where the highest peak doesn't pass it) are handed to find_FWHM() itself, and every row gets the same width either way. Rows where
+    no peak can be measured get NaN.
+
+        Parameters
+        ----------
+        profiles : array
+            2D array of shape (number of profiles, length of each profile), for example the x-projections of every image in a dataset stacked together. A
+            single 1D profile is also accepted.
+        fwhmrange (OPTIONAL) : float
+            Number which specifies the range the peak's prominence has to fall in (relative to the maximum of the row) for the peak to count, exactly like in
+            find_FWHM().
+    """
+    # make sure we are working with a 2D array of floats (one profile per row)
+    data = np.atleast_2d(np.asarray(profiles, dtype=np.float64))
+    rows = np.arange(data.shape[0])
+    idx = np.arange(data.shape[1])
+
+    # find the most prominent peak (maximum) of every row
+    peak = np.argmax(data, axis=1)
+    peakmax = data[rows, peak]
+
+    # the prominence of the peak is measured from the HIGHER of the lowest points on either side of it (the peak itself counts, so edge peaks get zero)
+    before = idx <= peak[:, np.newaxis]
+    after = idx >= peak[:, np.newaxis]
+    leftmin = np.where(before, data, np.inf).min(axis=1)
+    rightmin = np.where(after, data, np.inf).min(axis=1)
+    prominence = peakmax - np.maximum(leftmin, rightmin)
+
+    # the peak only counts if its prominence is in the same range find_FWHM() asks find_peaks() for
+    valid = (prominence > 0) & (prominence >= peakmax/fwhmrange) & (prominence <= peakmax*fwhmrange)
+
+    # the height the width is measured at is halfway down the prominence of the peak
+    height = peakmax - 0.5*prominence
+    below = data <= height[:, np.newaxis]
+
+    # find the last sample at or below the half-height on the left of the peak and the first one on the right of the peak
+    left = np.where(below & before, idx, -1).max(axis=1)
+    right = np.where(below & after, idx, data.shape[1]).min(axis=1)
+    valid &= (left >= 0) & (right < data.shape[1])
+    left = np.clip(left, 0, data.shape[1]-2)
+    right = np.clip(right, 1, data.shape[1]-1)
+
+    # linearly interpolate between the samples on either side of each crossing to get the exact (sub-pixel) crossing points
+    with np.errstate(divide='ignore', invalid='ignore'):
+        leftstep = data[rows, left+1] - data[rows, left]
+        rightstep = data[rows, right-1] - data[rows, right]
+        leftcross = left + np.where(leftstep != 0, (height - data[rows, left])/leftstep, 0)
+        rightcross = right - np.where(rightstep != 0, (height - data[rows, right])/rightstep, 0)
+
+    widths = np.where(valid, rightcross - leftcross, np.nan)
+
+    # the prominence of any other peak to the left of the highest one is at most its height above the lowest point between it and the highest peak; the rows
+    # where that bound lets some peak pass the prominence test (or where the highest peak didn't pass it) are measured by find_FWHM() instead
+    between = np.where(idx <= peak[:, np.newaxis], data, np.inf)
+    lowest = np.minimum.accumulate(between[:, ::-1], axis=1)[:, ::-1]
+    localmax = np.zeros(data.shape, dtype=bool)
+    localmax[:, 1:-1] = (data[:, 1:-1] > data[:, :-2]) & (data[:, 1:-1] >= data[:, 2:])
+    rivals = localmax & (idx < peak[:, np.newaxis]) & (data - lowest >= (peakmax/fwhmrange)[:, np.newaxis])
+    for row in np.flatnonzero(~valid | rivals.any(axis=1)):
+        rowwidths = find_FWHM(data[row], fwhmrange=fwhmrange)
+        widths[row] = rowwidths[0] if len(rowwidths) > 0 else np.nan
+
+    # return the width of every row, with NaN wherever a peak couldn't be measured
+    return(widths)
+
+########################################################
+
+@profile_utils.timed()
 def find_centroid(imgpath='', imgar=[]):
     """ Returns x- and y-coordinate of the centroid based on the MAXIMUM INTENSITY of the image in each transverse dimension.
 
@@ -75,13 +193,14 @@ def find_centroid(imgpath='', imgar=[]):
     arrayimg = check_array(imgpath, imgar)
 
     # find the x- and y-coordinates of the centroid by doing a projection of the entire image and finding the maximum value in the array for each dimension
-    centx, centy = np.argmax(arrayimg.sum(axis=0)), np.argmax(arrayimg.sum(axis=1))
+    centx, centy = np.argmax(project(arrayimg, 0)), np.argmax(project(arrayimg, 1))
 
     # return the centroid's coordinates
     return(centx, centy)
 
 ########################################################
 
+@profile_utils.timed()
 def find_proj_x(imgpath='', imgar=[]):
     """ Returns the projection of an image along the x-axis.
 
@@ -96,10 +215,11 @@ def find_proj_x(imgpath='', imgar=[]):
     arrayimg = check_array(imgpath, imgar)
 
     # return the summation of EACH column (so, this is the projection along the x-axis)
-    return(arrayimg.sum(axis=0))
+    return(project(arrayimg, 0))
 
 ########################################################
 
+@profile_utils.timed()
 def find_proj_y(imgpath='', imgar=[]):
     """ Returns the projection of an image along the y-axis.
 
@@ -114,10 +234,11 @@ def find_proj_y(imgpath='', imgar=[]):
     arrayimg = check_array(imgpath, imgar)
     
     # return the summation of EACH row (so, this is the projection along the y-axis)
-    return(arrayimg.sum(axis=1))
+    return(project(arrayimg, 1))
 
 ########################################################
 
+@profile_utils.timed()
 def find_line_x(ypixel, toavg=0, imgpath='', imgar=[]):
     """ Returns the lineout of an image along the x-axis and averages multiple columns of pixels if the user wants.
 
@@ -137,18 +258,13 @@ def find_line_x(ypixel, toavg=0, imgpath='', imgar=[]):
     # set the array of the image to whatever the user specifies (either based on the image path OR an array that the user inputs)
     arrayimg = check_array(imgpath, imgar)
 
-    # make a while loop that appends the all the lineouts the user wants to a list
-    lineoutar = []
-    i = -toavg;
-    while i <= toavg:
-        lineoutar.append(np.array(arrayimg[ypixel+i, :]))
-        i += 1;
-
-    # return the total projection of all of the lineouts in the list
-    return(np.array(lineoutar).sum(axis=0))
+    # pick out all of the rows the user wants in one go (with the same indexing as taking them one at a time) and add them together
+    rows = np.arange(ypixel-toavg, ypixel+toavg+1)
+    return(project(arrayimg[rows, :], 0))
 
 ########################################################
 
+@profile_utils.timed()
 def find_line_y(xpixel, toavg=0, imgpath='', imgar=[]):
     """ Returns the lineout of an image along the y-axis and averages multiple rows of pixels if the user wants.
 
@@ -168,12 +284,6 @@ def find_line_y(xpixel, toavg=0, imgpath='', imgar=[]):
     # set the array of the image to whatever the user specifies (either based on the image path OR an array that the user inputs)
     arrayimg = check_array(imgpath, imgar)
 
-    # make a while loop that appends the all the lineouts the user wants to a list
-    lineoutar = []
-    i = -toavg;
-    while i <= toavg:
-        lineoutar.append(np.array(arrayimg[:, xpixel+i]))
-        i += 1;
-
-    # return the total projection of all of the lineouts in the list
-    return(np.array(lineoutar).sum(axis=0))
+    # pick out all of the columns the user wants in one go (with the same indexing as taking them one at a time) and add them together
+    cols = np.arange(xpixel-toavg, xpixel+toavg+1)
+    return(project(arrayimg[:, cols], 1))
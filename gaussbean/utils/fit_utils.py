@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Fri Oct  16 17:00:00 2026
+
+@author: leahghartman
+
+Description : A file for fitting a 2D Gaussian (amplitude, center, sigma in x and y, rotation and offset) to many cropped images at once.
+"""
+# import random needed packages that should already be installed
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+# import from other modules in the package
+from gaussbean.utils import moment_utils
+
+# the fields of the structured array returned by fit_gauss2d_stack() (one entry per image); theta is the angle of the sigx axis from the x-axis in radians
+FIT_DTYPE = np.dtype([('amplitude', 'f8'), ('centx', 'f8'), ('centy', 'f8'), ('sigx', 'f8'), ('sigy', 'f8'), ('theta', 'f8'), ('offset', 'f8'),
+                      ('FWHMx', 'f8'), ('FWHMy', 'f8'), ('rms', 'f8'), ('iterations', 'i8'), ('converged', '?')])
+
+# the fields of the structured array returned by fit_gauss1d_batch() (one entry per profile)
+FIT1D_DTYPE = np.dtype([('amplitude', 'f8'), ('center', 'f8'), ('sigma', 'f8'), ('offset', 'f8'), ('FWHM', 'f8'), ('rms', 'f8'), ('iterations', 'i8'),
+                        ('converged', '?')])
+
+# the conversion from the sigma of a Gaussian to its FWHM
+SIGMA_TO_FWHM = 2*np.sqrt(2*np.log(2))
+
+#########################
+### START OF FUNCTIONS
+#########################
+
+def _seed(block):
+    """ Returns the starting parameters (amplitude, centx, centy, sigx, sigy, theta, offset) of the fits of every image in a block (3D array), taken from the
+    moments of the images above the level of their border pixels. This function shouldn't be called by the user at any point.
+    """
+    # the median of the border pixels is a good guess of the offset, as long as the crop isn't cutting off the beam
+    border = np.concatenate([block[:, 0, :], block[:, -1, :], block[:, :, 0], block[:, :, -1]], axis=1)
+    offset = np.median(border, axis=1)
+    moments = moment_utils.find_moments_stack(block, background=offset)
+
+    # the sigmas along the long and short axes of the beam are the square roots of the eigenvalues of the covariance matrix
+    varx, vary, covxy = moments['sigx']**2, moments['sigy']**2, moments['covxy']
+    middle = (varx + vary)/2
+    spread = np.sqrt(((varx - vary)/2)**2 + covxy**2)
+    minsize = 0.5
+    params = np.stack([block.max(axis=(1, 2)) - offset, moments['centx'], moments['centy'], np.sqrt(np.clip(middle + spread, minsize**2, None)),
+                       np.sqrt(np.clip(middle - spread, minsize**2, None)), moments['tilt'], offset], axis=1)
+
+    # images without any signal above the offset give NaN moments, so start those fits from the middle of the image instead
+    height, width = block.shape[1:]
+    fallback = np.array([1, (width-1)/2, (height-1)/2, width/4, height/4, 0, 0])
+    return(np.where(np.isfinite(params), params, fallback))
+
+########################################################
+
+def _gauss2d(params, xs, ys, jacobian=False):
+    """ Returns the 2D Gaussian with the given parameters (one row of parameters per image) at the pixel coordinates xs, ys, as a (number of images, number of
+    pixels) array. With jacobian=True, the derivatives of the model with respect to every parameter are returned as well, as a (number of images, 7, number of
+    pixels) array (one contiguous row per parameter, which is much faster to fill and multiply than a row per pixel). This function shouldn't be called by the
+    user at any point.
+    """
+    amplitude, centx, centy, sigx, sigy, theta, offset = [params[:, i:i+1] for i in range(7)]
+    cos, sin = np.cos(theta), np.sin(theta)
+
+    # the coordinates of every pixel along the (rotated) axes of the beam
+    dx, dy = xs - centx, ys - centy
+    u = dx*cos + dy*sin
+    v = dy*cos - dx*sin
+    shape = np.exp(-0.5*((u/sigx)**2 + (v/sigy)**2))
+    model = amplitude*shape + offset
+    if not jacobian:
+        return(model)
+
+    peak = amplitude*shape
+    du, dv = u/sigx**2, v/sigy**2
+    jac = np.empty((model.shape[0], 7, model.shape[1]))
+    jac[:, 0] = shape
+    jac[:, 1] = peak*(du*cos - dv*sin)
+    jac[:, 2] = peak*(du*sin + dv*cos)
+    jac[:, 3] = peak*u*du/sigx
+    jac[:, 4] = peak*v*dv/sigy
+    jac[:, 5] = peak*u*v*(1/sigy**2 - 1/sigx**2)
+    jac[:, 6] = 1
+    return(model, jac)
+
+########################################################
+
+def _gauss1d(params, xs, jacobian=False):
+    """ Returns the 1D Gaussian with the given parameters (amplitude, center, sigma, offset; one row of parameters per profile) at the sample positions xs, as a
+    (number of profiles, number of samples) array, and its derivatives as a (number of profiles, 4, number of samples) array if jacobian is True. This
+    function shouldn't be called by the user at any point.
+    """
+    amplitude, center, sigma, offset = [params[:, i:i+1] for i in range(4)]
+    dx = xs - center
+    shape = np.exp(-0.5*(dx/sigma)**2)
+    model = amplitude*shape + offset
+    if not jacobian:
+        return(model)
+
+    peak = amplitude*shape
+    jac = np.empty((model.shape[0], 4, model.shape[1]))
+    jac[:, 0] = shape
+    jac[:, 1] = peak*dx/sigma**2
+    jac[:, 2] = peak*dx**2/sigma**3
+    jac[:, 3] = 1
+    return(model, jac)
+
+########################################################
+
+def _guess_gauss1d(data):
+    """ Returns the starting parameters (amplitude, center, sigma, offset) of the fits of every row of data in closed form: above the lowest point of the row,
+    the log of a Gaussian is a parabola, so a weighted least squares parabola through the log of the samples around the peak gives all of the
+    parameters at once (the weights, the square of every sample, keep the noisy tails from dragging it around). This function shouldn't be called by the user
+    at any point.
+    """
+    nrows, length = data.shape
+    rows = np.arange(nrows)
+    idx = np.arange(length)
+
+    # the beam usually covers only part of the profile, so a low percentile of the row is a good guess of the offset
+    offset = np.percentile(data, 20, axis=1)
+    signal = data - offset[:, np.newaxis]
+    peakpos = np.argmax(signal, axis=1)
+    peak = signal[rows, peakpos]
+
+    # only use the samples above a third of the peak that are connected to the peak (so the noise in the tails and other bumps are left out)
+    above = signal > peak[:, np.newaxis]/3
+    left = np.where(~above & (idx < peakpos[:, np.newaxis]), idx, -1).max(axis=1)
+    right = np.where(~above & (idx > peakpos[:, np.newaxis]), idx, length).min(axis=1)
+    use = (idx > left[:, np.newaxis]) & (idx < right[:, np.newaxis])
+
+    # fit the parabola in coordinates centered on the highest sample and scaled by the length, which keeps the 3x3 equations well conditioned
+    scale = max(length/2, 1)
+    xs = (idx - peakpos[:, np.newaxis])/scale
+    weights = np.where(use & (signal > 0), signal**2, 0)
+    logs = np.log(np.where(weights > 0, signal, 1))
+    powers = np.stack([np.ones_like(xs), xs, xs**2, xs**3, xs**4], axis=1)
+    sums = (powers*weights[:, np.newaxis]).sum(axis=2)
+    matrix = sums[:, [[0, 1, 2], [1, 2, 3], [2, 3, 4]]]
+    rhs = (powers[:, :3]*(weights*logs)[:, np.newaxis]).sum(axis=2)
+    coeffs = np.linalg.solve(matrix + 1e-12*np.eye(3), rhs[..., np.newaxis])[..., 0]
+    a, b, c = coeffs[:, 0], coeffs[:, 1], coeffs[:, 2]
+
+    # only a downward parabola (c < 0) is a Gaussian; every other row starts from its highest sample and a quarter of the length instead
+    good = (c < 0) & ((weights > 0).sum(axis=1) >= 3)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        center = np.where(good, peakpos - scale*b/(2*c), peakpos)
+        sigma = np.where(good, scale*np.sqrt(-1/(2*c)), length/4)
+        amplitude = np.where(good, np.exp(a - b**2/(4*c)), peak)
+    params = np.stack([amplitude, center, sigma, offset], axis=1)
+    return(np.where(np.isfinite(params), params, np.stack([peak, peakpos, np.full(nrows, length/4), offset], axis=1)))
+
+########################################################
+
+def _levenberg_marquardt(data, params, model, positive, maxiter, tol):
+    """ Fits a model to every row of data (a 2D array, one row per fit) with Levenberg-Marquardt, stepping every fit that hasn't converged yet at the same time.
+    model(params, jacobian) returns the model of every row of params (and its derivatives as a (number of rows, number of parameters, number of samples) array
+    if jacobian is True), and the parameters at the indices in positive are kept positive. Returns the fitted parameters, the sum of the squared residuals,
+    the number of iterations and whether each fit converged. This function shouldn't be called by the user at any point.
+    """
+    nfits, nparams = params.shape
+    params = params.copy()
+    damping = np.full(nfits, 1e-3)
+    cost = ((data - model(params, False))**2).sum(axis=1)
+    energy = (data**2).sum(axis=1)
+    iterations = np.zeros(nfits, dtype=np.int64)
+    converged = np.zeros(nfits, dtype=bool)
+    active = np.arange(nfits)
+
+    for _ in range(maxiter):
+        if len(active) == 0:
+            break
+        p = params[active]
+        fit, jac = model(p, True)
+        resid = data[active] - fit
+
+        # the normal equations of every active fit, damped along their diagonal (with a floor, so a parameter the data doesn't pin down, like the rotation of a
+        # round beam, can still be solved for)
+        jtj = jac @ jac.transpose(0, 2, 1)
+        jtr = (jac @ resid[..., None])[..., 0]
+        diag = np.diagonal(jtj, axis1=1, axis2=2)
+        diag = np.maximum(diag, 1e-9*diag.max(axis=1, keepdims=True) + 1e-12)
+        step = np.linalg.solve(jtj + damping[active, None, None]*(diag[:, :, None]*np.eye(nparams)), jtr[..., None])[..., 0]
+
+        # try the step
+        trial = p + step
+        trial[:, positive] = np.abs(trial[:, positive])
+        trialcost = ((data[active] - model(trial, False))**2).sum(axis=1)
+        iterations[active] += 1
+
+        # fits whose cost went down keep the step and trust it more; the others throw it away and damp more
+        better = trialcost < cost[active]
+        relchange = (cost[active] - trialcost)/np.maximum(cost[active], 1e-300)
+        params[active[better]] = trial[better]
+        cost[active[better]] = trialcost[better]
+        damping[active] = np.where(better, damping[active]/10, damping[active]*10)
+
+        # a fit is done once a step barely changes its cost, and has failed once it can't find ANY step that lowers its cost (unless it already matches the
+        # data to within rounding, which happens for noise-free data)
+        done = better & (relchange < tol)
+        stuck = damping[active] > 1e10
+        done |= stuck & (cost[active] < tol*energy[active])
+        converged[active[done]] = True
+        active = active[~(done | stuck)]
+
+    return(params, cost, iterations, converged)
+
+########################################################
+
+def _fit_block(block, maxiter, tol):
+    """ Fits a 2D Gaussian to every image in a block (3D array of images of the same shape), all at the same time. Returns a structured array of FIT_DTYPE.
+    This function shouldn't be called by the user at any point.
+    """
+    nimgs, height, width = block.shape
+    data = block.reshape(nimgs, -1).astype(np.float64)
+    ys, xs = np.divmod(np.arange(height*width, dtype=np.float64), width)
+    model = lambda params, jacobian: _gauss2d(params, xs, ys, jacobian)
+    params, cost, iterations, converged = _levenberg_marquardt(data, _seed(block.astype(np.float64)), model, [3, 4], maxiter, tol)
+
+    # the sign of the sigmas and the range of theta don't change the Gaussian, so report them the same way every time
+    theta = params[:, 5]
+    swap = params[:, 3] < params[:, 4]
+    params[swap, 3], params[swap, 4] = params[swap, 4], params[swap, 3].copy()
+    theta = np.where(swap, theta + np.pi/2, theta)
+    theta = (theta + np.pi/2) % np.pi - np.pi/2
+
+    results = np.zeros(nimgs, dtype=FIT_DTYPE)
+    for i, name in enumerate(['amplitude', 'centx', 'centy', 'sigx', 'sigy', 'theta', 'offset']):
+        results[name] = params[:, i]
+    results['theta'] = theta
+    results['rms'] = np.sqrt(cost/(height*width))
+    results['iterations'] = iterations
+    results['converged'] = converged
+
+    # only give FWHM values for fits that describe an actual beam inside of the image (like in fit_gauss1d_batch(), a peak of amplitude A spread over about
+    # sigx*sigy pixels stands out by roughly A*sqrt(sigx*sigy)/rms), so a flat or empty frame gets NaN instead of the width of the starting guess
+    amplitude, sigx, sigy = results['amplitude'], results['sigx'], results['sigy']
+    good = (converged & (results['centx'] >= 0) & (results['centx'] <= width-1) & (results['centy'] >= 0) & (results['centy'] <= height-1) & (sigy >= 0.5)
+            & (sigx < max(height, width)) & (amplitude*np.sqrt(sigx*sigy) > 3*results['rms']))
+    results['FWHMx'] = np.where(good, SIGMA_TO_FWHM*sigx, np.nan)
+    results['FWHMy'] = np.where(good, SIGMA_TO_FWHM*sigy, np.nan)
+    return(results)
+
+########################################################
+
+def fit_gauss2d(imgar, maxiter=100, tol=1e-8):
+    """ Returns a dictionary with the parameters of the 2D Gaussian fitted to an image: amplitude, center (centx, centy, in pixels of the image), sigmas along
+    the long (sigx) and short (sigy) axes of the beam, the rotation of the long axis from the x-axis in radians (theta), offset, the matching FWHM values
+    (FWHMx, FWHMy, NaN unless the fit converged to a beam inside of the image), the RMS of the residuals (rms), the number of iterations and whether the fit
+    converged.
+
+        Parameters
+        ----------
+        imgar : array
+            The image array that the user wants to fit (for example the cropped image returned by single.single_image_proj()).
+        maxiter (OPTIONAL) : integer
+            The maximum number of Levenberg-Marquardt iterations.
+        tol (OPTIONAL) : float
+            The fit is converged once a step changes the sum of the squared residuals by less than this fraction.
+    """
+    result = _fit_block(np.asarray(imgar)[np.newaxis], maxiter, tol)[0]
+    return({name: result[name].item() for name in FIT_DTYPE.names})
+
+########################################################
+
+def fit_gauss2d_stack(crops, maxiter=100, tol=1e-8, blocksize=16, workers=1):
+    """ Returns a structured array (fields amplitude, centx, centy, sigx, sigy, theta, offset, FWHMx, FWHMy, rms, iterations and converged, see fit_gauss2d())
+    with the 2D Gaussian fitted to EVERY image. The fits are seeded from the moments of the images and run with a Levenberg-Marquardt that steps a whole block
+    of images at once, so the per-image overhead of a fitting routine is paid once per block. Nothing raises: frames without a beam (flat or empty images) get
+    NaN FWHM values, and frames that didn't converge still hold the best parameters that were found (so always check the converged field).
+
+        Parameters
+        ----------
+        crops : array or list
+            A 3D array of images, or a list of 2D images (for example the list of cropped images returned by dataset.full_set_proj()). Images in a list don't need
+            to be the same shape; images of the same shape are fitted together.
+        maxiter (OPTIONAL) : integer
+            The maximum number of Levenberg-Marquardt iterations.
+        tol (OPTIONAL) : float
+            A fit is converged once a step changes the sum of the squared residuals by less than this fraction.
+        blocksize (OPTIONAL) : integer
+            The number of images fitted together. Bigger blocks need more memory (about 56*blocksize*height*width bytes for the derivatives).
+        workers (OPTIONAL) : integer
+            Number of processes to spread the blocks over. Default is one (no extra processes); None uses every core.
+    """
+    if isinstance(crops, np.ndarray) and crops.ndim == 3:
+        groups = {crops.shape[1:]: np.arange(len(crops))}
+        getblock = lambda indices: crops[indices[0]:indices[-1]+1]
+    else:
+        crops = [np.asarray(crop) for crop in crops]
+        groups = {}
+        for i, crop in enumerate(crops):
+            groups.setdefault(crop.shape, []).append(i)
+        getblock = lambda indices: np.stack([crops[i] for i in indices])
+
+    # split every group of same-shaped images into blocks
+    blocks = []
+    for indices in groups.values():
+        indices = np.asarray(indices)
+        blocks.extend(indices[start:start+blocksize] for start in range(0, len(indices), blocksize))
+
+    # fit every block (possibly over multiple processes) and put the results back in the order of the images
+    results = np.zeros(sum(len(indices) for indices in blocks), dtype=FIT_DTYPE)
+    if workers == 1:
+        for indices in blocks:
+            results[indices] = _fit_block(getblock(indices), maxiter, tol)
+    else:
+        with ProcessPoolExecutor(max_workers=workers if workers is not None else os.cpu_count()) as executor:
+            futures = [(indices, executor.submit(_fit_block, getblock(indices), maxiter, tol)) for indices in blocks]
+            for indices, future in futures:
+                results[indices] = future.result()
+    return(results)
+
+########################################################
+
+def fit_gauss1d_batch(profiles, maxiter=50, tol=1e-8):
+    """ Returns a structured array (fields amplitude, center, sigma, offset, FWHM, rms, iterations and converged) with the 1D Gaussian fitted to EVERY row of a
+    2D array of projections or lineouts at once. Every fit starts from a closed-form estimate (a parabola through the log of the profile) and is refined with a
+    Levenberg-Marquardt that steps every row at the same time. Because the whole profile is fitted instead of only its half-height crossings being found, this
+    still gives a width for noisy, low-charge shots where find_FWHM() finds no peak. Nothing raises: the FWHM of a row is NaN unless its fit converged to a
+    peak centered inside of the profile that stands out from the noise, and converged says whether the fit itself converged.
+
+        Parameters
+        ----------
+        profiles : array
+            2D array of shape (number of profiles, length of each profile), for example the x-projections of every image in a dataset stacked together. A
+            single 1D profile is also accepted.
+        maxiter (OPTIONAL) : integer
+            The maximum number of Levenberg-Marquardt iterations.
+        tol (OPTIONAL) : float
+            A fit is converged once a step changes the sum of the squared residuals by less than this fraction.
+    """
+    # make sure we are working with a 2D array of floats (one profile per row)
+    data = np.atleast_2d(np.asarray(profiles, dtype=np.float64))
+    length = data.shape[1]
+    xs = np.arange(length, dtype=np.float64)
+
+    # fit every row at once, starting from the closed-form estimates
+    model = lambda params, jacobian: _gauss1d(params, xs, jacobian)
+    params, cost, iterations, converged = _levenberg_marquardt(data, _guess_gauss1d(data), model, [2], maxiter, tol)
+
+    results = np.zeros(len(data), dtype=FIT1D_DTYPE)
+    for i, name in enumerate(['amplitude', 'center', 'sigma', 'offset']):
+        results[name] = params[:, i]
+    results['rms'] = np.sqrt(cost/length)
+    results['iterations'] = iterations
+    results['converged'] = converged
+
+    # only give a FWHM for fits that describe an actual peak inside of the profile: wider than a pixel, narrower than the profile, and standing out from the
+    # residuals (a peak of amplitude A and sigma s spread over about s samples stands out by roughly A*sqrt(s)/rms)
+    amplitude, center, sigma = params[:, 0], params[:, 1], params[:, 2]
+    good = converged & (center >= 0) & (center <= length-1) & (sigma >= 0.5) & (sigma < length) & (amplitude*np.sqrt(sigma) > 3*results['rms'])
+    results['FWHM'] = np.where(good, SIGMA_TO_FWHM*params[:, 2], np.nan)
+    return(results)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Fri Oct  16 20:00:00 2026
+
+@author: leahghartman
+
+Description : A file for integral images (summed-area tables), which give the projections, lineouts and totals of any part of an image with a couple of
+subtractions once the table has been built.
+"""
+# import random needed packages that should already be installed
+import numpy as np
+
+#########################
+### START OF FUNCTIONS
+#########################
+
+def _opencv_integral(arrayimg):
+    """ Returns the summed-area table of an image (with the extra row and column of zeros in front) built by OpenCV, or None if OpenCV isn't installed or
+    doesn't take this type of image. This function shouldn't be called by the user at any point.
+    """
+    if arrayimg.dtype not in (np.uint8, np.uint16, np.int16, np.float32, np.float64) or arrayimg.strides[1] != arrayimg.itemsize:
+        return(None)
+    try:
+        import cv2
+    except ImportError:
+        return(None)
+
+    # 8-bit images can be summed in 32-bit integers as long as even the total of the whole image fits; everything else is summed in 64-bit floats
+    if arrayimg.dtype == np.uint8 and arrayimg.size < (2**31 - 1)//255:
+        return(cv2.integral(arrayimg, sdepth=cv2.CV_32S))
+    return(cv2.integral(arrayimg, sdepth=cv2.CV_64F))
+
+#########################
+### START OF CLASSES
+#########################
+
+class IntegralImage:
+    """ The summed-area table of an image: entry [y, x] of the table is the sum of every pixel above and to the left of (y, x). Building it takes one pass over
+    the image, and after that the projections of ANY rectangle of the image, the lineouts of any row or column averaged over any number of neighbours (toavg),
+    and the total of any rectangle are read out of the table with a couple of array subtractions, without going over the pixels again. This makes trying many
+    crops, scanning lineouts across every row/column, or trying many toavg values essentially free.
+
+    Integer images are summed exactly (8-bit images in 32-bit integers when the sums fit, other integer images in 64-bit integers, or in 64-bit floats, which
+    are exact up to 2**53, when OpenCV builds the table); other images are summed in 64-bit floats.
+
+        Parameters
+        ----------
+        imgar : array
+            The image array (2D).
+    """
+    __slots__ = ('table', 'shape')
+
+    def __init__(self, imgar):
+        arrayimg = np.asarray(imgar)
+        if arrayimg.ndim != 2:
+            raise ValueError('an integral image needs a 2D image, not shape ' + str(arrayimg.shape))
+        self.shape = arrayimg.shape
+
+        # the table has an extra row and column of zeros in front, so every sum is the same few subtractions, even at the edges of the image. OpenCV's
+        # integral() builds it far faster than two NumPy cumsums, so it is used whenever it is installed and takes the image
+        self.table = _opencv_integral(arrayimg)
+        if self.table is None:
+            dtype = np.int64 if arrayimg.dtype.kind in 'biu' else np.float64
+            self.table = np.zeros((arrayimg.shape[0]+1, arrayimg.shape[1]+1), dtype=dtype)
+            np.cumsum(arrayimg, axis=0, dtype=dtype, out=self.table[1:, 1:])
+            np.cumsum(self.table[1:, 1:], axis=1, out=self.table[1:, 1:])
+
+    def _bounds(self, x0, y0, x1, y1):
+        """ Returns the edges of a rectangle cut off at the edges of the image (None means up to the edge).
+        """
+        height, width = self.shape
+        x1 = width if x1 is None else x1
+        y1 = height if y1 is None else y1
+        x0, x1 = min(max(int(x0), 0), width), min(max(int(x1), 0), width)
+        y0, y1 = min(max(int(y0), 0), height), min(max(int(y1), 0), height)
+        return(x0, y0, max(x1, x0), max(y1, y0))
+
+    def total(self, x0=0, y0=0, x1=None, y1=None):
+        """ Returns the sum of the pixels in the rectangle [y0:y1, x0:x1] of the image.
+
+            Parameters
+            ----------
+            x0, y0 (OPTIONAL) : integer
+                The first column and row of the rectangle.
+            x1, y1 (OPTIONAL) : integer
+                The column and row just past the rectangle. Default is the edge of the image.
+        """
+        x0, y0, x1, y1 = self._bounds(x0, y0, x1, y1)
+        table = self.table
+        return(table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0])
+
+    def proj_x(self, x0=0, y0=0, x1=None, y1=None):
+        """ Returns the projection along the x-axis (the sum of each column, like calc_utils.find_proj_x()) of the rectangle [y0:y1, x0:x1] of the image.
+
+            Parameters
+            ----------
+            x0, y0 (OPTIONAL) : integer
+                The first column and row of the rectangle.
+            x1, y1 (OPTIONAL) : integer
+                The column and row just past the rectangle. Default is the edge of the image.
+        """
+        x0, y0, x1, y1 = self._bounds(x0, y0, x1, y1)
+        return(np.diff(self.table[y1, x0:x1+1] - self.table[y0, x0:x1+1]))
+
+    def proj_y(self, x0=0, y0=0, x1=None, y1=None):
+        """ Returns the projection along the y-axis (the sum of each row, like calc_utils.find_proj_y()) of the rectangle [y0:y1, x0:x1] of the image.
+
+            Parameters
+            ----------
+            x0, y0 (OPTIONAL) : integer
+                The first column and row of the rectangle.
+            x1, y1 (OPTIONAL) : integer
+                The column and row just past the rectangle. Default is the edge of the image.
+        """
+        x0, y0, x1, y1 = self._bounds(x0, y0, x1, y1)
+        return(np.diff(self.table[y0:y1+1, x1] - self.table[y0:y1+1, x0]))
+
+    def line_x(self, ypixel, toavg=0, x0=0, x1=None):
+        """ Returns the lineout along the x-axis at a row, added up with toavg rows on EACH SIDE of it (like calc_utils.find_line_x()), between columns x0 and x1.
+        Rows that fall outside of the image are left out (unlike find_line_x(), which wraps rows before the first one around to the end of the image and fails
+        on rows past the end).
+
+            Parameters
+            ----------
+            ypixel : integer
+                The row of the lineout.
+            toavg (OPTIONAL) : integer
+                The number of rows on each side of the lineout that are added to it.
+            x0, x1 (OPTIONAL) : integer
+                The first column and the column just past the lineout. Default is the whole row.
+        """
+        return(self.proj_x(x0, ypixel-toavg, x1, ypixel+toavg+1))
+
+    def line_y(self, xpixel, toavg=0, y0=0, y1=None):
+        """ Returns the lineout along the y-axis at a column, added up with toavg columns on EACH SIDE of it (like calc_utils.find_line_y()), between rows y0 and
+        y1. Columns that fall outside of the image are left out (unlike find_line_y(), which wraps columns before the first one around to the end of the image
+        and fails on columns past the end).
+
+            Parameters
+            ----------
+            xpixel : integer
+                The column of the lineout.
+            toavg (OPTIONAL) : integer
+                The number of columns on each side of the lineout that are added to it.
+            y0, y1 (OPTIONAL) : integer
+                The first row and the row just past the lineout. Default is the whole column.
+        """
+        return(self.proj_y(xpixel-toavg, y0, xpixel+toavg+1, y1))
+
+    def lines_x(self, toavg=0):
+        """ Returns the lineouts along the x-axis of EVERY row at once (row i of the result is line_x(i, toavg)), as a 2D array the shape of the image.
+
+            Parameters
+            ----------
+            toavg (OPTIONAL) : integer
+                The number of rows on each side of every lineout that are added to it.
+        """
+        height = self.shape[0]
+        rows = np.arange(height)
+        bottom = np.minimum(rows + toavg + 1, height)
+        top = np.maximum(rows - toavg, 0)
+        return(np.diff(self.table[bottom] - self.table[top], axis=1))
+
+    def lines_y(self, toavg=0):
+        """ Returns the lineouts along the y-axis of EVERY column at once (row i of the result is line_y(i, toavg)), as a 2D array of shape (width, height).
+
+            Parameters
+            ----------
+            toavg (OPTIONAL) : integer
+                The number of columns on each side of every lineout that are added to it.
+        """
+        width = self.shape[1]
+        cols = np.arange(width)
+        right = np.minimum(cols + toavg + 1, width)
+        left = np.maximum(cols - toavg, 0)
+        return(np.diff(self.table[:, right] - self.table[:, left], axis=0).T)
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Fri Oct  16 11:00:00 2026
+
+@author: leahghartman
+
+Description : A file for reading images and for packing a whole run of images into a single memory-mapped stack on disk.
+
+Every image is read with the same dtype policy (see read_image()): single-channel images keep their native bit depth (so 12/16-bit camera data stays uint16
+instead of being squashed into 8 bits), colour and palette images are turned into 8-bit greyscale, and the user can ask for any other dtype (for example
+float32) instead.
+"""
+# import random needed packages that should already be installed
+import os
+import re
+import json
+import mmap
+import time
+import numpy as np
+from collections import deque
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+# import from other modules in the package
+from gaussbean.utils import profile_utils
+
+# the PIL modes that are already a single channel and are kept at their native bit depth (every other mode is converted to 8-bit greyscale)
+NATIVE_MODES = ('L', 'I;16', 'I;16L', 'I;16B', 'I;16N', 'I', 'F')
+
+#########################
+### START OF FUNCTIONS
+#########################
+
+def natural_key(path):
+    """ Returns a key that sorts paths the way a person would (so 2.tiff comes before 10.tiff).
+
+        Parameters
+        ----------
+        path : string
+            The path to sort.
+    """
+    return([int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)', os.path.basename(path))])
+
+########################################################
+
+def as_dtype(arrayimg, dtype=None):
+    """ Returns an image array with the dtype asked for (no copy is made if it already has it), or the array as it is if dtype is None.
+
+        Parameters
+        ----------
+        arrayimg : array
+            The image array (or stack of images).
+        dtype (OPTIONAL) : dtype
+            The dtype wanted, for example np.float32. Default is to keep the dtype of the image.
+    """
+    if dtype is None:
+        return(arrayimg)
+    return(np.asarray(arrayimg).astype(dtype, copy=False))
+
+########################################################
+
+@profile_utils.timed(countresult=True)
+def read_image(imgpath, dtype=None):
+    """ Opens and decodes an image file following the dtype policy of the package: single-channel images keep their native bit depth (8-bit images are uint8,
+    12/16-bit images uint16, 32-bit integer images int32 and floating-point images float32, always in the byte order of this machine), while colour and palette
+    images are converted to 8-bit greyscale. Every way of getting an image into the analysis (a path given to a single image function, a dataset of paths, a
+    packed stack) goes through here, so they all give the same array.
+
+        Parameters
+        ----------
+        imgpath : string
+            The path to the image.
+        dtype (OPTIONAL) : dtype
+            A dtype to convert the image to (for example np.float32). Default is the native dtype of the image.
+    """
+    with Image.open(imgpath) as img:
+        arrayimg = np.array(img if img.mode in NATIVE_MODES else img.convert('L'))
+
+    # big-endian 16-bit images come out of PIL in their file's byte order, which every calculation would have to swap on the fly
+    if not arrayimg.dtype.isnative:
+        arrayimg = arrayimg.astype(arrayimg.dtype.newbyteorder('='))
+    return(as_dtype(arrayimg, dtype))
+
+########################################################
+
+def header_path(stackpath):
+    """ Returns the path of the header file (a small JSON file recording the shape, dtype and source images) that goes along with a packed stack.
+
+        Parameters
+        ----------
+        stackpath : string
+            The path to the packed stack (.npy file).
+    """
+    return(stackpath + '.json')
+
+########################################################
+
+def pack_stack(imglist, stackpath, dtype=None):
+    """ Packs a list of images into ONE stack on disk (a .npy file of shape (number of images, height, width)) along with a header file recording the shape, dtype
+    and source image of every frame. Returns the stack as a read-only memory map. After packing, every analysis can read frames straight from the stack instead
+    of opening the original images again.
+
+        Parameters
+        ----------
+        imglist : array
+            Array of image paths (this needs to be a set of SORTED image paths (so, 1.tiff, 2.tiff, etc.). Every image needs to have the same shape and dtype.
+        stackpath : string
+            The path of the .npy file the stack will be written to.
+        dtype (OPTIONAL) : dtype
+            The dtype the frames are stored as (for example np.float32). Default is the native dtype of the images (see read_image()).
+    """
+    # use the first image to find the shape and dtype of every frame in the stack
+    first = read_image(imglist[0], dtype)
+
+    # create the stack on disk and write the images into it one at a time, so the whole run never needs to fit in memory
+    stack = np.lib.format.open_memmap(stackpath, mode='w+', dtype=first.dtype, shape=(len(imglist),) + first.shape)
+    for i, imgpath in enumerate(imglist):
+        imgar = first if i == 0 else read_image(imgpath, dtype)
+        if imgar.shape != first.shape or imgar.dtype != first.dtype:
+            raise ValueError('every image in a stack needs the same shape and dtype; ' + str(imgpath) + ' has shape ' + str(imgar.shape) + ' and dtype ' +
+                             str(imgar.dtype) + ' but the first image has shape ' + str(first.shape) + ' and dtype ' + str(first.dtype))
+        stack[i] = imgar
+    stack.flush()
+    del stack
+
+    # write the header recording where every frame came from
+    header = {'shape': [len(imglist)] + list(first.shape), 'dtype': first.dtype.str, 'filenames': [os.path.abspath(str(p)) for p in imglist]}
+    with open(header_path(stackpath), 'w') as f:
+        json.dump(header, f, indent=1)
+
+    # return the stack, opened again as a read-only memory map
+    return(open_stack(stackpath))
+
+########################################################
+
+def open_stack(stackpath):
+    """ Returns a packed stack as a read-only memory map. Indexing it (stack[i]) gives the array of one frame without reading the rest of the stack or copying
+    anything, so these frames can be given straight to any function that takes an image array (imgar).
+
+        Parameters
+        ----------
+        stackpath : string
+            The path to the packed stack (.npy file).
+    """
+    return(np.load(stackpath, mmap_mode='r'))
+
+########################################################
+
+def read_header(stackpath):
+    """ Returns the header of a packed stack as a dictionary with the shape, dtype and source image filenames of the stack.
+
+        Parameters
+        ----------
+        stackpath : string
+            The path to the packed stack (.npy file).
+    """
+    with open(header_path(stackpath)) as f:
+        return(json.load(f))
+
+########################################################
+
+@lru_cache(maxsize=8)
+def _open_cached(stackpath, mtime, size):
+    """ Opens a packed stack for _cached_stack(). The modification time and size of the file are only there to be part of the key of the cache. This function
+    shouldn't be called by the user at any point.
+    """
+    return(open_stack(stackpath))
+
+########################################################
+
+def _cached_stack(stackpath):
+    """ Returns a packed stack that has already been opened in this process (so worker processes open every stack only once). A stack that has been packed
+    again since it was opened (so its modification time or size changed) is opened again. This function shouldn't be called by the user at any point.
+    """
+    stat = os.stat(stackpath)
+    return(_open_cached(stackpath, stat.st_mtime_ns, stat.st_size))
+
+########################################################
+
+def _whole_stack(stack):
+    """ Returns whether a memory map is a whole packed stack exactly as open_stack() gives it (rather than a slice of one, or a map of some other part of the
+    file), so that its frames can be given as (stack path, index) pairs. This function shouldn't be called by the user at any point.
+    """
+    if not (isinstance(stack, np.memmap) and stack.ndim == 3 and isinstance(stack.base, mmap.mmap) and str(stack.filename).endswith('.npy')):
+        return(False)
+    # a slice of a memory map keeps the offset of the map it was cut from, so the offset alone can't tell them apart; only an unsliced map has the mmap as base
+    whole = _cached_stack(str(stack.filename))
+    return(stack.offset == whole.offset and stack.shape == whole.shape and stack.dtype == whole.dtype and stack.strides == whole.strides)
+
+########################################################
+
+def frame_sources(imglist):
+    """ Returns a list with one entry per frame that load_frame() can read. Image paths stay image paths, frames of a packed stack become (stack path, index)
+    pairs (so that they can be sent to worker processes without copying the data), and frames of any other 3D array stay arrays.
+
+        Parameters
+        ----------
+        imglist : array
+            Array of image paths, the path to a packed stack (.npy file), a stack opened with open_stack(), any 3D array of images, or a PrefetchLoader (which
+            is returned as it is).
+    """
+    # a prefetching loader already hands out arrays, one frame at a time
+    if isinstance(imglist, PrefetchLoader):
+        return(imglist)
+
+    # a single string is the path to a packed stack
+    if isinstance(imglist, (str, os.PathLike)):
+        stackpath = os.fspath(imglist)
+        return([(stackpath, i) for i in range(len(_cached_stack(stackpath)))])
+
+    # a memory map of a whole .npy file can be re-opened from its filename in any process (a slice of one is split up into its frames like any other array)
+    if _whole_stack(imglist):
+        return([(str(imglist.filename), i) for i in range(len(imglist))])
+
+    # anything else (a list of paths or an ordinary 3D array) is just split up into its frames
+    return(list(imglist))
+
+########################################################
+
+def load_frame(source, dtype=None):
+    """ Returns the array of ONE frame from any of the entries returned by frame_sources(): an image path, a (stack path, index) pair, or an array.
+
+        Parameters
+        ----------
+        source : string, tuple or array
+            The frame to load.
+        dtype (OPTIONAL) : dtype
+            A dtype to convert the frame to (for example np.float32). Default is the native dtype of the frame (see read_image()).
+    """
+    # frames of packed stacks are read straight out of the memory map (no copy, unless a different dtype is wanted)
+    if isinstance(source, tuple):
+        stackpath, index = source
+        return(as_dtype(_cached_stack(stackpath)[index], dtype))
+
+    # arrays are already loaded
+    if isinstance(source, np.ndarray):
+        return(as_dtype(source, dtype))
+
+    # anything else is the path to an image, which we have to open and decode
+    return(read_image(source, dtype))
+
+########################################################
+
+def _prefetch_frame(source, dtype=None):
+    """ Loads ONE frame and makes sure it is actually read into memory (frames of a memory-mapped stack are otherwise only read from disk once they are used).
+    This function shouldn't be called by the user at any point.
+    """
+    imgar = load_frame(source, dtype)
+    if isinstance(imgar, np.memmap):
+        imgar = np.array(imgar)
+    return(imgar)
+
+#########################
+### START OF CLASSES
+#########################
+
+class PrefetchLoader:
+    """ Loads the frames of a run on background threads while the frames before them are being analyzed. Iterating over the loader gives the array of every
+    frame in order. At most "depth" frames are loaded ahead of the analysis, so a slow analysis holds the loading back instead of filling up memory. The
+    loader keeps track of how long the analysis had to wait for frames (waittime) and how long it spent working on them (computetime).
+
+    A loader can be given to dataset.full_set_*/iter_set_* in place of imglist, and its blocks() can feed the stack functions.
+
+        Parameters
+        ----------
+        imglist : array
+            Anything io_utils.frame_sources() understands (image paths, a packed stack, ...).
+        depth (OPTIONAL) : integer
+            The maximum number of frames loaded ahead of the analysis.
+        threads (OPTIONAL) : integer
+            The number of background threads decoding images (PIL lets go of the GIL while decoding, so these run at the same time as the analysis).
+        dtype (OPTIONAL) : dtype
+            A dtype every frame is converted to on the background threads (for example np.float32). Default is the native dtype of the frames.
+    """
+    def __init__(self, imglist, depth=4, threads=2, dtype=None):
+        self.sources = frame_sources(imglist)
+        self.dtype = dtype
+        self.depth = max(1, depth)
+        self.threads = threads
+        self.waittime = 0.0
+        self.computetime = 0.0
+        self.frames = 0
+
+    def __len__(self):
+        return(len(self.sources))
+
+    def __iter__(self):
+        # reset the timers so that every pass over the loader is reported on its own
+        self.waittime = 0.0
+        self.computetime = 0.0
+        self.frames = 0
+
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            sources = iter(self.sources)
+            pending = deque()
+
+            # fill the queue up to its depth before handing out the first frame
+            for source in sources:
+                pending.append(executor.submit(_prefetch_frame, source, self.dtype))
+                if len(pending) >= self.depth:
+                    break
+
+            while pending:
+                # wait for the OLDEST frame (so the order is kept) and top the queue back up
+                start = time.perf_counter()
+                imgar = pending.popleft().result()
+                self.waittime += time.perf_counter() - start
+                for source in sources:
+                    pending.append(executor.submit(_prefetch_frame, source, self.dtype))
+                    break
+
+                # everything between handing out this frame and asking for the next one is time spent analyzing
+                start = time.perf_counter()
+                yield imgar
+                self.computetime += time.perf_counter() - start
+                self.frames += 1
+
+    def blocks(self, blocksize):
+        """ Yields the frames of the run stacked into 3D arrays of (at most) blocksize frames each, for the functions in analysis.stack.
+
+            Parameters
+            ----------
+            blocksize : integer
+                The number of frames in each block.
+        """
+        block = []
+        for imgar in self:
+            block.append(imgar)
+            if len(block) == blocksize:
+                yield np.stack(block)
+                block = []
+        if block:
+            yield np.stack(block)
+
+    def summary(self):
+        """ Returns a short string reporting how much time was spent waiting for frames to load versus analyzing them.
+        """
+        total = self.waittime + self.computetime
+        waitfrac = self.waittime/total if total > 0 else 0.0
+        return('%d frames: %.3f s waiting on I/O, %.3f s computing (%.1f%% of the time waiting)' % (self.frames, self.waittime, self.computetime, 100*waitfrac))
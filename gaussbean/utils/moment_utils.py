@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Fri Oct  16 16:00:00 2026
+
+@author: leahghartman
+
+Description : A file for intensity-weighted beam metrics (the moments of an image): total counts, sub-pixel centroid, RMS sizes, covariance and tilt.
+"""
+# import random needed packages that should already be installed
+import numpy as np
+
+# import from other modules in the package
+from gaussbean.utils import calc_utils
+
+# the fields of the structured array returned by find_moments_stack() (one entry per image)
+MOMENT_DTYPE = np.dtype([('total', 'f8'), ('centx', 'f8'), ('centy', 'f8'), ('sigx', 'f8'), ('sigy', 'f8'), ('covxy', 'f8'), ('tilt', 'f8')])
+
+#########################
+### START OF FUNCTIONS
+#########################
+
+def _raw_moments(block, rowchunk):
+    """ Returns the raw moments (sum of I, I*x, I*x^2, I*y, I*y^2, I*x*y) of every image in a block (3D array) as a (number of images, 6) array. The images are
+    gone through a few rows at a time: every chunk of rows is multiplied by the (width, 3) matrix [1, x, x^2], which gives the x-moments of every row, and those
+    are then combined with y. So the whole calculation is one pass over the pixels, and the biggest temporary array is one chunk of rows. This function
+    shouldn't be called by the user at any point.
+    """
+    nimgs, height, width = block.shape
+    xs = np.arange(width, dtype=np.float64)
+    xmatrix = np.stack([np.ones(width), xs, xs**2], axis=1)
+    moments = np.zeros((nimgs, 6))
+
+    for start in range(0, height, rowchunk):
+        # the x-moments (sum of I, I*x, I*x^2) of every row in this chunk of rows, for every image
+        rows = block[:, start:start+rowchunk, :].astype(np.float64) @ xmatrix
+        ys = np.arange(start, start + rows.shape[1], dtype=np.float64)
+
+        # combine the x-moments of every row with the y-coordinate of the row
+        moments[:, 0] += rows[:, :, 0].sum(axis=1)
+        moments[:, 1] += rows[:, :, 1].sum(axis=1)
+        moments[:, 2] += rows[:, :, 2].sum(axis=1)
+        moments[:, 3] += rows[:, :, 0] @ ys
+        moments[:, 4] += rows[:, :, 0] @ ys**2
+        moments[:, 5] += rows[:, :, 1] @ ys
+
+    return(moments)
+
+########################################################
+
+def _metrics(moments, height, width, background):
+    """ Turns the raw moments into the beam metrics of MOMENT_DTYPE, subtracting a constant background level first. This function shouldn't be called by the
+    user at any point.
+    """
+    # a constant background adds b*(sum of 1, x, x^2, y, y^2, x*y over every pixel) to the raw moments, so it can just be taken back out again
+    xs = np.arange(width, dtype=np.float64)
+    ys = np.arange(height, dtype=np.float64)
+    grid = np.array([height*width, height*xs.sum(), height*(xs**2).sum(), width*ys.sum(), width*(ys**2).sum(), xs.sum()*ys.sum()])
+    moments = moments - np.reshape(background, (-1, 1))*grid
+
+    results = np.zeros(len(moments), dtype=MOMENT_DTYPE)
+    total = moments[:, 0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        centx = moments[:, 1]/total
+        centy = moments[:, 3]/total
+        varx = moments[:, 2]/total - centx**2
+        vary = moments[:, 4]/total - centy**2
+        covxy = moments[:, 5]/total - centx*centy
+
+    results['total'] = total
+    results['centx'] = centx
+    results['centy'] = centy
+    results['sigx'] = np.sqrt(np.clip(varx, 0, None))
+    results['sigy'] = np.sqrt(np.clip(vary, 0, None))
+    results['covxy'] = covxy
+
+    # the tilt is the angle (in radians, from the x-axis) of the long axis of the beam
+    results['tilt'] = 0.5*np.arctan2(2*covxy, varx - vary)
+    return(results)
+
+########################################################
+
+def find_moments(imgpath='', imgar=[], background=0, rowchunk=256):
+    """ Returns a dictionary with the intensity-weighted beam metrics of an image: total counts (total), sub-pixel centroid (centx, centy), RMS sizes (sigx, sigy),
+    covariance (covxy) and tilt of the long axis of the beam in radians (tilt). All of them are found in ONE pass over the image, without making any temporary
+    arrays the size of the image.
+
+        Parameters
+        ----------
+        imgpath (OPTIONAL) : string
+            The path to the image that the user wants to use.
+        imgar (OPTIONAL) : array
+            The image array that the user wants to use.
+        background (OPTIONAL) : float
+            A constant background level subtracted from every pixel before the moments are taken (the moments of a beam are very sensitive to background).
+        rowchunk (OPTIONAL) : integer
+            The number of rows of the image handled at a time.
+    """
+    # set the array of the image to whatever the user specifies (either based on the image path OR an array that the user inputs)
+    arrayimg = np.asarray(calc_utils.check_array(imgpath, imgar))
+
+    # find the moments and return them as a dictionary
+    result = _metrics(_raw_moments(arrayimg[np.newaxis], rowchunk), arrayimg.shape[0], arrayimg.shape[1], background)[0]
+    return({name: result[name].item() for name in MOMENT_DTYPE.names})
+
+########################################################
+
+def find_moments_stack(stack, background=0, blocksize=16, rowchunk=64):
+    """ Returns a structured array (fields total, centx, centy, sigx, sigy, covxy and tilt, see find_moments()) with the beam metrics of EVERY image in a stack,
+    found in one pass over the stack.
+
+        Parameters
+        ----------
+        stack : array
+            3D array of images with shape (number of images, height, width). This can be a memory-mapped stack; it is read one block of images at a time.
+        background (OPTIONAL) : float or array
+            A constant background level subtracted from every pixel before the moments are taken, either one level for the whole stack or one per image.
+        blocksize (OPTIONAL) : integer
+            The number of images handled at a time.
+        rowchunk (OPTIONAL) : integer
+            The number of rows of each image handled at a time.
+    """
+    stackar = np.asarray(stack)
+    if stackar.ndim != 3:
+        raise ValueError('the stack needs to be a 3D array of shape (number of images, height, width), not shape ' + str(stackar.shape))
+
+    # find the moments one block of images at a time
+    results = np.zeros(stackar.shape[0], dtype=MOMENT_DTYPE)
+    background = np.broadcast_to(np.asarray(background, dtype=np.float64), stackar.shape[:1])
+    for start in range(0, stackar.shape[0], blocksize):
+        results[start:start+blocksize] = _metrics(_raw_moments(stackar[start:start+blocksize], rowchunk), stackar.shape[1], stackar.shape[2],
+                                                  background[start:start+blocksize])
+    return(results)
@@ -8,7 +8,6 @@ Created on Fri Jan  26 01:00:00 2024
 Description : A file for plotting utilities and functions that format plots.
 """
 # import random needed packages that should already be installed
-import cv2
 import numpy as np
 import matplotlib.pyplot as plt
 from PIL import Image
@@ -7,21 +7,70 @@ Created on Fri Jan  26 01:00:00 2024
 
 Description : A file for functions that make images look prettier.
 """
-# import random needed packages that should already be installed
-import cv2
+# import random needed packages that should already be installed (OpenCV is only imported inside the functions that use it, so that the analysis doesn't
+# have to wait for it to load)
 import numpy as np
-import matplotlib.pyplot as plt
-from PIL import Image
+from collections import OrderedDict
+from functools import lru_cache
+from importlib.util import find_spec
 from scipy import ndimage
 
 # import from other modules in the package
-from gaussbean.utils import calc_utils
+from gaussbean.utils import calc_utils, profile_utils
 
 #########################
 ### START OF FUNCTIONS
 #########################
 
-def thru_median(mediansize, repeatamount=0, imgpath='', imgar=[]):
+def _median_opencv(arrayimg, mediansize, method):
+    """ Returns True if the median filter should use OpenCV's medianBlur() (a constant-time, histogram-based median for 8-bit images) instead of scipy. This
+    function shouldn't be called by the user at any point.
+    """
+    if method == 'scipy':
+        return(False)
+
+    # medianBlur() only takes odd, square kernels; any size works for uint8, but uint16 and float32 only work with sizes 3 and 5
+    supported = (arrayimg.ndim == 2 and mediansize % 2 == 1 and (arrayimg.dtype == np.uint8 or
+                 (arrayimg.dtype in (np.uint16, np.float32) and mediansize in (3, 5))))
+    if method == 'opencv':
+        if not supported:
+            raise ValueError('OpenCV can only median filter 2D uint8 images (any odd size) or uint16/float32 images (size 3 or 5), not a ' + str(arrayimg.dtype) +
+                             ' image with size ' + str(mediansize))
+        return(True)
+
+    # for "auto", use OpenCV whenever it can do the job and is installed
+    return(supported and find_spec('cv2') is not None)
+
+########################################################
+
+def _median_passes(arrayimg, mediansize, passes, out, scratch, useopencv):
+    """ Runs an image through the median filter the given number of times, bouncing between two buffers (out and scratch) instead of keeping a new copy of the
+    image for every pass. The input image is never changed and the result always ends up in out. This function shouldn't be called by the user at any point.
+    """
+    if useopencv:
+        import cv2
+
+    # the passes alternate between the two buffers so that the LAST pass writes into out
+    src = np.ascontiguousarray(arrayimg) if useopencv else arrayimg
+    for i in range(passes):
+        dst = out if (passes - 1 - i) % 2 == 0 else scratch
+        if useopencv:
+            # OpenCV can only write straight into a contiguous dst of the same dtype (it fails on, or makes a new array instead of, anything else), so any
+            # other dst gets the result copied into it
+            usable = dst.flags.c_contiguous and dst.dtype == src.dtype
+            result = cv2.medianBlur(src, mediansize, dst=dst if usable else None)
+            if result is not dst:
+                dst[...] = result
+            src = result
+        else:
+            ndimage.median_filter(src, size=mediansize, output=dst)
+            src = dst
+    return(out)
+
+########################################################
+
+@profile_utils.timed()
+def thru_median(mediansize, repeatamount=0, imgpath='', imgar=[], out=None, method='scipy'):
     """ Returns an image in the form of an array that has been run through a median filter a specified number of times.
     
         Parameters
@@ -34,24 +83,65 @@ def thru_median(mediansize, repeatamount=0, imgpath='', imgar=[]):
             The path to the image that the user wants to run through the median filter.
         imgar (OPTIONAL) : array
             The image array that the user wants to run through the median filter.
+        out (OPTIONAL) : array
+            An array (same shape and dtype as the image) to write the filtered image into, so no new array has to be made.
+        method (OPTIONAL) : string
+            "scipy" (the default) uses scipy's median_filter(), "opencv" uses OpenCV's much faster medianBlur() (odd sizes only; uint8 images, or uint16/float32
+            images with size 3 or 5), and "auto" uses OpenCV whenever it can. The two only differ within mediansize/2 pixels of the edges of the image (scipy
+            reflects the image at the edges, OpenCV repeats the edge pixels), which is why OpenCV has to be asked for.
     """
     # set the array of the image to whatever the user specifies (either based on the image path OR an array that the user inputs)
     arrayimg = calc_utils.check_array(imgpath, imgar)
 
-    # create an array for the median filter images and append to this array when a change to the image is made
-    result = [ndimage.median_filter(np.array(arrayimg), size=mediansize)]
-
-    # for loop to repeat the specified number of times the user wants the median filter to be run over the image
-    for i in range(2, repeatamount+1):
-        result.append(ndimage.median_filter(result[i-2], size=mediansize))
+    # only two buffers are ever needed (the one being read and the one being written), no matter how many times the filter is run
+    passes = max(1, repeatamount)
+    if out is None:
+        out = np.empty_like(arrayimg)
+    scratch = np.empty_like(arrayimg) if passes > 1 else None
 
     # return the result after running through the median filter
-    return(result[-1])
+    return(_median_passes(arrayimg, mediansize, passes, out, scratch, _median_opencv(arrayimg, mediansize, method)))
 
 ########################################################
 
+@profile_utils.timed()
+def thru_median_stack(mediansize, stack, repeatamount=0, out=None, method='scipy'):
+    """ Returns a whole stack of images (a 3D array of shape (number of images, height, width)) with every image run through a median filter a specified number of
+    times, exactly like thru_median() does for one image. Only one extra image worth of memory is used, however big the stack is.
+
+        Parameters
+        ----------
+        mediansize : integer
+            The size of the median filter in pixels (generally want this to be small; from 3-10 pixels).
+        stack : array
+            3D array of images. This can be a memory-mapped stack; it is read one image at a time.
+        repeatamount (OPTIONAL) : integer
+            The number of times the user wants to run every image through the median filter. Default is to run over every image only once.
+        out (OPTIONAL) : array
+            A 3D array (same shape and dtype as the stack, for example a memory map opened for writing) to write the filtered images into.
+        method (OPTIONAL) : string
+            "scipy" (the default), "opencv" or "auto", exactly like in thru_median().
+    """
+    stackar = np.asarray(stack)
+    passes = max(1, repeatamount)
+    if out is None:
+        out = np.empty_like(stackar)
+    scratch = np.empty_like(stackar[0]) if passes > 1 else None
+
+    # every image is filtered straight into its place in the output, sharing the same scratch buffer
+    useopencv = _median_opencv(stackar[0], mediansize, method)
+    for i in range(stackar.shape[0]):
+        _median_passes(stackar[i], mediansize, passes, out[i], scratch, useopencv)
+
+    # return the filtered stack
+    return(out)
+
+########################################################
+
+@profile_utils.timed()
 def thru_lowpass(radius, imgpath='', imgar=[]):
-    """ Returns an image in the form of an array that has been run through a low-pass filter one time.
+    """ Returns an image in the form of an array that has been run through a low-pass filter one time, with the same dtype as the image. The mask for every
+    (image shape, radius) is only made once and reused after that (see LowPassFilter, which can also filter a whole stack of images at once).
 
         Parameters
         ----------
@@ -64,39 +154,22 @@ def thru_lowpass(radius, imgpath='', imgar=[]):
     """
     # set the array of the image to whatever the user specifies (either based on the image path OR an array that the user inputs)
     arrayimg = calc_utils.check_array(imgpath, imgar)
-    
-    # perform a fourier transform and save the complex output
-    ft = np.fft.fft2(arrayimg, axes=(0,1))
-
-    # shift the origin to the center of the image
-    ft_shift = np.fft.fftshift(ft)
 
-    # create a circular mask using size specified in the cell above
-    mask = np.zeros_like(arrayimg) # --> returns an array of zeros the same shape as the image
-    cy = mask.shape[0] // 2
-    cx = mask.shape[1] // 2
-    cv2.circle(mask, (cx,cy), radius, (255,255,255), -1)[0]
-
-    # blur the mask to prevent artifacts on the image
-    finalmask = cv2.GaussianBlur(mask, (19,19), 0)
-
-    # apply the mask to the shifted fourier transform of the image
-    masked_ft_shifted = np.multiply(ft_shift,finalmask) / 255
-
-    # shift origin from center to upper left corner (basically return the image to its original state before using fft to get back)
-    back_ishift_masked = np.fft.ifftshift(masked_ft_shifted)
-
-    # do inverse fft and save as complex output
-    filteredimg = np.fft.ifft2(back_ishift_masked, axes=(0,1))
+    # return the filtered image
+    return(_lowpass_filter(radius).filter(arrayimg))
 
-    # combine complex real and imaginary components to form (the magnitude for) the original image again
-    filteredimg = np.abs(filteredimg).clip(0,255).astype(np.uint8)
+########################################################
 
-    # return the filtered image
-    return(filteredimg)
+@lru_cache(maxsize=4)
+def _lowpass_filter(radius):
+    """ Returns the LowPassFilter for a radius, shared between every call of thru_lowpass() (so its masks are only made once). Only a few filters (each with
+    only a few masks) are kept, so the memory they hold stays bounded. This function shouldn't be called by the user at any point.
+    """
+    return(LowPassFilter(radius))
 
 ########################################################
 
+@profile_utils.timed()
 def back_subtract(origpath='', backpath='', origimgar=[], backimgar=[]):
     """ Returns an image in the form of an array after the background image provided is subtracted from the original image.
 
@@ -117,11 +190,42 @@ def back_subtract(origpath='', backpath='', origimgar=[], backimgar=[]):
     # set the array of the original image to whatever the user specifies (either based on the image path OR an array that the user inputs)
     backimg = calc_utils.check_array(backpath, backimgar)
 
-    # return the array of the image after background subtraction
-    return(origimg - backimg)
+    # return the array of the image after background subtraction (pixels darker than the background become zero instead of wrapping around)
+    return(saturating_subtract(np.asarray(origimg), np.asarray(backimg)))
+
+########################################################
+
+def saturating_subtract(origimg, backimg, out=None):
+    """ Returns origimg - backimg, but for unsigned integer images (uint8, uint16, ...) any pixel where the background is brighter than the image becomes zero
+    instead of wrapping around to a huge value. The result has the same dtype as the original image and no bigger temporary arrays are made.
+
+        Parameters
+        ----------
+        origimg : array
+            The original image (or stack of images).
+        backimg : array
+            The background to subtract (anything that broadcasts against the original image, for example one background image for a whole stack).
+        out (OPTIONAL) : array
+            An array to write the result into (this can be origimg itself, in which case one temporary array the size of the result is made).
+    """
+    if out is None:
+        out = np.empty(np.broadcast_shapes(origimg.shape, backimg.shape), dtype=origimg.dtype)
+
+    if np.issubdtype(origimg.dtype, np.unsignedinteger):
+        # subtracting min(image, background) can never go below zero, so nothing wraps around. When the result is written over the original image, the
+        # minimum goes into a scratch array instead (writing it into out would overwrite the image before it is subtracted from)
+        if np.may_share_memory(out, origimg):
+            low = np.minimum(origimg, backimg).astype(out.dtype, copy=False)
+        else:
+            low = np.minimum(origimg, backimg, out=out, casting='unsafe')
+        np.subtract(origimg, low, out=out)
+    else:
+        np.subtract(origimg, backimg, out=out, casting='unsafe')
+    return(out)
 
 ########################################################
 
+@profile_utils.timed()
 def crop_image(xpoint, ypoint, xmargins, ymargins, imgpath='', imgar=[]):
     """ Returns an image in the form of an array after being cropped the amount specified around the point specified.
 
@@ -148,3 +252,218 @@ def crop_image(xpoint, ypoint, xmargins, ymargins, imgpath='', imgar=[]):
 
     # return the cropped image array
     return(finalimgar)
+
+#########################
+### START OF CLASSES
+#########################
+
+class LowPassFilter:
+    """ A reusable low-pass filter. The blurred circular mask is made only once for every image shape (already shifted into the layout of the FFT and cut down to
+    the half of the spectrum a real-input FFT gives), and the images are filtered with real-input FFTs (rfft2/irfft2) in float32, which does about half the work
+    and uses a quarter of the memory of the full complex FFT. The filtered images keep the dtype of the images that went in (integer images are clipped to the
+    range of their dtype).
+
+    Only the masks of the maxmasks most recently used image shapes are kept, so a long run over images of many different sizes doesn't keep every mask forever.
+
+        Parameters
+        ----------
+        radius : integer
+            The radius of the mask used for the low-pass filter in pixels.
+        maxmasks (OPTIONAL) : integer
+            The number of masks (one per image shape) kept for reuse.
+    """
+    def __init__(self, radius, maxmasks=4):
+        self.radius = radius
+        self.maxmasks = maxmasks
+        self._masks = OrderedDict()
+
+    def mask(self, shape):
+        """ Returns the mask for images of the given (height, width), ready to be multiplied with the output of np.fft.rfft2().
+
+            Parameters
+            ----------
+            shape : tuple
+                The (height, width) of the images.
+        """
+        shape = tuple(shape)
+        if shape in self._masks:
+            self._masks.move_to_end(shape)
+        else:
+            # OpenCV is only needed for drawing and blurring the mask
+            import cv2
+
+            # create a circular mask around the center of the (shifted) spectrum and blur it to prevent artifacts on the image
+            mask = np.zeros(shape, dtype=np.uint8)
+            cv2.circle(mask, (shape[1] // 2, shape[0] // 2), self.radius, 255, -1)
+            mask = cv2.GaussianBlur(mask, (19,19), 0).astype(np.float32) / 255
+
+            # shift the origin from the center back to the upper left corner (where the FFT puts it) and keep only the half of the spectrum rfft2 gives
+            self._masks[shape] = np.fft.ifftshift(mask)[:, :shape[1] // 2 + 1]
+
+            # forget the mask that was used the longest time ago if there are too many
+            if len(self._masks) > self.maxmasks:
+                self._masks.popitem(last=False)
+        return(self._masks[shape])
+
+    def filter(self, imgar):
+        """ Returns one image run through the low-pass filter, with the same dtype as the image (like thru_lowpass()).
+
+            Parameters
+            ----------
+            imgar : array
+                The image array to filter.
+        """
+        return(self.filter_stack(np.asarray(imgar)[np.newaxis])[0])
+
+    @profile_utils.timed()
+    def filter_stack(self, stack, out=None, blocksize=8):
+        """ Returns a whole stack of images (a 3D array of shape (number of images, height, width)) with every image run through the low-pass filter, with the
+        same dtype as the stack. The images are transformed a block at a time with one batched FFT per block.
+
+            Parameters
+            ----------
+            stack : array
+                3D array of images. This can be a memory-mapped stack; it is read one block at a time.
+            out (OPTIONAL) : array
+                An array of the same shape (and normally the same dtype) as the stack to write the filtered images into.
+            blocksize (OPTIONAL) : integer
+                The number of images transformed together.
+        """
+        stackar = np.asarray(stack)
+        shape = stackar.shape[1:]
+        mask = self.mask(shape)
+        if out is None:
+            out = np.empty_like(stackar)
+
+        # the magnitude of the filtered images is clipped to the range of the output dtype (for 8-bit images that is 0-255, just like it always has been)
+        top = np.iinfo(out.dtype).max if np.issubdtype(out.dtype, np.integer) else None
+
+        for start in range(0, stackar.shape[0], blocksize):
+            # transform the block, apply the mask and transform back (the result of irfft2 is already real)
+            block = stackar[start:start+blocksize].astype(np.float32)
+            filtered = np.fft.irfft2(np.fft.rfft2(block, axes=(1,2)) * mask, s=shape, axes=(1,2))
+
+            # take the magnitude and bring it back into the range of the original images
+            np.abs(filtered, out=filtered)
+            if top is not None:
+                filtered.clip(0, top, out=filtered)
+            out[start:start+blocksize] = filtered
+        return(out)
+
+########################################################
+
+class BackgroundModel:
+    """ A background built up from dark frames one frame (or block of frames) at a time, which can then be subtracted from every frame of a run. The background
+    is either the mean or the median of the dark frames (the median ignores the odd hot pixel or cosmic ray in a dark frame). Subtraction is saturating (see
+    saturating_subtract()), keeps the dtype of the frames, and works through the run a block at a time into a preallocated output, so a whole memory-mapped run
+    can be background subtracted without ever being in memory.
+
+    The mean only keeps a running sum (one float64 image), however many dark frames are added. The median needs the dark frames themselves, so it keeps at most
+    maxframes of them (maxframes times the size of one frame in memory): once more than that have been added, the frames kept are an even random sample
+    (a reservoir sample) of every dark frame added so far, and the background is the median of that sample.
+
+        Parameters
+        ----------
+        method (OPTIONAL) : string
+            "median" (the default) or "mean".
+        maxframes (OPTIONAL) : integer
+            The most dark frames the median keeps in memory.
+        seed (OPTIONAL) : integer
+            The seed of the random sample the median keeps, so the same dark frames always give the same background.
+    """
+    def __init__(self, method='median', maxframes=64, seed=0):
+        if method not in ('median', 'mean'):
+            raise ValueError('method needs to be "median" or "mean", not ' + repr(method))
+        self.method = method
+        self.maxframes = maxframes
+        self.count = 0
+        self.dtype = None
+        self._sum = None
+        self._frames = []
+        self._rng = np.random.default_rng(seed)
+        self._background = None
+
+    def add(self, frames):
+        """ Adds one dark frame (2D array) or a block of dark frames (3D array) to the background.
+
+            Parameters
+            ----------
+            frames : array
+                The dark frame(s).
+        """
+        block = np.asarray(frames)
+        if block.ndim == 2:
+            block = block[np.newaxis]
+        if self.dtype is None:
+            self.dtype = block.dtype
+
+        # the mean only needs a running sum, but the median needs the dark frames themselves (at most maxframes of them: every new frame past that replaces a
+        # random one of them with the chance of maxframes/count, so every dark frame is equally likely to be kept)
+        if self.method == 'mean':
+            blocksum = block.sum(axis=0, dtype=np.float64)
+            self._sum = blocksum if self._sum is None else self._sum + blocksum
+            self.count += block.shape[0]
+        else:
+            for frame in block:
+                self.count += 1
+                if len(self._frames) < self.maxframes:
+                    self._frames.append(np.array(frame))
+                else:
+                    index = self._rng.integers(0, self.count)
+                    if index < self.maxframes:
+                        self._frames[index] = np.array(frame)
+        self._background = None
+        return(self)
+
+    def add_frames(self, imglist):
+        """ Adds every frame of a list of dark images (or anything else io_utils.frame_sources() understands) to the background, one frame at a time.
+
+            Parameters
+            ----------
+            imglist : array
+                The dark images.
+        """
+        from gaussbean.utils import io_utils
+        for source in io_utils.frame_sources(imglist):
+            self.add(io_utils.load_frame(source))
+        return(self)
+
+    @property
+    def background(self):
+        """ The background image (with the same dtype as the dark frames).
+        """
+        if self.count == 0:
+            raise ValueError('no dark frames have been added to the background yet')
+        if self._background is None:
+            if self.method == 'mean':
+                background = self._sum / self.count
+            else:
+                background = np.median(np.stack(self._frames), axis=0)
+            if np.issubdtype(self.dtype, np.integer):
+                background = np.rint(background)
+            self._background = background.astype(self.dtype)
+        return(self._background)
+
+    @profile_utils.timed()
+    def subtract(self, stack, out=None, blocksize=64):
+        """ Returns a frame (2D array) or stack of frames (3D array) with the background subtracted.
+
+            Parameters
+            ----------
+            stack : array
+                The frame or stack of frames. This can be a memory-mapped stack; it is read one block at a time.
+            out (OPTIONAL) : array
+                An array of the same shape and dtype as the stack to write the result into (for example a memory map opened for writing, or the stack itself).
+            blocksize (OPTIONAL) : integer
+                The number of frames processed together.
+        """
+        stackar = np.asarray(stack)
+        background = self.background
+        if out is None:
+            out = np.empty_like(stackar)
+        if stackar.ndim == 2:
+            return(saturating_subtract(stackar, background, out=out))
+
+        for start in range(0, stackar.shape[0], blocksize):
+            saturating_subtract(stackar[start:start+blocksize], background, out=out[start:start+blocksize])
+        return(out)
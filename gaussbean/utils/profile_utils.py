@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Fri Oct  16 22:00:00 2026
+
+@author: leahghartman
+
+Description : A file for timing every stage of the analysis (decoding, filters, centroid, projections, FWHM, ...). Profiling is off unless it is turned on
+with enable() or profile(); while it is off, every instrumented function only pays for one check of a flag. While it is on, the wall time, number of calls
+and bytes of image data handled are added up for every stage, and (if asked for) every call is kept as an event for a Chrome trace (chrome://tracing or
+https://ui.perfetto.dev). The numbers from worker processes are sent back and merged in by dataset.iter_set_*().
+"""
+# import random needed packages that should already be installed
+import os
+import json
+import time
+import threading
+import functools
+import contextlib
+import numpy as np
+
+# whether profiling is on, and whether every call is also kept as a trace event (module-level, so checking them is as cheap as possible)
+_enabled = False
+_tracing = False
+
+# the totals of every stage (name: [calls, seconds, bytes]), the trace events, and the lock that keeps threads (like the decoding threads of a
+# PrefetchLoader) from adding to them at the same time
+_records = {}
+_events = []
+_maxevents = 1000000
+_dropped = 0
+_lock = threading.Lock()
+
+#########################
+### START OF FUNCTIONS
+#########################
+
+def enable(trace=False, maxevents=1000000):
+    """ Turns profiling on (the totals already recorded are kept; use reset() to start over).
+
+        Parameters
+        ----------
+        trace (OPTIONAL) : boolean
+            Whether to keep every call as an event for write_trace() as well, instead of only the totals.
+        maxevents (OPTIONAL) : integer
+            The most trace events kept (any more are counted but dropped), so tracing a very long run can't fill up memory.
+    """
+    global _enabled, _tracing, _maxevents
+    _enabled = True
+    _tracing = trace
+    _maxevents = maxevents
+
+########################################################
+
+def disable():
+    """ Turns profiling off. Everything recorded so far is kept.
+    """
+    global _enabled, _tracing
+    _enabled = False
+    _tracing = False
+
+########################################################
+
+def enabled():
+    """ Returns whether profiling is on.
+    """
+    return(_enabled)
+
+########################################################
+
+def tracing():
+    """ Returns whether every call is being kept as a trace event.
+    """
+    return(_tracing)
+
+########################################################
+
+def reset():
+    """ Forgets everything recorded so far.
+    """
+    global _dropped
+    with _lock:
+        _records.clear()
+        del _events[:]
+        _dropped = 0
+
+########################################################
+
+def _record(name, start, end, nbytes):
+    """ Adds one call of a stage to the totals (and to the trace, if it is on). This function shouldn't be called by the user at any point.
+    """
+    global _dropped
+    with _lock:
+        record = _records.get(name)
+        if record is None:
+            record = _records[name] = [0, 0.0, 0]
+        record[0] += 1
+        record[1] += end - start
+        record[2] += nbytes
+        if _tracing:
+            if len(_events) < _maxevents:
+                _events.append((name, start, end, os.getpid(), threading.get_ident()))
+            else:
+                _dropped += 1
+
+########################################################
+
+def _nbytes(values):
+    """ Returns the number of bytes in every array among some values. This function shouldn't be called by the user at any point.
+    """
+    return(sum(value.nbytes for value in values if isinstance(value, np.ndarray)))
+
+########################################################
+
+@contextlib.contextmanager
+def _timing(name, nbytes):
+    """ The context manager stage() hands out while profiling is on. This function shouldn't be called by the user at any point.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, start, time.perf_counter(), nbytes)
+
+########################################################
+
+def stage(name, nbytes=0):
+    """ Returns a context manager that times the code inside of it as one call of a stage (for example "with profile_utils.stage('single.crop'): ..."). While
+    profiling is off, it does nothing.
+
+        Parameters
+        ----------
+        name : string
+            The name of the stage.
+        nbytes (OPTIONAL) : integer
+            The number of bytes of data the stage handles.
+    """
+    if not _enabled:
+        return(contextlib.nullcontext())
+    return(_timing(name, nbytes))
+
+########################################################
+
+def timed(name=None, countresult=False):
+    """ Returns a decorator that times every call of a function as one call of a stage. The bytes handled are the bytes of every array given to the function
+    (or, with countresult=True, of the array it returns, for functions like decoding that get a path rather than an array). While profiling is off, the only
+    cost is one check of a flag.
+
+        Parameters
+        ----------
+        name (OPTIONAL) : string
+            The name of the stage. Default is the module and name of the function (for example "calc_utils.find_centroid").
+        countresult (OPTIONAL) : boolean
+            Whether to count the bytes of the result instead of the bytes of the arguments.
+    """
+    def decorator(func):
+        stagename = name if name is not None else func.__module__.rsplit('.', 1)[-1] + '.' + func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return(func(*args, **kwargs))
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            end = time.perf_counter()
+            nbytes = _nbytes([result] if countresult else list(args) + list(kwargs.values()))
+            _record(stagename, start, end, nbytes)
+            return(result)
+        return(wrapper)
+    return(decorator)
+
+########################################################
+
+def records():
+    """ Returns a dictionary with the totals of every stage recorded so far: {name: {'calls': ..., 'seconds': ..., 'bytes': ...}}.
+    """
+    with _lock:
+        return({name: {'calls': calls, 'seconds': seconds, 'bytes': nbytes} for name, (calls, seconds, nbytes) in _records.items()})
+
+########################################################
+
+def collect():
+    """ Returns everything recorded so far in this process (the totals, the trace events and the number of dropped events) and forgets it, so it can be sent
+    to another process and merged in there with merge(). This is how the numbers of worker processes get back to the main process.
+    """
+    global _dropped
+    with _lock:
+        snapshot = ({name: list(record) for name, record in _records.items()}, list(_events), _dropped)
+        _records.clear()
+        del _events[:]
+        _dropped = 0
+    return(snapshot)
+
+########################################################
+
+def merge(snapshot):
+    """ Adds what another process recorded (from its collect()) to the totals and trace of this process.
+
+        Parameters
+        ----------
+        snapshot : tuple
+            The result of collect() in the other process.
+    """
+    global _dropped
+    otherrecords, otherevents, otherdropped = snapshot
+    with _lock:
+        for name, (calls, seconds, nbytes) in otherrecords.items():
+            record = _records.get(name)
+            if record is None:
+                record = _records[name] = [0, 0.0, 0]
+            record[0] += calls
+            record[1] += seconds
+            record[2] += nbytes
+        room = max(_maxevents - len(_events), 0)
+        _events.extend(otherevents[:room])
+        _dropped += otherdropped + max(len(otherevents) - room, 0)
+
+########################################################
+
+def summary():
+    """ Returns a table (as a string) of every stage recorded so far, slowest first: the number of calls, the total and mean time, and the throughput of the
+    stages that handle arrays. Stages are nested (single_image_proj() includes find_centroid(), for example), so the times don't add up to the total.
+    """
+    lines = ['%-40s %10s %12s %12s %12s' % ('stage', 'calls', 'total s', 'mean ms', 'MB/s')]
+    for name, record in sorted(records().items(), key=lambda item: -item[1]['seconds']):
+        rate = record['bytes']/record['seconds']/2**20 if record['bytes'] > 0 and record['seconds'] > 0 else np.nan
+        lines.append('%-40s %10d %12.4f %12.4f %12.1f' % (name, record['calls'], record['seconds'], 1e3*record['seconds']/record['calls'], rate))
+    if _dropped > 0:
+        lines.append('(%d trace events were dropped)' % _dropped)
+    return('\n'.join(lines))
+
+########################################################
+
+def write_trace(path):
+    """ Writes the trace events recorded so far to a Chrome trace JSON file (open it in chrome://tracing or https://ui.perfetto.dev). Every worker process
+    shows up as its own process, and every thread as its own row.
+
+        Parameters
+        ----------
+        path : string
+            The path of the JSON file.
+    """
+    with _lock:
+        events = list(_events)
+    origin = min((event[1] for event in events), default=0.0)
+    trace = [{'name': name, 'cat': name.split('.', 1)[0], 'ph': 'X', 'ts': 1e6*(start - origin), 'dur': 1e6*(end - start), 'pid': pid, 'tid': tid}
+             for name, start, end, pid, tid in events]
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+
+########################################################
+
+@contextlib.contextmanager
+def profile(trace=False, maxevents=1000000):
+    """ A context manager that profiles everything inside of it: it forgets anything recorded before, turns profiling on, and turns it off again at the end
+    (for example "with profile_utils.profile(): dataset.full_set_proj(...)" and then "print(profile_utils.summary())").
+
+        Parameters
+        ----------
+        trace (OPTIONAL) : boolean
+            Whether to keep every call as a trace event as well.
+        maxevents (OPTIONAL) : integer
+            The most trace events kept.
+    """
+    reset()
+    enable(trace, maxevents)
+    try:
+        yield
+    finally:
+        disable()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Fri Oct  16 15:00:00 2026
+
+@author: leahghartman
+
+Description : A file for regions of interest (ROIs), which describe crops of an image without copying any of the image.
+"""
+# import random needed packages that should already be installed
+import numpy as np
+
+# import from other modules in the package
+from gaussbean.utils import calc_utils
+
+#########################
+### START OF CLASSES
+#########################
+
+class ROI:
+    """ A rectangular region of interest of an image (or of every image in a stack). An ROI only stores where it is (its origin and size in the coordinates of
+    the ORIGINAL image) and a reference to the original image, so cropping an ROI again gives another ROI of the same original image rather than a crop of a
+    crop. The pixels are only handed out as a view (no copy) through .view, or as a contiguous copy through .copy().
+
+        Parameters
+        ----------
+        parent : array
+            The original image (2D array) or stack of images (3D array, in which case the ROI is the same region of every image).
+        x0 (OPTIONAL) : integer
+            The column of the original image the ROI starts at.
+        y0 (OPTIONAL) : integer
+            The row of the original image the ROI starts at.
+        width (OPTIONAL) : integer
+            The width of the ROI in pixels. Default is everything to the right of x0.
+        height (OPTIONAL) : integer
+            The height of the ROI in pixels. Default is everything below y0.
+    """
+    __slots__ = ('parent', 'x0', 'y0', 'width', 'height')
+
+    def __init__(self, parent, x0=0, y0=0, width=None, height=None):
+        self.parent = parent
+        parentheight, parentwidth = parent.shape[-2:]
+
+        # keep the ROI inside of the original image
+        self.x0 = min(max(int(x0), 0), parentwidth)
+        self.y0 = min(max(int(y0), 0), parentheight)
+        self.width = parentwidth - self.x0 if width is None else min(max(int(width), 0), parentwidth - self.x0)
+        self.height = parentheight - self.y0 if height is None else min(max(int(height), 0), parentheight - self.y0)
+
+    def __repr__(self):
+        return('ROI(x0=%d, y0=%d, width=%d, height=%d)' % (self.x0, self.y0, self.width, self.height))
+
+    @property
+    def shape(self):
+        """ The shape of the pixels of the ROI (the same as .view.shape).
+        """
+        return(self.parent.shape[:-2] + (self.height, self.width))
+
+    @property
+    def view(self):
+        """ The pixels of the ROI as a view into the original image (nothing is copied, so changing it changes the original image).
+        """
+        return(self.parent[..., self.y0:self.y0+self.height, self.x0:self.x0+self.width])
+
+    def __array__(self, dtype=None, copy=None):
+        return(np.asarray(self.view, dtype=dtype))
+
+    def copy(self):
+        """ Returns the pixels of the ROI as a new, contiguous array that doesn't keep the original image in memory.
+        """
+        return(np.array(self.view))
+
+    def crop(self, xpoint, ypoint, xmargins, ymargins):
+        """ Returns a new ROI, cropped the amount specified around the point specified, exactly like pre_utils.crop_image() would crop the pixels of this ROI (except
+        that a crop going past the edge of this ROI is cut off at the edge, on every side).
+
+            Parameters
+            ----------
+            xpoint : integer
+                x-coordinate (relative to this ROI) of the point at which the crop will be occurring.
+            ypoint : integer
+                y-coordinate (relative to this ROI) of the point at which the crop will be occurring.
+            xmargins : integer
+                A number (in pixels) of how far in the x-direction, on either side of the cropping point, the crop goes.
+            ymargins : integer
+                A number (in pixels) of how far in the y-direction, on either side of the cropping point, the crop goes.
+        """
+        # work out the edges of the crop relative to this ROI (rounded the same way crop_image() does) and cut them off at the edges of this ROI
+        left = min(max(round(xpoint-xmargins), 0), self.width)
+        right = min(max(round(xpoint+xmargins), left), self.width)
+        top = min(max(round(ypoint-ymargins), 0), self.height)
+        bottom = min(max(round(ypoint+ymargins), top), self.height)
+
+        # return the crop as an ROI of the ORIGINAL image
+        return(ROI(self.parent, self.x0 + left, self.y0 + top, right - left, bottom - top))
+
+    def to_absolute(self, x, y):
+        """ Returns the coordinates (in the original image) of a point given relative to this ROI.
+
+            Parameters
+            ----------
+            x : integer or float
+                x-coordinate relative to this ROI.
+            y : integer or float
+                y-coordinate relative to this ROI.
+        """
+        return(x + self.x0, y + self.y0)
+
+########################################################
+
+class BeamTracker:
+    """ Follows the beam through a run, frame after frame, so that the crop of each frame can be cut straight around where the beam is expected instead of
+    searching the whole initial crop for it (see dataset.iter_set_proj()). The guess for the next frame is the refined centroid of the last frame, or, with
+    predict=True, that centroid moved on by the shift between the last two frames (for a beam that drifts steadily). A frame only counts as tracked if the
+    beam is found within maxshift pixels of the guess; otherwise the frame is searched for the usual way and tracking starts over from there.
+
+        Parameters
+        ----------
+        maxshift (OPTIONAL) : tuple
+            How far (x, y in pixels) the refined centroid can be from the guess for the beam to count as found. Default is half of the margins of the crop.
+        predict (OPTIONAL) : boolean
+            Whether to move the guess on by the shift between the last two frames.
+    """
+    def __init__(self, maxshift=None, predict=False):
+        self.maxshift = maxshift
+        self.predict = predict
+        self.tracked = 0
+        self.searched = 0
+        self.reset()
+
+    def reset(self):
+        """ Forgets where the beam was, so the next frame is searched for the usual way.
+        """
+        self.position = None
+        self.shift = (0, 0)
+
+    def guess(self):
+        """ Returns the (x, y) in the original image where the beam is expected in the next frame, or None if there is no guess yet.
+        """
+        if self.position is None:
+            return(None)
+        if self.predict:
+            return(int(round(self.position[0] + self.shift[0])), int(round(self.position[1] + self.shift[1])))
+        return(int(round(self.position[0])), int(round(self.position[1])))
+
+    def found(self, guess, centroid, xmargins, ymargins):
+        """ Returns whether the refined centroid of a frame that was cropped around a guess is close enough to the guess for the beam to count as found
+        (when the beam isn't in the crop at all, the maximum of the projections lands anywhere in it, usually far from the middle).
+
+            Parameters
+            ----------
+            guess : tuple
+                The (x, y) the crop was cut around.
+            centroid : tuple
+                The (x, y) refined centroid found in the crop, in the coordinates of the original image.
+            xmargins, ymargins : integer
+                The margins of the crop.
+        """
+        maxx, maxy = (xmargins/2, ymargins/2) if self.maxshift is None else self.maxshift
+        return(abs(centroid[0] - guess[0]) <= maxx and abs(centroid[1] - guess[1]) <= maxy)
+
+    def update(self, x, y, tracked):
+        """ Records the refined centroid (in the original image) of the frame that was just analyzed.
+
+            Parameters
+            ----------
+            x, y : integer or float
+                The refined centroid.
+            tracked : boolean
+                Whether the frame was cropped around the guess (True) or searched for the usual way (False). The shift used by the prediction is only kept
+                between tracked frames, so a beam that jumps doesn't get predicted to keep jumping.
+        """
+        if tracked:
+            self.tracked += 1
+        else:
+            self.searched += 1
+        self.shift = (x - self.position[0], y - self.position[1]) if tracked and self.position is not None else (0, 0)
+        self.position = (x, y)
+
+#########################
+### START OF FUNCTIONS
+#########################
+
+def initial_roi(imgar, initcrop):
+    """ Returns the ROI of an image the beam is searched for in: the initial crop (xpoint, ypoint, xmargins, ymargins) given by the user, which cuts out the dead
+    pixels of their camera, or the whole image if initcrop is None or 'auto' (in which case the beam is found with locate_beam()).
+
+        Parameters
+        ----------
+        imgar : array
+            The image array (or stack of images).
+        initcrop : tuple, None or string
+            The (xpoint, ypoint, xmargins, ymargins) of the initial crop, None for the whole image, or 'auto'.
+    """
+    if initcrop is None or isinstance(initcrop, str):
+        return(ROI(imgar))
+    return(ROI(imgar).crop(*initcrop))
+
+########################################################
+
+def locate_beam(imgar, binning=8, window=64):
+    """ Returns the x- and y-coordinate of the beam in an image. The beam is first found on a binned copy of the image (every binning x binning block of pixels
+    added together, so a narrow beam can't fall between the samples and hot pixels are averaged out), and the coarse position is then refined at full
+    resolution inside of a small window around it. Both steps use the maximum of the projections, like calc_utils.find_centroid() does on the whole image.
+
+        Parameters
+        ----------
+        imgar : array
+            The image array that the user wants to use.
+        binning (OPTIONAL) : integer
+            The size of the blocks of pixels added together for the coarse search (the rows and columns past the last whole block are left out of it).
+        window (OPTIONAL) : integer
+            How far (in pixels) on either side of the coarse position the refined search looks. This needs to be at least the binning.
+    """
+    # bin the image and find the beam on it; the middle of the winning bin is the coarse position. The reshapes only split the axes of the image (so nothing is
+    # copied), and adding up one axis at a time gives the same sums as reshape(height, binning, width, binning).sum((1, 3)), only much faster
+    arrayimg = np.asarray(imgar)
+    binning = max(1, min(binning, *arrayimg.shape))
+    height, width = arrayimg.shape[0]//binning, arrayimg.shape[1]//binning
+    binned = arrayimg[:height*binning, :width*binning].reshape(height, binning, width*binning)
+    binned = binned.sum(axis=1, dtype=calc_utils.accumulator_dtype(arrayimg.dtype, binning*binning)).reshape(height, width, binning).sum(axis=2)
+    coarsex = np.argmax(calc_utils.project(binned, 0))*binning + binning//2
+    coarsey = np.argmax(calc_utils.project(binned, 1))*binning + binning//2
+
+    # refine the position at full resolution in a window around the coarse position, and give it in the coordinates of the whole image
+    roi = ROI(arrayimg).crop(coarsex, coarsey, window, window)
+    view = roi.view
+    return(roi.to_absolute(np.argmax(calc_utils.project(view, 0)), np.argmax(calc_utils.project(view, 1))))
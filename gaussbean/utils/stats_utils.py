@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Fri Oct  16 18:00:00 2026
+
+@author: leahghartman
+
+Description : A file for statistics of a run (mean, standard deviation, min/max, percentiles, jitter) that are updated one frame at a time in constant memory and
+can be merged across worker processes.
+"""
+# import random needed packages that should already be installed
+import math
+import numpy as np
+
+#########################
+### START OF CLASSES
+#########################
+
+class QuantileSketch:
+    """ A streaming quantile sketch with a RELATIVE accuracy guarantee (the same idea as DDSketch): every value is counted in a logarithmic bucket, so any
+    quantile it returns is within relative_accuracy of the true value, no matter how many values went in. The number of buckets only grows with the log of
+    the range of the values (not with the number of values), and two sketches are merged by adding their bucket counts, so merging gives
+    exactly the same sketch as if every value had gone into one. NaN and infinite values have no bucket and are left out.
+
+        Parameters
+        ----------
+        relative_accuracy (OPTIONAL) : float
+            The relative accuracy of the quantiles. Default is 0.1%, which takes about a thousand buckets per factor of ten in the range of the values.
+    """
+    def __init__(self, relative_accuracy=0.001):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy)/(1 - relative_accuracy)
+        self.loggamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zeros = 0
+        self.count = 0
+
+    def _add_buckets(self, store, values):
+        """ Counts positive values in the buckets of a store. The bucket of a value x is ceil(log(x)/log(gamma)).
+        """
+        buckets, counts = np.unique(np.ceil(np.log(values)/self.loggamma).astype(np.int64), return_counts=True)
+        for bucket, count in zip(buckets.tolist(), counts.tolist()):
+            store[bucket] = store.get(bucket, 0) + count
+
+    def add(self, values):
+        """ Adds one value or an array of values (NaN and infinite values are skipped).
+
+            Parameters
+            ----------
+            values : float or array
+                The value(s) to add.
+        """
+        # a single value (the usual case while frames are coming in) is counted straight away
+        if np.ndim(values) == 0:
+            value = float(values)
+            if not math.isfinite(value):
+                return
+            if value > 0:
+                bucket = math.ceil(math.log(value)/self.loggamma)
+                self.positive[bucket] = self.positive.get(bucket, 0) + 1
+            elif value < 0:
+                bucket = math.ceil(math.log(-value)/self.loggamma)
+                self.negative[bucket] = self.negative.get(bucket, 0) + 1
+            else:
+                self.zeros += 1
+            self.count += 1
+            return
+
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[np.isfinite(values)]
+        self._add_buckets(self.positive, values[values > 0])
+        self._add_buckets(self.negative, -values[values < 0])
+        self.zeros += int((values == 0).sum())
+        self.count += len(values)
+
+    def merge(self, other):
+        """ Adds the counts of another sketch (with the same relative accuracy) to this one.
+
+            Parameters
+            ----------
+            other : QuantileSketch
+                The sketch to merge in.
+        """
+        if other.gamma != self.gamma:
+            raise ValueError('only sketches with the same relative accuracy can be merged')
+        for store, otherstore in ((self.positive, other.positive), (self.negative, other.negative)):
+            for bucket, count in otherstore.items():
+                store[bucket] = store.get(bucket, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def quantile(self, q):
+        """ Returns the q-quantile (0 <= q <= 1) of the values added so far, or NaN if there are none.
+
+            Parameters
+            ----------
+            q : float
+                The quantile (so 0.5 is the median and 0.95 the 95th percentile).
+        """
+        if self.count == 0:
+            return(np.nan)
+
+        # the rank of the value we are looking for, counting up from the most negative value
+        rank = q*(self.count - 1)
+
+        # every bucket is represented by the value in its middle (in relative terms), which is what keeps the relative error below the accuracy
+        seen = 0
+        for bucket in sorted(self.negative, reverse=True):
+            seen += self.negative[bucket]
+            if seen > rank:
+                return(-2*self.gamma**bucket/(self.gamma + 1))
+        seen += self.zeros
+        if seen > rank:
+            return(0.0)
+        for bucket in sorted(self.positive):
+            seen += self.positive[bucket]
+            if seen > rank:
+                return(2*self.gamma**bucket/(self.gamma + 1))
+
+########################################################
+
+class OnlineStats:
+    """ The running count, mean, variance (Welford's algorithm, with Chan's formula to add whole arrays or other OnlineStats at once), minimum, maximum and
+    quantiles (see QuantileSketch) of ONE quantity. Non-finite values (NaN for frames where nothing could be measured, or an infinity) are counted separately
+    as failed and otherwise left out, so one bad frame can't turn the mean and std of the whole run into NaN.
+
+        Parameters
+        ----------
+        relative_accuracy (OPTIONAL) : float
+            The relative accuracy of the quantiles.
+    """
+    def __init__(self, relative_accuracy=0.001):
+        self.count = 0
+        self.failed = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def _combine(self, count, mean, m2, minimum, maximum):
+        """ Combines the statistics of another set of values into these ones (Chan et al.'s parallel form of Welford's algorithm).
+        """
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta*count/total
+        self.m2 += m2 + delta**2*self.count*count/total
+        self.count = total
+        self.min = min(self.min, minimum)
+        self.max = max(self.max, maximum)
+
+    def add(self, values):
+        """ Adds one value or an array of values.
+
+            Parameters
+            ----------
+            values : float or array
+                The value(s) to add.
+        """
+        # a single value is a plain Welford update
+        if np.ndim(values) == 0:
+            value = float(values)
+            if not math.isfinite(value):
+                self.failed += 1
+                return
+            self.count += 1
+            delta = value - self.mean
+            self.mean += delta/self.count
+            self.m2 += delta*(value - self.mean)
+            self.min = min(self.min, value)
+            self.max = max(self.max, value)
+            self.sketch.add(value)
+            return
+
+        # an array is reduced first and then combined in one go
+        values = np.asarray(values, dtype=np.float64).ravel()
+        finite = np.isfinite(values)
+        self.failed += len(values) - int(finite.sum())
+        values = values[finite]
+        if len(values) > 0:
+            mean = values.mean()
+            self._combine(len(values), mean, ((values - mean)**2).sum(), values.min(), values.max())
+            self.sketch.add(values)
+
+    def merge(self, other):
+        """ Adds the statistics of another OnlineStats (for example one filled in by a worker process) to these ones.
+
+            Parameters
+            ----------
+            other : OnlineStats
+                The statistics to merge in.
+        """
+        self._combine(other.count, other.mean, other.m2, other.min, other.max)
+        self.failed += other.failed
+        self.sketch.merge(other.sketch)
+
+    @property
+    def variance(self):
+        """ The sample variance (with the n-1 of numpy's ddof=1) of the values, or NaN if there are fewer than two.
+        """
+        return(self.m2/(self.count - 1) if self.count > 1 else np.nan)
+
+    @property
+    def std(self):
+        """ The sample standard deviation of the values. For a centroid this is its shot-to-shot jitter.
+        """
+        return(math.sqrt(self.variance) if self.count > 1 else np.nan)
+
+    def summary(self, quantiles=(0.05, 0.5, 0.95)):
+        """ Returns a dictionary with the count, failed count, mean, std, min, max and the given quantiles (as p5, p50, etc.).
+
+            Parameters
+            ----------
+            quantiles (OPTIONAL) : tuple
+                The quantiles to include.
+        """
+        empty = self.count == 0
+        result = {'count': self.count, 'failed': self.failed, 'mean': np.nan if empty else self.mean, 'std': self.std,
+                  'min': np.nan if empty else self.min, 'max': np.nan if empty else self.max}
+        # a quantile is the middle of its bucket, which can fall just outside of the values themselves, so keep it between the min and max
+        for q in quantiles:
+            result['p' + format(100*q, 'g')] = np.clip(self.sketch.quantile(q), result['min'], result['max'])
+        return(result)
+
+########################################################
+
+class RunStats:
+    """ Running statistics (see OnlineStats) of every per-frame result of a run, for example the FWHM values and centroids, updated as the frames come in and
+    never holding the results themselves. The shot-to-shot jitter of the centroid is the std of the centroid fields. A RunStats filled in by each worker
+    process can be merged into one.
+
+        Parameters
+        ----------
+        fields (OPTIONAL) : tuple
+            The names of the quantities to keep track of.
+        relative_accuracy (OPTIONAL) : float
+            The relative accuracy of the quantiles. Quantities that only change by a tiny fraction of their size (like a centroid far from pixel zero) need a
+            smaller one.
+    """
+    def __init__(self, fields=('xFWHM', 'yFWHM'), relative_accuracy=0.001):
+        self.fields = tuple(fields)
+        self.stats = {name: OnlineStats(relative_accuracy) for name in self.fields}
+
+    def __getitem__(self, name):
+        return(self.stats[name])
+
+    @property
+    def frames(self):
+        """ The number of frames added so far.
+        """
+        first = self.stats[self.fields[0]]
+        return(first.count + first.failed)
+
+    def add(self, **values):
+        """ Adds the results of one frame, or arrays with the results of many frames, given by field name (for example add(xFWHM=71.1, yFWHM=47.1)). A
+        structured array (like the results of stack.stack_proj()) can be added with add(**{name: results[name] for name in stats.fields}).
+
+            Parameters
+            ----------
+            values : keyword arguments
+                The value(s) of every field.
+        """
+        for name in self.fields:
+            self.stats[name].add(values[name])
+
+    def merge(self, other):
+        """ Adds the statistics of another RunStats (with the same fields) to these ones.
+
+            Parameters
+            ----------
+            other : RunStats
+                The statistics to merge in.
+        """
+        for name in self.fields:
+            self.stats[name].merge(other.stats[name])
+
+    def summary(self, quantiles=(0.05, 0.5, 0.95)):
+        """ Returns a dictionary with the summary (see OnlineStats.summary()) of every field.
+
+            Parameters
+            ----------
+            quantiles (OPTIONAL) : tuple
+                The quantiles to include.
+        """
+        return({name: self.stats[name].summary(quantiles) for name in self.fields})
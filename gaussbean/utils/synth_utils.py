@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Fri Oct  16 21:00:00 2026
+
+@author: leahghartman
+
+Description : A file for making synthetic (but realistic) Gaussian beam frames and runs with a known truth, for benchmarks and for checking the analysis when
+there is no real data at hand.
+"""
+# import random needed packages that should already be installed
+import os
+import numpy as np
+from PIL import Image
+
+# the fields of the truth returned by beam_stack() (one entry per frame): the centroid, the RMS sizes along the axes of the beam, its tilt, and the FWHM of
+# the x- and y-projections of the beam (which is what single.single_image_proj() measures)
+TRUTH_DTYPE = np.dtype([('centx', 'f8'), ('centy', 'f8'), ('sigx', 'f8'), ('sigy', 'f8'), ('tilt', 'f8'), ('xFWHM', 'f8'), ('yFWHM', 'f8')])
+
+# the FWHM of a Gaussian is this many times its standard deviation
+SIGMA_TO_FWHM = 2*np.sqrt(2*np.log(2))
+
+#########################
+### START OF FUNCTIONS
+#########################
+
+def _projected_sigmas(sigx, sigy, tilt):
+    """ Returns the standard deviations of the x- and y-projections of a Gaussian beam with RMS sizes sigx and sigy along its own axes, tilted by tilt radians.
+    This function shouldn't be called by the user at any point.
+    """
+    cos, sin = np.cos(tilt), np.sin(tilt)
+    return(np.sqrt((sigx*cos)**2 + (sigy*sin)**2), np.sqrt((sigx*sin)**2 + (sigy*cos)**2))
+
+########################################################
+
+def _draw_beam(canvas, centx, centy, sigx, sigy, tilt, amplitude):
+    """ Adds a tilted Gaussian beam to a float image in place. Only the pixels within six standard deviations of the centroid are computed (everything further
+    out is far below one count), so drawing a small beam on a big frame costs next to nothing. This function shouldn't be called by the user at any point.
+    """
+    height, width = canvas.shape
+    projx, projy = _projected_sigmas(sigx, sigy, tilt)
+    x0, x1 = max(int(centx - 6*projx), 0), min(int(centx + 6*projx) + 2, width)
+    y0, y1 = max(int(centy - 6*projy), 0), min(int(centy + 6*projy) + 2, height)
+    if x0 >= x1 or y0 >= y1:
+        return(canvas)
+
+    # rotate the coordinates of the window into the frame of the beam and add the Gaussian
+    xs = np.arange(x0, x1, dtype=np.float32) - np.float32(centx)
+    ys = np.arange(y0, y1, dtype=np.float32)[:, np.newaxis] - np.float32(centy)
+    cos, sin = np.float32(np.cos(tilt)), np.float32(np.sin(tilt))
+    along = (xs*cos + ys*sin)/np.float32(sigx)
+    across = (ys*cos - xs*sin)/np.float32(sigy)
+    canvas[y0:y1, x0:x1] += np.float32(amplitude)*np.exp(np.float32(-0.5)*(along**2 + across**2))
+    return(canvas)
+
+########################################################
+
+def beam_frame(height=2048, width=2448, centx=None, centy=None, sigx=30.0, sigy=20.0, tilt=0.0, amplitude=0.8, background=0.02, noise=0.01,
+               hotpixels=0, bitdepth=8, seed=None):
+    """ Returns one synthetic camera frame of a Gaussian beam: a tilted Gaussian on a constant background, with Gaussian read noise, some hot pixels, and
+    digitized (and saturated) at the bit depth of the camera. Levels are given as fractions of the full scale of the camera, so the same settings look the
+    same at any bit depth.
+
+        Parameters
+        ----------
+        height (OPTIONAL) : integer
+            The height of the frame in pixels.
+        width (OPTIONAL) : integer
+            The width of the frame in pixels.
+        centx (OPTIONAL) : float
+            The x-coordinate of the centroid of the beam. Default is the middle of the frame.
+        centy (OPTIONAL) : float
+            The y-coordinate of the centroid of the beam. Default is the middle of the frame.
+        sigx (OPTIONAL) : float
+            The RMS size (in pixels) of the beam along its long axis.
+        sigy (OPTIONAL) : float
+            The RMS size (in pixels) of the beam along its short axis.
+        tilt (OPTIONAL) : float
+            The angle (in radians, from the x-axis) of the long axis of the beam.
+        amplitude (OPTIONAL) : float
+            The peak of the beam above the background, as a fraction of the full scale.
+        background (OPTIONAL) : float
+            The constant background level, as a fraction of the full scale.
+        noise (OPTIONAL) : float
+            The standard deviation of the read noise, as a fraction of the full scale.
+        hotpixels (OPTIONAL) : integer
+            The number of pixels (at random places) stuck at the full scale.
+        bitdepth (OPTIONAL) : integer
+            The bit depth of the camera (up to 16). Frames of 8 bits or less are uint8, anything else uint16 (so a 12-bit camera gives values up to 4095).
+        seed (OPTIONAL) : integer or Generator
+            The seed of the random numbers (or a NumPy random Generator), so the same settings always give the same frame.
+    """
+    rng = np.random.default_rng(seed)
+    fullscale = 2**bitdepth - 1
+    centx = (width - 1)/2 if centx is None else centx
+    centy = (height - 1)/2 if centy is None else centy
+
+    # the background with its read noise, then the beam on top of it (everything in counts)
+    canvas = rng.standard_normal((height, width), dtype=np.float32)
+    canvas *= np.float32(noise*fullscale)
+    canvas += np.float32(background*fullscale)
+    _draw_beam(canvas, centx, centy, sigx, sigy, tilt, amplitude*fullscale)
+
+    # hot pixels sit at the full scale, whatever else is going on
+    if hotpixels > 0:
+        canvas.ravel()[rng.integers(0, height*width, size=hotpixels)] = fullscale
+
+    # digitize the frame like the camera would (rounded and saturated)
+    np.rint(canvas, out=canvas)
+    np.clip(canvas, 0, fullscale, out=canvas)
+    return(canvas.astype(np.uint8 if bitdepth <= 8 else np.uint16))
+
+########################################################
+
+def beam_stack(nframes, height=2048, width=2448, centx=None, centy=None, sigx=30.0, sigy=20.0, tilt=0.0, amplitude=0.8, background=0.02, noise=0.01,
+               hotpixels=0, bitdepth=8, drift=(0.0, 0.0), jitter=0.0, sizejitter=0.0, seed=None, out=None):
+    """ Returns a synthetic run (a 3D array of shape (number of frames, height, width), see beam_frame()) and its truth (a structured array of TRUTH_DTYPE with
+    the centroid, sizes, tilt and projected FWHM of the beam in every frame). The beam drifts steadily by drift pixels per frame, and jumps around that by
+    jitter pixels (RMS) from shot to shot; its size changes by sizejitter (a relative RMS) from shot to shot.
+
+        Parameters
+        ----------
+        nframes : integer
+            The number of frames in the run.
+        height, width, centx, centy, sigx, sigy, tilt, amplitude, background, noise, hotpixels, bitdepth (OPTIONAL)
+            The settings of every frame, exactly like in beam_frame() (centx and centy are where the beam is in the first frame).
+        drift (OPTIONAL) : tuple
+            The (x, y) distance in pixels the beam moves from one frame to the next.
+        jitter (OPTIONAL) : float
+            The RMS (in pixels) of the random shot-to-shot position jitter of the beam.
+        sizejitter (OPTIONAL) : float
+            The relative RMS of the random shot-to-shot change in the size of the beam.
+        seed (OPTIONAL) : integer
+            The seed of the random numbers, so the same settings always give the same run.
+        out (OPTIONAL) : array
+            A 3D array of the right shape and dtype (for example a memory map opened for writing) to put the frames into.
+    """
+    rng = np.random.default_rng(seed)
+    centx = (width - 1)/2 if centx is None else centx
+    centy = (height - 1)/2 if centy is None else centy
+    if out is None:
+        out = np.empty((nframes, height, width), dtype=np.uint8 if bitdepth <= 8 else np.uint16)
+
+    # work out where the beam is and how big it is in every frame before drawing any of them
+    steps = np.arange(nframes)
+    truth = np.zeros(nframes, dtype=TRUTH_DTYPE)
+    truth['centx'] = centx + drift[0]*steps + jitter*rng.standard_normal(nframes)
+    truth['centy'] = centy + drift[1]*steps + jitter*rng.standard_normal(nframes)
+    truth['sigx'] = sigx*(1 + sizejitter*rng.standard_normal(nframes))
+    truth['sigy'] = sigy*(1 + sizejitter*rng.standard_normal(nframes))
+    truth['tilt'] = tilt
+    projx, projy = _projected_sigmas(truth['sigx'], truth['sigy'], tilt)
+    truth['xFWHM'] = SIGMA_TO_FWHM*projx
+    truth['yFWHM'] = SIGMA_TO_FWHM*projy
+
+    # draw every frame with its own stream of random numbers
+    for i, seedi in enumerate(rng.spawn(nframes) if hasattr(rng, 'spawn') else rng.integers(0, 2**63, size=nframes)):
+        out[i] = beam_frame(height, width, truth['centx'][i], truth['centy'][i], truth['sigx'][i], truth['sigy'][i], tilt, amplitude, background, noise,
+                            hotpixels, bitdepth, seedi)
+    return(out, truth)
+
+########################################################
+
+def save_frames(stack, directory, prefix='', extension='.tiff'):
+    """ Writes every frame of a stack to its own image file (1.tiff, 2.tiff, ... like a camera would) and returns the list of their paths, in order.
+
+        Parameters
+        ----------
+        stack : array
+            3D array of frames.
+        directory : string
+            The directory the images are written to (it is made if it doesn't exist).
+        prefix (OPTIONAL) : string
+            Text put in front of the number of every frame in its file name.
+        extension (OPTIONAL) : string
+            The extension of the image files, which chooses their format (16-bit frames need a format that can hold them, like TIFF or PNG).
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i, frame in enumerate(stack):
+        path = os.path.join(directory, prefix + str(i + 1) + extension)
+        Image.fromarray(np.asarray(frame)).save(path)
+        paths.append(path)
+    return(paths)
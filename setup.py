@@ -12,6 +12,7 @@ setup(
         description=DESCRIPTION,
         packages=find_packages(),
         install_requires=[], # add any additional packages needed
+        entry_points={'console_scripts': ['gaussbean=gaussbean.cli:main', 'gaussbean-bench=gaussbean.bench:main']}, # the "gaussbean" command for running the analysis from the command line, and "gaussbean-bench" for benchmarking it
         keywords=['python', 'gaussian', 'laser'],
         classifiers= []
 )
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Sat Oct  17 11:30:00 2026
+
+@author: leahghartman
+
+Description : Tests of the "gaussbean-bench" benchmark suite: benchmarks of optional packages that aren't installed, and margins too small for the beam.
+"""
+# import random needed packages that should already be installed
+import pytest
+
+# import from other modules in the package
+from gaussbean import bench
+
+#########################
+### START OF FUNCTIONS
+#########################
+
+def test_missing_opencv_is_skipped(monkeypatch):
+    """ Without OpenCV, its benchmarks are recorded as skipped and the rest of the suite still runs.
+    """
+    monkeypatch.setattr(bench, 'find_spec', lambda name: None if name == 'cv2' else object())
+    results = bench.run_benchmarks(frames=2, height=300, width=400, xmargins=100, ymargins=80, repeat=1, mintime=0, only=['filter.thru', 'single_image_proj'],
+                                   memory=False, imports=False)
+    byname = {result['name']: result for result in results['results']}
+    assert byname['filter.thru_lowpass']['skipped'] and byname['filter.thru_median_auto']['skipped']
+    assert byname['single.single_image_proj']['rate'] > 0 and not byname['filter.thru_median_scipy'].get('skipped')
+    assert all(name != 'filter.thru_lowpass' for name, _, _, _ in bench.compare(results, results))
+
+########################################################
+
+def test_margins_smaller_than_beam():
+    """ Margins too small to hold the synthetic beam are rejected before anything runs.
+    """
+    with pytest.raises(ValueError):
+        bench.run_benchmarks(frames=2, height=300, width=400, xmargins=40, ymargins=40, imports=False)
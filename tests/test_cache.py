@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Sat Oct  17 15:00:00 2026
+
+@author: leahghartman
+
+Description : Tests of ResultCache: the keys that change with the frame, the parameters and the version of the analysis, evicting the least recently used
+entries and writing entries atomically from several threads at once.
+"""
+# import random needed packages that should already be installed
+import os
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# import from other modules in the package
+from gaussbean.utils import cache_utils
+
+#########################
+### START OF FUNCTIONS
+#########################
+
+def test_cache_keys(tmp_path, monkeypatch):
+    """ The key changes with the frame, the stage, any parameter and CACHE_VERSION, so an entry is never served for anything else.
+    """
+    cache = cache_utils.ResultCache(str(tmp_path / 'cache'))
+    imgpath = tmp_path / 'frame.bin'
+    imgpath.write_bytes(b'frame')
+    identity = cache.identity(str(imgpath))
+    key = cache.key(identity, 'proj', xmargins=80)
+
+    cache.put(key, xFWHM=np.array(12.5))
+    assert cache.get(key)['xFWHM'] == 12.5
+    assert cache.key(identity, 'proj', xmargins=80) == key
+    assert cache.key(identity, 'proj', xmargins=81) != key
+    assert cache.key(identity, 'line', xmargins=80) != key
+
+    # a rewritten image has a new identity
+    imgpath.write_bytes(b'another frame')
+    assert cache.identity(str(imgpath)) != identity
+
+    # a new version of the analysis never sees the old entries
+    monkeypatch.setattr(cache_utils, 'CACHE_VERSION', cache_utils.CACHE_VERSION + 1)
+    assert cache.key(identity, 'proj', xmargins=80) != key
+    assert cache.get(cache.key(identity, 'proj', xmargins=80)) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+########################################################
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """ Past maxbytes, the entries that were used least recently are deleted first.
+    """
+    cache = cache_utils.ResultCache(str(tmp_path), maxbytes=10**9)
+    for i in range(4):
+        cache.put(str(i), data=np.zeros(1000))
+        past = time.time() - 100 + i
+        os.utime(cache._path(str(i)), (past, past))
+    cache.get('0')
+
+    cache.maxbytes = 2*os.path.getsize(cache._path('0'))
+    cache.evict()
+    assert sorted(name for name in os.listdir(tmp_path)) == ['0.npz', '3.npz']
+
+########################################################
+
+def test_cache_writes_atomically(tmp_path):
+    """ Threads writing the same entry at the same time each use their own temporary file, so the entry is always whole and nothing is left behind.
+    """
+    cache = cache_utils.ResultCache(str(tmp_path))
+    arrays = [np.full(20000, i, dtype=np.float64) for i in range(16)]
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda data: cache.put('same', data=data), arrays))
+
+    data = cache.get('same')['data']
+    assert any(np.array_equal(data, array) for array in arrays)
+    assert os.listdir(tmp_path) == ['same.npz']
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Sat Oct  17 11:00:00 2026
+
+@author: leahghartman
+
+Description : Tests of the "gaussbean" command: the results it writes, the images it can't read and the output formats it can't write.
+"""
+# import random needed packages that should already be installed
+import csv
+import numpy as np
+
+# import from other modules in the package
+from gaussbean import cli
+from gaussbean.analysis import dataset
+from gaussbean.utils import synth_utils
+
+#########################
+### START OF FUNCTIONS
+#########################
+
+def test_cli_writes_csv(tmp_path):
+    """ Every readable image gets a row with the same FWHM values as dataset.full_set_proj(), and an unreadable one is skipped with exit code 1.
+    """
+    frames = synth_utils.beam_stack(3, 400, 500, seed=0)[0]
+    paths = synth_utils.save_frames(frames, tmp_path / 'run')
+    (tmp_path / 'run' / '10.tiff').write_bytes(b'not an image')
+    outpath = str(tmp_path / 'out.csv')
+
+    assert cli.main([str(tmp_path / 'run'), '-o', outpath, '--xmargins', '80', '--ymargins', '80', '--auto-roi', '--workers', '1', '-q']) == 1
+    with open(outpath) as f:
+        rows = list(csv.DictReader(f))
+    xlist, ylist, _ = dataset.full_set_proj(paths, 80, 80, initcrop='auto')
+    assert [row['filename'] for row in rows] == paths
+    np.testing.assert_allclose([float(row['xFWHM']) for row in rows], xlist)
+    np.testing.assert_allclose([float(row['yFWHM']) for row in rows], ylist)
+
+########################################################
+
+def test_cli_rejects_unknown_format(tmp_path):
+    """ An output file the command can't write is reported before the run starts.
+    """
+    synth_utils.save_frames(synth_utils.beam_stack(1, 400, 500, seed=0)[0], tmp_path)
+    assert cli._check_format('out.txt') is not None
+    assert cli.main([str(tmp_path), '-o', str(tmp_path / 'out.txt'), '--xmargins', '80', '--ymargins', '80', '-q']) == 1
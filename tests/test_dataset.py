@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Sat Oct  17 10:00:00 2026
+
+@author: leahghartman
+
+Description : Tests of the dataset functions: the order of the results with worker processes, streaming results one frame at a time, and beam tracking (with and without a ResultCache).
+"""
+# import random needed packages that should already be installed
+import numpy as np
+import pytest
+
+# import from other modules in the package
+from gaussbean.analysis import dataset
+from gaussbean.utils import cache_utils, roi_utils, synth_utils
+
+#########################
+### START OF FUNCTIONS
+#########################
+
+def _run():
+    """ Returns a short drifting run. This function shouldn't be called by the user at any point.
+    """
+    return(synth_utils.beam_stack(6, 600, 800, drift=(3.0, 1.0), jitter=1.0, seed=0)[0])
+
+########################################################
+
+@pytest.mark.parametrize('full_set', [dataset.full_set_proj, dataset.full_set_line])
+def test_workers_keep_order(tmp_path, full_set):
+    """ Spread over worker processes in chunks, the results and cropped images are the same, and in the same order, as in one process.
+    """
+    frames = synth_utils.beam_stack(7, 400, 500, sizejitter=0.2, seed=3)[0]
+    paths = synth_utils.save_frames(frames, tmp_path)
+    xlist, ylist, crops = full_set(paths, 80, 80, initcrop='auto')
+    assert len(set(xlist)) == len(frames)
+
+    xpool, ypool, poolcrops = full_set(paths, 80, 80, initcrop='auto', workers=2, chunksize=2)
+    assert (xpool, ypool) == (xlist, ylist)
+    for crop, poolcrop in zip(crops, poolcrops):
+        np.testing.assert_array_equal(crop, poolcrop)
+
+########################################################
+
+def test_iter_set_streams(tmp_path):
+    """ iter_set_proj() yields every frame as soon as it is analyzed (a missing file only raises once it is reached), with the same values as
+    full_set_proj() and only every cropevery-th cropped image.
+    """
+    paths = synth_utils.save_frames(synth_utils.beam_stack(5, 400, 500, sizejitter=0.1, seed=4)[0], tmp_path)
+    xlist, ylist, crops = dataset.full_set_proj(paths, 80, 80, initcrop='auto')
+
+    results = dataset.iter_set_proj(paths + [str(tmp_path / 'missing.tiff')], 80, 80, initcrop='auto', cropevery=2)
+    for i in range(len(paths)):
+        index, xFWHM, yFWHM, croppedimg = next(results)
+        assert (index, xFWHM, yFWHM) == (i, xlist[i], ylist[i])
+        if i % 2 == 0:
+            np.testing.assert_array_equal(croppedimg, crops[i])
+        else:
+            assert croppedimg is None
+    with pytest.raises(FileNotFoundError):
+        next(results)
+
+########################################################
+
+def test_tracked_cache_matches_uncached(tmp_path):
+    """ A tracked run served from the cache gives the same results, and leaves the tracker in the same state, as a tracked run without a cache.
+    """
+    frames = _run()
+    expected = dataset.full_set_proj(frames, 100, 100, initcrop=None, track=True)[:2]
+    cache = cache_utils.ResultCache(tmp_path)
+    for _ in range(2):
+        tracker = roi_utils.BeamTracker()
+        assert dataset.full_set_proj(frames, 100, 100, cache=cache, initcrop=None, track=tracker)[:2] == expected
+    assert cache.hits >= len(frames)
+    assert (tracker.tracked, tracker.searched) == (len(frames) - 1, 1)
+
+########################################################
+
+def test_tracked_cache_keeps_tracker_settings_apart(tmp_path):
+    """ Results tracked with other tracker settings, or in another frame order, are never served from the cache in place of the right ones.
+    """
+    frames = _run()
+    cache = cache_utils.ResultCache(tmp_path)
+    dataset.full_set_proj(frames, 100, 100, cache=cache, initcrop=None, track=roi_utils.BeamTracker(maxshift=(50, 50)))
+    for run, tracker in ((frames, roi_utils.BeamTracker(maxshift=(0, 0))), (frames[::-1], roi_utils.BeamTracker(maxshift=(50, 50)))):
+        expected = dataset.full_set_proj(run, 100, 100, initcrop=None, track=roi_utils.BeamTracker(maxshift=tracker.maxshift))[:2]
+        assert dataset.full_set_proj(run, 100, 100, cache=cache, initcrop=None, track=tracker)[:2] == expected
+
+########################################################
+
+def test_tracking_needs_one_worker():
+    """ Tracking follows the frames in order, so asking for it with more than one worker is an error.
+    """
+    with pytest.raises(ValueError):
+        dataset.full_set_proj(_run(), 100, 100, workers=2, initcrop=None, track=True)
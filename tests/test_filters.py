@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Sat Oct  17 12:00:00 2026
+
+@author: leahghartman
+
+Description : Tests of the filters in pre_utils: repeated median filtering, the masks kept by LowPassFilter, saturating background subtraction and
+BackgroundModel.
+"""
+# import random needed packages that should already be installed
+import numpy as np
+import pytest
+from scipy import ndimage
+
+# import from other modules in the package
+from gaussbean.utils import pre_utils
+
+#########################
+### START OF FUNCTIONS
+#########################
+
+@pytest.mark.parametrize('repeatamount', [0, 1, 2, 3])
+def test_thru_median_passes(repeatamount):
+    """ Bouncing between two buffers gives the same image as filtering a new copy every pass, ends up in the given output buffer and leaves the input alone,
+    for one image and for every image of a stack.
+    """
+    stack = np.random.default_rng(1).integers(0, 255, (3, 40, 50), dtype=np.uint8)
+    original = stack.copy()
+    expected = []
+    for img in stack:
+        for _ in range(max(1, repeatamount)):
+            img = ndimage.median_filter(img, size=3)
+        expected.append(img)
+
+    out = np.empty_like(stack[0])
+    assert pre_utils.thru_median(3, repeatamount, imgar=stack[0], out=out) is out
+    np.testing.assert_array_equal(out, expected[0])
+    np.testing.assert_array_equal(pre_utils.thru_median_stack(3, stack, repeatamount), expected)
+    np.testing.assert_array_equal(stack, original)
+
+########################################################
+
+def test_thru_median_opencv():
+    """ OpenCV's median filter only differs from scipy's within half the size of the filter from the edges of the image.
+    """
+    pytest.importorskip('cv2')
+    img = np.random.default_rng(2).integers(0, 255, (40, 50), dtype=np.uint8)
+    scipy = pre_utils.thru_median(5, 2, imgar=img)
+    opencv = pre_utils.thru_median(5, 2, imgar=img, method='opencv')
+    np.testing.assert_array_equal(opencv[4:-4, 4:-4], scipy[4:-4, 4:-4])
+    np.testing.assert_array_equal(pre_utils.thru_median(5, 2, imgar=img, method='auto'), opencv)
+    with pytest.raises(ValueError):
+        pre_utils.thru_median(4, imgar=img, method='opencv')
+
+########################################################
+
+def test_lowpass_masks_are_bounded():
+    """ Only the masks of the most recently used image shapes are kept, and filtering with a mask made again gives the same image.
+    """
+    pytest.importorskip('cv2')
+    lowpass = pre_utils.LowPassFilter(10, maxmasks=2)
+    img = np.random.default_rng(0).integers(0, 255, (64, 80), dtype=np.uint8)
+    first = lowpass.filter(img)
+    for height in range(50, 60):
+        lowpass.filter(img[:height])
+    lowpass.filter(img[:52])
+    assert list(lowpass._masks) == [(59, 80), (52, 80)]
+    np.testing.assert_array_equal(lowpass.filter(img), first)
+
+########################################################
+
+@pytest.mark.parametrize('dtype', [np.uint8, np.uint16, np.int16, np.float32])
+def test_saturating_subtract(dtype):
+    """ Pixels darker than the background become zero instead of wrapping around (for unsigned images), the dtype is kept, and writing the result over the
+    original image gives the same result as writing it anywhere else.
+    """
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 200, (20, 30)).astype(dtype)
+    back = rng.integers(0, 200, (20, 30)).astype(dtype)
+    expected = img.astype(np.float64) - back
+    if np.issubdtype(dtype, np.unsignedinteger):
+        expected = expected.clip(0)
+
+    result = pre_utils.saturating_subtract(img, back)
+    assert result.dtype == dtype
+    np.testing.assert_array_equal(result, expected)
+
+    # the result written over its own input (this used to subtract from the minimum instead of from the image)
+    inplace = img.copy()
+    assert pre_utils.saturating_subtract(inplace, back, out=inplace) is inplace
+    np.testing.assert_array_equal(inplace, expected)
+
+########################################################
+
+def test_background_model():
+    """ The mean and median backgrounds match NumPy's, and subtracting them from a stack a block at a time (or in place) matches saturating_subtract().
+    """
+    darks = np.random.default_rng(1).integers(0, 50, (9, 20, 30), dtype=np.uint8)
+    frames = np.random.default_rng(2).integers(0, 255, (5, 20, 30), dtype=np.uint8)
+    for method, reduce in (('mean', np.mean), ('median', np.median)):
+        model = pre_utils.BackgroundModel(method).add(darks[:4]).add(darks[4])
+        for dark in darks[5:]:
+            model.add(dark)
+        np.testing.assert_array_equal(model.background, np.rint(reduce(darks, axis=0)).astype(np.uint8))
+        expected = pre_utils.saturating_subtract(frames, model.background)
+        np.testing.assert_array_equal(model.subtract(frames, blocksize=2), expected)
+        inplace = frames.copy()
+        model.subtract(inplace, out=inplace, blocksize=2)
+        np.testing.assert_array_equal(inplace, expected)
+
+########################################################
+
+def test_background_median_memory_is_bounded():
+    """ The median keeps at most maxframes dark frames, sampled evenly from all of them.
+    """
+    model = pre_utils.BackgroundModel('median', maxframes=8)
+    for value in range(400):
+        model.add(np.full((2, 2), value % 200, dtype=np.uint8))
+    assert model.count == 400 and len(model._frames) == 8
+    assert 40 < model.background[0, 0] < 160
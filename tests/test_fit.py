@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Sat Oct  17 17:00:00 2026
+
+@author: leahghartman
+
+Description : Tests of the batched Gaussian fits in fit_utils: recovering the centroid and sigmas of synthetic beams, flat or empty frames giving NaN
+instead of raising, and the FWHM values of the analysis functions with method='fit'.
+"""
+# import random needed packages that should already be installed
+import numpy as np
+import pytest
+
+# import from other modules in the package
+from gaussbean.analysis import single, stack
+from gaussbean.utils import calc_utils, fit_utils, synth_utils
+
+#########################
+### START OF FUNCTIONS
+#########################
+
+def test_fit_gauss2d_stack_recovers_beam():
+    """ The 2D fits of a jittering synthetic beam find its centroid within a tenth of a pixel and its sigmas within 1%, over blocks and in any order.
+    """
+    frames, truth = synth_utils.beam_stack(6, 120, 160, sigx=12.0, sigy=8.0, jitter=5.0, seed=0)
+    results = fit_utils.fit_gauss2d_stack(frames, blocksize=4)
+
+    assert results['converged'].all()
+    np.testing.assert_allclose(results['centx'], truth['centx'], atol=0.1)
+    np.testing.assert_allclose(results['centy'], truth['centy'], atol=0.1)
+    np.testing.assert_allclose(results['sigx'], truth['sigx'], rtol=0.01)
+    np.testing.assert_allclose(results['sigy'], truth['sigy'], rtol=0.01)
+    np.testing.assert_allclose(results['FWHMx'], truth['xFWHM'], rtol=0.01)
+
+    # a list of images gives the same fits, in the same order
+    listed = fit_utils.fit_gauss2d_stack(list(frames[::-1]))
+    np.testing.assert_allclose(listed['centx'], results['centx'][::-1])
+
+########################################################
+
+def test_fit_gauss2d_stack_flat_frames():
+    """ Flat and empty frames don't raise: their FWHM values are NaN, and the frames with a beam next to them are still fitted.
+    """
+    frames = synth_utils.beam_stack(3, 120, 160, sigx=12.0, sigy=8.0, seed=1)[0]
+    frames[0] = 0
+    frames[2] = 7
+    results = fit_utils.fit_gauss2d_stack(frames)
+
+    assert np.isnan(results['FWHMx'][[0, 2]]).all() and np.isnan(results['FWHMy'][[0, 2]]).all()
+    assert np.isfinite(results['FWHMx'][1]) and np.isfinite(results['FWHMy'][1])
+
+########################################################
+
+def test_fit_gauss1d_batch():
+    """ The 1D fits of the projections of synthetic beams find their centers and FWHM, and flat or empty profiles give NaN.
+    """
+    frames, truth = synth_utils.beam_stack(6, 120, 160, sigx=12.0, sigy=8.0, jitter=5.0, seed=2)
+    profiles = np.vstack([calc_utils.project(frames, 1), np.zeros(160), np.full(160, 3.0)])
+    results = fit_utils.fit_gauss1d_batch(profiles)
+
+    np.testing.assert_allclose(results['center'][:6], truth['centx'], atol=0.1)
+    np.testing.assert_allclose(results['FWHM'][:6], truth['xFWHM'], rtol=0.01)
+    assert np.isnan(results['FWHM'][6:]).all()
+
+########################################################
+
+def test_method_fit():
+    """ With method='fit', single_image_proj() and stack_proj() give the same FWHM values, close to the truth, and a faint, noisy shot where no peak can be
+    measured still gets a width.
+    """
+    frames, truth = synth_utils.beam_stack(4, 400, 500, sizejitter=0.1, seed=5)
+    results = stack.stack_proj(frames, 80, 80, initcrop='auto', method='fit')
+    for i, frame in enumerate(frames):
+        xFWHM, yFWHM, _ = single.single_image_proj(80, 80, imgar=frame, initcrop='auto', method='fit')
+        np.testing.assert_allclose([results['xFWHM'][i], results['yFWHM'][i]], [xFWHM, yFWHM])
+    np.testing.assert_allclose(results['xFWHM'], truth['xFWHM'], rtol=0.01)
+    np.testing.assert_allclose(results['yFWHM'], truth['yFWHM'], rtol=0.01)
+
+    faint = synth_utils.beam_frame(400, 500, amplitude=0.04, noise=0.03, seed=3)
+    with pytest.raises(IndexError):
+        single.single_image_proj(80, 80, imgar=faint, initcrop='auto')
+    xFWHM, yFWHM, _ = single.single_image_proj(80, 80, imgar=faint, initcrop='auto', method='fit')
+    np.testing.assert_allclose([xFWHM, yFWHM], [30.0*fit_utils.SIGMA_TO_FWHM, 20.0*fit_utils.SIGMA_TO_FWHM], rtol=0.05)
+
+    with pytest.raises(ValueError):
+        stack.stack_proj(frames, 80, 80, initcrop='auto', method='gauss')
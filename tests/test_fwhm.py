@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Fri Oct  16 23:00:00 2026
+
+@author: leahghartman
+
+Description : Tests that calc_utils.find_FWHM_batch() (used by the stack functions) gives the same width as find_FWHM()[0] (used by the single image and
+dataset functions) on every row, including profiles with more than one peak.
+"""
+# import random needed packages that should already be installed
+import numpy as np
+import pytest
+
+# import from other modules in the package
+from gaussbean.utils import calc_utils
+
+#########################
+### START OF FUNCTIONS
+#########################
+
+def _first_widths(profiles, fwhmrange):
+    """ Returns find_FWHM()[0] of every row, with NaN where there is no peak. This function shouldn't be called by the user at any point.
+    """
+    widths = [calc_utils.find_FWHM(profile, fwhmrange=fwhmrange) for profile in profiles]
+    return(np.array([width[0] if len(width) > 0 else np.nan for width in widths]))
+
+########################################################
+
+def _profiles(npeaks, count, noise, seed):
+    """ Returns noisy profiles made of a number of Gaussian peaks of random heights, positions and widths. This function shouldn't be called by the user at
+    any point.
+    """
+    rng = np.random.default_rng(seed)
+    x = np.arange(400)
+    profiles = rng.normal(0, noise, (count, x.size))
+    for profile in profiles:
+        for _ in range(npeaks):
+            profile += rng.uniform(0.3, 1)*np.exp(-0.5*((x - rng.uniform(20, 380))/rng.uniform(3, 30))**2)
+    return(profiles)
+
+########################################################
+
+@pytest.mark.parametrize('npeaks', [1, 2, 3])
+@pytest.mark.parametrize('fwhmrange', [1.3, 2.0])
+def test_batch_matches_find_FWHM(npeaks, fwhmrange):
+    """ Every row gets the same width from the batch as from find_FWHM()[0] (the leftmost peak that passes the prominence test, not the highest one).
+    """
+    profiles = _profiles(npeaks, 200, 0.01, npeaks)
+    np.testing.assert_allclose(calc_utils.find_FWHM_batch(profiles, fwhmrange=fwhmrange), _first_widths(profiles, fwhmrange), equal_nan=True)
+
+########################################################
+
+def test_leftmost_peak():
+    """ With two peaks that both pass the prominence test, the width is the width of the left one, even though the right one is higher.
+    """
+    x = np.arange(200)
+    profile = 0.9*np.exp(-0.5*((x - 50)/5)**2) + np.exp(-0.5*((x - 150)/15)**2)
+    width = calc_utils.find_FWHM_batch(profile)[0]
+    assert width == pytest.approx(calc_utils.find_FWHM(profile)[0])
+    assert width == pytest.approx(5*2*np.sqrt(2*np.log(2)), rel=0.05)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Fri Oct  16 23:00:00 2026
+
+@author: leahghartman
+
+Description : Regression tests for the time it takes to import the analysis path of the package. matplotlib, OpenCV and scipy.signal are only imported the
+first time a function needs them, so importing gaussbean.analysis.dataset shouldn't load any of them, and should stay well under the time it takes to import
+scipy.signal alone (about a second).
+"""
+# import random needed packages that should already be installed
+import os
+import re
+import sys
+import subprocess
+
+# the module every run of the analysis imports, the modules that should only be imported when they are needed, and the most time (in seconds, as measured
+# by "python -X importtime") importing the analysis path may take
+MODULE = 'gaussbean.analysis.dataset'
+DEFERRED = ('cv2', 'matplotlib', 'scipy.signal')
+BUDGET = 0.6
+
+# the root of the repository, so the tests use this checkout of the package rather than an installed one
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#########################
+### START OF FUNCTIONS
+#########################
+
+def _run(*args):
+    """ Runs a fresh Python process with this checkout of the package on its path and returns it once it is done. This function shouldn't be called by the
+    user at any point.
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    return(subprocess.run([sys.executable] + list(args), env=env, capture_output=True, text=True, check=True))
+
+########################################################
+
+def _import_time(module):
+    """ Returns the cumulative time (in seconds) "python -X importtime" reports for importing a module in a fresh process. This function shouldn't be called by
+    the user at any point.
+    """
+    stderr = _run('-X', 'importtime', '-c', 'import ' + module).stderr
+    for line in stderr.splitlines():
+        match = re.match(r'import time:\s+\d+\s+\|\s+(\d+)\s+\|\s*(\S+)\s*$', line)
+        if match and match.group(2) == module:
+            return(int(match.group(1))/1e6)
+    raise AssertionError('no import time reported for ' + module)
+
+########################################################
+
+def test_deferred_imports():
+    """ Importing the analysis path doesn't load any of the modules that are only imported when they are needed.
+    """
+    code = 'import sys, %s; print(" ".join(name for name in %r if name in sys.modules))' % (MODULE, DEFERRED)
+    loaded = _run('-c', code).stdout.split()
+    assert loaded == [], 'importing %s loaded %s' % (MODULE, ', '.join(loaded))
+
+########################################################
+
+def test_import_time_budget():
+    """ Importing the analysis path stays under the budget (the best of three fresh processes, so a cold disk cache doesn't make the test flaky).
+    """
+    best = min(_import_time(MODULE) for _ in range(3))
+    assert best < BUDGET, 'importing %s took %.3f s (the budget is %.3f s)' % (MODULE, best, BUDGET)
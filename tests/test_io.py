@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Sat Oct  17 18:00:00 2026
+
+@author: leahghartman
+
+Description : Tests of the image I/O in io_utils: the dtype images are read as, packing a run into a stack and reading it back, and loading frames ahead on
+background threads.
+"""
+# import random needed packages that should already be installed
+import time
+import numpy as np
+import pytest
+from PIL import Image
+
+# import from other modules in the package
+from gaussbean.analysis import dataset
+from gaussbean.utils import calc_utils, io_utils, synth_utils
+
+#########################
+### START OF FUNCTIONS
+#########################
+
+def test_read_image_keeps_bit_depth(tmp_path):
+    """ Single-channel images keep their values and bit depth (in the byte order of this machine, whatever the byte order of the file), and colour images
+    become 8-bit greyscale.
+    """
+    values = np.arange(12*10, dtype=np.uint16).reshape(12, 10)*500
+    images = {'I;16B': (Image.frombytes('I;16B', (10, 12), values.astype('>u2').tobytes()), values),
+              'I;16': (Image.fromarray(values), values),
+              'I': (Image.fromarray(values.astype(np.int32) - 30000), values.astype(np.int32) - 30000),
+              'F': (Image.fromarray(values.astype(np.float32)/7), values.astype(np.float32)/7),
+              'L': (Image.fromarray((values//256).astype(np.uint8)), (values//256).astype(np.uint8))}
+    for mode, (img, expected) in images.items():
+        imgpath = str(tmp_path / (mode.replace(';', '') + '.tiff'))
+        img.save(imgpath)
+        with Image.open(imgpath) as saved:
+            assert saved.mode == mode
+        arrayimg = io_utils.read_image(imgpath)
+        assert arrayimg.dtype == expected.dtype and arrayimg.dtype.isnative
+        np.testing.assert_array_equal(arrayimg, expected)
+        np.testing.assert_array_equal(io_utils.read_image(imgpath, np.float32), expected.astype(np.float32))
+
+    imgpath = str(tmp_path / 'rgb.tiff')
+    Image.fromarray(np.zeros((12, 10, 3), dtype=np.uint8)).save(imgpath)
+    assert io_utils.read_image(imgpath).shape == (12, 10) and io_utils.read_image(imgpath).dtype == np.uint8
+
+########################################################
+
+def test_projections_keep_bit_depth():
+    """ Projections are added up in 32 bits wherever the sum can't overflow, and give the same sums as adding up in 64 bits.
+    """
+    assert calc_utils.accumulator_dtype(np.uint8, 2048) == np.uint32
+    assert calc_utils.accumulator_dtype(np.uint16, 2048) == np.uint32
+    assert calc_utils.accumulator_dtype(np.uint16, 2**17) == np.uint64
+    assert calc_utils.accumulator_dtype(np.int16, 2048) == np.int32
+    assert calc_utils.accumulator_dtype(np.float16, 10) == np.float32
+
+    img = np.full((2048, 3), 65535, dtype=np.uint16)
+    np.testing.assert_array_equal(calc_utils.project(img, 0), img.sum(axis=0, dtype=np.int64))
+
+########################################################
+
+def test_pack_stack_round_trip(tmp_path):
+    """ A packed stack holds exactly the frames of the images, records where they came from, and gives the same results as the images themselves (whole or
+    sliced).
+    """
+    frames = synth_utils.beam_stack(4, 400, 500, bitdepth=12, sizejitter=0.1, seed=0)[0]
+    paths = synth_utils.save_frames(frames, tmp_path / 'run')
+    stackpath = str(tmp_path / 'run.npy')
+    stack = io_utils.pack_stack(paths, stackpath)
+
+    np.testing.assert_array_equal(stack, frames)
+    np.testing.assert_array_equal(io_utils.open_stack(stackpath), frames)
+    assert stack.dtype == np.uint16
+    header = io_utils.read_header(stackpath)
+    assert (header['shape'], np.dtype(header['dtype'])) == ([4, 400, 500], stack.dtype)
+    assert header['filenames'] == paths
+
+    expected = dataset.full_set_proj(paths, 80, 80, initcrop='auto')[:2]
+    assert dataset.full_set_proj(stackpath, 80, 80, initcrop='auto')[:2] == expected
+    assert dataset.full_set_proj(stack, 80, 80, initcrop='auto', workers=2)[:2] == expected
+    assert dataset.full_set_proj(stack[1:3], 80, 80, initcrop='auto', workers=2)[:2] == dataset.full_set_proj(paths[1:3], 80, 80, initcrop='auto')[:2]
+
+########################################################
+
+def test_pack_stack_needs_same_frames(tmp_path):
+    """ Images of different shapes can't be packed together.
+    """
+    paths = synth_utils.save_frames(synth_utils.beam_stack(1, 400, 500, seed=0)[0], tmp_path, prefix='a')
+    paths += synth_utils.save_frames(synth_utils.beam_stack(1, 300, 500, seed=0)[0], tmp_path, prefix='b')
+    with pytest.raises(ValueError):
+        io_utils.pack_stack(paths, str(tmp_path / 'run.npy'))
+
+########################################################
+
+def test_prefetch_loader_order(tmp_path, monkeypatch):
+    """ However long each frame takes to load, the loader hands the frames out in order, never loads more than depth frames ahead, and gives the same results
+    as the paths when analyzed.
+    """
+    frames = synth_utils.beam_stack(8, 400, 500, sizejitter=0.1, seed=1)[0]
+    paths = synth_utils.save_frames(frames, tmp_path)
+
+    # the first frames are the slowest to load, so the threads finish them out of order
+    started = []
+    load_frame = io_utils.load_frame
+    def slow_load(source, dtype=None):
+        started.append(source)
+        time.sleep(0.002*(len(paths) - paths.index(source)))
+        return(load_frame(source, dtype))
+    monkeypatch.setattr(io_utils, 'load_frame', slow_load)
+
+    loader = io_utils.PrefetchLoader(paths, depth=3, threads=3)
+    for i, imgar in enumerate(loader):
+        assert len(started) <= i + 1 + loader.depth
+        np.testing.assert_array_equal(imgar, frames[i])
+    assert loader.frames == len(paths)
+    monkeypatch.undo()
+
+    blocks = list(loader.blocks(3))
+    assert [len(block) for block in blocks] == [3, 3, 2]
+    np.testing.assert_array_equal(np.concatenate(blocks), frames)
+    assert dataset.full_set_proj(loader, 80, 80, initcrop='auto')[:2] == dataset.full_set_proj(paths, 80, 80, initcrop='auto')[:2]
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Sat Oct  17 19:00:00 2026
+
+@author: leahghartman
+
+Description : Tests of the one-pass beam metrics in moment_utils against the moments taken directly with numpy and against the truth of synthetic beams.
+"""
+# import random needed packages that should already be installed
+import numpy as np
+
+# import from other modules in the package
+from gaussbean.utils import moment_utils, synth_utils
+
+#########################
+### START OF FUNCTIONS
+#########################
+
+def _direct_moments(img, background):
+    """ Returns the (total, centx, centy, sigx, sigy, covxy) of an image, taken directly over a grid of its coordinates. This function shouldn't be called by
+    the user at any point.
+    """
+    img = img.astype(np.float64) - background
+    ys, xs = np.indices(img.shape)
+    total = img.sum()
+    centx, centy = (img*xs).sum()/total, (img*ys).sum()/total
+    sigx = np.sqrt((img*(xs - centx)**2).sum()/total)
+    sigy = np.sqrt((img*(ys - centy)**2).sum()/total)
+    return(total, centx, centy, sigx, sigy, (img*(xs - centx)*(ys - centy)).sum()/total)
+
+########################################################
+
+def test_find_moments():
+    """ The metrics match the moments taken directly, chunk by chunk or not, and find the centroid, projected sizes and tilt of a noiseless tilted beam.
+    """
+    tilt = 0.3
+    img = synth_utils.beam_frame(300, 400, centx=180.3, centy=140.6, sigx=25.0, sigy=10.0, tilt=tilt, noise=0, bitdepth=16, seed=0)
+    background = synth_utils.beam_frame(300, 400, amplitude=0, noise=0, bitdepth=16, seed=0)[0, 0]
+
+    metrics = moment_utils.find_moments(imgar=img, background=background, rowchunk=7)
+    names = ['total', 'centx', 'centy', 'sigx', 'sigy', 'covxy']
+    np.testing.assert_allclose([metrics[name] for name in names], _direct_moments(img, background), rtol=1e-9)
+    assert moment_utils.find_moments(imgar=img, background=background) == metrics
+
+    projx, projy = synth_utils._projected_sigmas(25.0, 10.0, tilt)
+    np.testing.assert_allclose([metrics['centx'], metrics['centy']], [180.3, 140.6], atol=0.01)
+    np.testing.assert_allclose([metrics['sigx'], metrics['sigy']], [projx, projy], rtol=0.001)
+    assert abs(metrics['tilt'] - tilt) < 0.001
+
+########################################################
+
+def test_find_moments_stack():
+    """ The metrics of every image of a stack (in blocks, with one background level per image) are the same as those of the images one at a time.
+    """
+    stack = synth_utils.beam_stack(5, 120, 160, sigx=12.0, sigy=8.0, jitter=5.0, seed=1)[0]
+    background = np.arange(5, dtype=np.float64)
+    results = moment_utils.find_moments_stack(stack, background=background, blocksize=2, rowchunk=16)
+    for i, img in enumerate(stack):
+        metrics = moment_utils.find_moments(imgar=img, background=background[i])
+        np.testing.assert_allclose([results[name][i] for name in moment_utils.MOMENT_DTYPE.names], list(metrics.values()), rtol=1e-9)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Sat Oct  17 20:00:00 2026
+
+@author: leahghartman
+
+Description : Tests of the per-stage timing in profile_utils: nothing recorded while it is off, the totals and trace events of a run (with worker processes)
+and the Chrome trace written from them.
+"""
+# import random needed packages that should already be installed
+import os
+import json
+import numpy as np
+
+# import from other modules in the package
+from gaussbean.analysis import dataset
+from gaussbean.utils import profile_utils, synth_utils
+
+#########################
+### START OF FUNCTIONS
+#########################
+
+def test_profiling_off_records_nothing():
+    """ While profiling is off, the instrumented functions record nothing.
+    """
+    profile_utils.reset()
+    dataset.full_set_proj(synth_utils.beam_stack(2, 400, 500, seed=0)[0], 80, 80, initcrop='auto')
+    assert not profile_utils.enabled() and profile_utils.records() == {}
+
+########################################################
+
+def test_profile_records_and_traces(tmp_path):
+    """ Profiling a run spread over worker processes counts every stage of every frame (merged back from the workers) and writes their calls to a Chrome trace.
+    """
+    paths = synth_utils.save_frames(synth_utils.beam_stack(4, 400, 500, seed=0)[0], tmp_path)
+    with profile_utils.profile(trace=True):
+        dataset.full_set_proj(paths, 80, 80, initcrop='auto', workers=2)
+    assert not profile_utils.enabled()
+
+    records = profile_utils.records()
+    for name in ('io_utils.read_image', 'single.single_image_proj', 'dataset.frame'):
+        assert records[name]['calls'] == len(paths)
+    assert records['calc_utils.find_FWHM']['calls'] == 2*len(paths)
+    assert records['io_utils.read_image']['bytes'] == len(paths)*400*500
+    assert 'single.single_image_proj' in profile_utils.summary()
+
+    tracepath = str(tmp_path / 'trace.json')
+    profile_utils.write_trace(tracepath)
+    with open(tracepath) as f:
+        events = json.load(f)['traceEvents']
+    assert sum(record['calls'] for record in records.values()) == len(events)
+    assert os.getpid() not in {event['pid'] for event in events}
+    assert all(event['ph'] == 'X' and event['dur'] >= 0 for event in events)
+
+########################################################
+
+def test_collect_and_merge():
+    """ What one process collects is merged into another, with the trace events over maxevents counted as dropped.
+    """
+    with profile_utils.profile(trace=True):
+        with profile_utils.stage('test.stage', nbytes=10):
+            pass
+        profile_utils.timed('test.timed')(np.copy)(np.zeros(4))
+    snapshot = profile_utils.collect()
+    assert profile_utils.records() == {}
+
+    with profile_utils.profile(trace=True, maxevents=1):
+        profile_utils.merge(snapshot)
+        profile_utils.merge(snapshot)
+    records = profile_utils.records()
+    assert records['test.stage'] == {'calls': 2, 'seconds': records['test.stage']['seconds'], 'bytes': 20}
+    assert records['test.timed']['bytes'] == 2*32
+    assert len(profile_utils._events) == 1 and profile_utils._dropped == 3
+    profile_utils.reset()
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Sat Oct  17 10:30:00 2026
+
+@author: leahghartman
+
+Description : Tests that roi_utils.locate_beam() finds narrow beams that fall between the pixels of a strided (rather than binned) search.
+"""
+# import random needed packages that should already be installed
+import numpy as np
+import pytest
+
+# import from other modules in the package
+from gaussbean.utils import roi_utils, synth_utils
+
+#########################
+### START OF FUNCTIONS
+#########################
+
+@pytest.mark.parametrize('centx, centy', [(803, 405), (1211, 1020), (52, 1995)])
+def test_locate_narrow_beam(centx, centy):
+    """ A beam about one pixel wide, away from every eighth row and column, is found to within a pixel.
+    """
+    frame = synth_utils.beam_frame(centx=centx, centy=centy, sigx=1.2, sigy=1.0, noise=0.005, seed=0)
+    np.testing.assert_allclose(roi_utils.locate_beam(frame), (centx, centy), atol=1)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Fri Oct  16 23:30:00 2026
+
+@author: leahghartman
+
+Description : Tests that stack.stack_proj() and stack_line() give the same FWHM values and centroids as single.single_image_proj() and single_image_line(),
+including beams near the edges of the images (where the crops are cut off) and lineouts at the edges of the crops (which wrap around like calc_utils does).
+"""
+# import random needed packages that should already be installed
+import numpy as np
+import pytest
+
+# import from other modules in the package
+from gaussbean.analysis import single, stack
+from gaussbean.utils import calc_utils, synth_utils
+
+# beams in the middle of the images and within the margins of every edge, for the default initial crop as well as the whole images
+BEAMS = [(single.INITIAL_CROP, 1224, 1024), (single.INITIAL_CROP, 300, 1000), (single.INITIAL_CROP, 2150, 1950), (None, 1200, 80), (None, 240, 40),
+         (None, 2370, 1975), ('auto', 240, 40), ('auto', 2380, 1980)]
+
+#########################
+### START OF FUNCTIONS
+#########################
+
+def _single_results(analyze, frames, **params):
+    """ Returns the results of a single image function for every frame as an array of stack.RESULT_DTYPE, with NaN where it can't find a FWHM. This function
+    shouldn't be called by the user at any point.
+    """
+    results = np.zeros(len(frames), dtype=stack.RESULT_DTYPE)
+    for i, frame in enumerate(frames):
+        try:
+            xFWHM, yFWHM, _, info = analyze(imgar=frame, full_output=True, **params)
+        except IndexError:
+            results[i] = (np.nan, np.nan, 0, 0, 0, 0)
+            continue
+        results[i] = (xFWHM, yFWHM, info['centx'], info['centy'], info['centx2'], info['centy2'])
+    return(results)
+
+########################################################
+
+def _assert_same(results, expected):
+    """ Checks that the results of the stack functions are the same as those of the single image functions wherever those found both FWHM values, and that
+    the stack functions give NaN for at least one of them wherever the single image functions raised an error. This function shouldn't be called by the user
+    at any point.
+    """
+    found = np.isfinite(expected['xFWHM'])
+    assert found.any()
+    assert np.isnan(results['xFWHM'][~found] + results['yFWHM'][~found]).all()
+    for field in ('xFWHM', 'yFWHM'):
+        np.testing.assert_allclose(results[field][found], expected[field][found])
+    for field in ('centx', 'centy', 'centx2', 'centy2'):
+        np.testing.assert_array_equal(results[field][found], expected[field][found])
+
+########################################################
+
+@pytest.mark.parametrize('initcrop, centx, centy', BEAMS)
+def test_stack_proj_matches_single(initcrop, centx, centy):
+    """ The crops of beams near the edges are cut off the same way as in the single image functions, so the FWHM values and centroids are the same.
+    """
+    frames = synth_utils.beam_stack(3, centx=centx, centy=centy, jitter=2.0, seed=0)[0]
+    expected = _single_results(single.single_image_proj, frames, xmargins=150, ymargins=150, initcrop=initcrop)
+    _assert_same(stack.stack_proj(frames, 150, 150, blocksize=2, initcrop=initcrop), expected)
+
+########################################################
+
+@pytest.mark.parametrize('initcrop, centx, centy', BEAMS)
+@pytest.mark.parametrize('toavg', [0, 3])
+def test_stack_line_matches_single(initcrop, centx, centy, toavg):
+    """ The lineouts through the centroids of beams near the edges are the same as in the single image functions.
+    """
+    frames = synth_utils.beam_stack(3, centx=centx, centy=centy, jitter=2.0, seed=0)[0]
+    expected = _single_results(single.single_image_line, frames, xmargins=150, ymargins=150, toavg=toavg, initcrop=initcrop)
+    _assert_same(stack.stack_line(frames, 150, 150, toavg=toavg, blocksize=2, initcrop=initcrop), expected)
+
+########################################################
+
+@pytest.mark.parametrize('centx, centy', [(1200, 2), (3, 1000), (1200, 2045), (2445, 1000)])
+@pytest.mark.parametrize('xpixel, ypixel', [(0, 0), (1, 2), (119, 79)])
+def test_stack_line_at_crop_edge(centx, centy, xpixel, ypixel):
+    """ The lineouts of crops cut off at the edges of the images are the same as calc_utils.find_line_x()/find_line_y() take from the crop on its own
+    (rows/columns before the first one wrap around to the end), and lineouts running past the end of a crop (where calc_utils raises an IndexError) give NaN.
+    """
+    frames = synth_utils.beam_stack(2, centx=centx, centy=centy, sigx=10, sigy=6, seed=0)[0]
+    results = stack.stack_line(frames, 60, 40, xpixel=xpixel, ypixel=ypixel, toavg=4, initcrop=None)
+    for frame, result in zip(frames, results):
+        initialroi, guessx, guessy = single._initial_crop(frame, None, None)
+        crop = initialroi.crop(guessx, guessy, 60, 40).view
+        linex, liney = calc_utils.find_centroid(imgar=crop) if xpixel == 0 and ypixel == 0 else (xpixel, ypixel)
+        for field, find_line, line in (('xFWHM', calc_utils.find_line_x, liney), ('yFWHM', calc_utils.find_line_y, linex)):
+            try:
+                expected = calc_utils.find_FWHM_batch(find_line(line, toavg=4, imgar=crop))[0]
+            except IndexError:
+                expected = np.nan
+            np.testing.assert_allclose(result[field], expected, equal_nan=True)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Sat Oct  17 16:00:00 2026
+
+@author: leahghartman
+
+Description : Tests of the running statistics in stats_utils: the quantiles of QuantileSketch against numpy, merging OnlineStats and RunStats filled in
+separately, and values that aren't finite.
+"""
+# import random needed packages that should already be installed
+import numpy as np
+import pytest
+
+# import from other modules in the package
+from gaussbean.utils import stats_utils
+
+#########################
+### START OF FUNCTIONS
+#########################
+
+@pytest.mark.parametrize('accuracy', [0.01, 0.001])
+def test_sketch_quantiles(accuracy):
+    """ Every quantile is within the relative accuracy of the value numpy finds at the same rank, for positive, negative and zero values alike.
+    """
+    rng = np.random.default_rng(0)
+    values = np.concatenate([rng.lognormal(3, 1, 4000), -rng.lognormal(1, 2, 1000), np.zeros(50)])
+    sketch = stats_utils.QuantileSketch(accuracy)
+    sketch.add(values[:100])
+    for value in values[100:]:
+        sketch.add(value)
+
+    assert sketch.count == len(values)
+    for q in (0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1):
+        expected = np.quantile(values, q, method='lower')
+        assert abs(sketch.quantile(q) - expected) <= accuracy*abs(expected)
+
+########################################################
+
+def test_online_stats_merge():
+    """ Merging the statistics of several parts (Chan's formula) gives the same count, mean, std, min, max and quantiles as adding every value to one.
+    """
+    rng = np.random.default_rng(1)
+    parts = [rng.normal(70, 3, n) for n in (1, 500, 37)]
+    whole = stats_utils.RunStats(('xFWHM',))
+    merged = stats_utils.RunStats(('xFWHM',))
+    for part in parts:
+        whole.add(xFWHM=part)
+        stats = stats_utils.RunStats(('xFWHM',))
+        for value in part:
+            stats.add(xFWHM=value)
+        merged.merge(stats)
+
+    values = np.concatenate(parts)
+    summary = merged.summary()['xFWHM']
+    assert summary == pytest.approx(whole.summary()['xFWHM'])
+    assert summary['count'] == len(values)
+    assert summary['mean'] == pytest.approx(values.mean())
+    assert summary['std'] == pytest.approx(values.std(ddof=1))
+    assert (summary['min'], summary['max']) == (values.min(), values.max())
+
+########################################################
+
+def test_non_finite_values():
+    """ NaN and infinite values are counted as failed and leave the statistics and the sketch of the finite values alone.
+    """
+    stats = stats_utils.OnlineStats()
+    stats.add(np.array([1.0, np.inf, 2.0, np.nan]))
+    stats.add(-np.inf)
+    stats.add(np.nan)
+    stats.add(3.0)
+
+    summary = stats.summary()
+    assert (summary['count'], summary['failed']) == (3, 4)
+    assert (summary['mean'], summary['std'], summary['min'], summary['max']) == pytest.approx((2.0, 1.0, 1.0, 3.0))
+    assert stats.sketch.count == 3
+    assert summary['p50'] == pytest.approx(2.0, rel=0.001)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Fri Oct  16 23:00:00 2026
+
+@author: leahghartman
+
+Description : Tests that the lineouts of sweep.sweep_line() (read out of an integral image of every crop) come out the same as the lineouts of
+calc_utils.find_line_x() and find_line_y() that dataset.full_set_line() uses, including lineouts at the edges of the crop, and that the sweep functions give the
+same FWHM values as the dataset functions for every combination of parameters in a sweep and for beams near the edges of the images.
+"""
+# import random needed packages that should already be installed
+import numpy as np
+import pytest
+
+# import from other modules in the package
+from gaussbean.analysis import dataset, single, sweep
+from gaussbean.utils import calc_utils, integral_utils, synth_utils
+
+#########################
+### START OF FUNCTIONS
+#########################
+
+@pytest.mark.parametrize('toavg', [0, 1, 3])
+def test_lineouts_match_calc_utils(toavg):
+    """ Every lineout that calc_utils can take (rows/columns before the first one wrap around to the end) is the same when the sweep takes it.
+    """
+    img = np.arange(10*12).reshape(10, 12).astype(np.uint8)
+    integral = integral_utils.IntegralImage(img)
+    for line in range(-toavg, 10 - toavg):
+        linex, _ = sweep._lineouts(img, integral, toavg, line, toavg)
+        np.testing.assert_array_equal(linex, calc_utils.find_line_x(line, toavg=toavg, imgar=img))
+    for line in range(-toavg, 12 - toavg):
+        _, liney = sweep._lineouts(img, integral, line, toavg, toavg)
+        np.testing.assert_array_equal(liney, calc_utils.find_line_y(line, toavg=toavg, imgar=img))
+
+########################################################
+
+def test_lineout_at_edge():
+    """ A lineout clipped by the top of the crop wraps around like find_line_x() does, rather than leaving the missing rows out like the integral image does.
+    """
+    img = np.arange(100).reshape(10, 10)
+    integral = integral_utils.IntegralImage(img)
+    linex, _ = sweep._lineouts(img, integral, 5, 1, 3)
+    np.testing.assert_array_equal(linex[:2], [270, 277])
+    np.testing.assert_array_equal(integral.line_x(1, toavg=3)[:2], [100, 105])
+
+########################################################
+
+def test_sweep_matches_full_set(tmp_path):
+    """ Every combination of margins and fwrange in a sweep (in one process or spread over workers) gives the same FWHM values, frame by frame, as running
+    dataset.full_set_proj() or full_set_line() with those parameters.
+    """
+    paths = synth_utils.save_frames(synth_utils.beam_stack(3, 400, 500, sizejitter=0.1, seed=2)[0], tmp_path)
+    proj = sweep.sweep_proj(paths, [80, 110], 70, fwrange=[1.3, 1.5], initcrop='auto')
+    line = sweep.sweep_line(paths, [80, 110], 70, initcrop='auto', workers=2)
+    assert len(proj) == 2*2*len(paths) and len(line) == 2*len(paths)
+    pooled = sweep.sweep_proj(paths, [80, 110], 70, fwrange=[1.3, 1.5], initcrop='auto', workers=2)
+    for name in proj.dtype.names:
+        np.testing.assert_array_equal(pooled[name], proj[name])
+
+    for xmargins in (80, 110):
+        for fwrange in (1.3, 1.5):
+            rows = proj[(proj['xmargins'] == xmargins) & (proj['fwrange'] == fwrange)]
+            xlist, ylist, _ = dataset.full_set_proj(paths, xmargins, 70, fwrange=fwrange, initcrop='auto')
+            assert rows['frame'].tolist() == list(range(len(paths)))
+            np.testing.assert_allclose(rows['xFWHM'], xlist)
+            np.testing.assert_allclose(rows['yFWHM'], ylist)
+        rows = line[line['xmargins'] == xmargins]
+        xlist, ylist, _ = dataset.full_set_line(paths, xmargins, 70, initcrop='auto')
+        np.testing.assert_allclose(rows['xFWHM'], xlist)
+        np.testing.assert_allclose(rows['yFWHM'], ylist)
+
+########################################################
+
+@pytest.mark.parametrize('initcrop, centx, centy', [(single.INITIAL_CROP, 300, 1000), (None, 1200, 80), (None, 240, 40)])
+def test_edge_beam_matches_full_set(initcrop, centx, centy):
+    """ A beam within the margins of the edge of the initial crop is cropped (cut off at the edge) the same way by the sweep as by dataset.full_set_proj() and
+    full_set_line(), so the FWHM values come out the same.
+    """
+    frames = [synth_utils.beam_frame(centx=centx, centy=centy, seed=seed) for seed in range(2)]
+    proj = sweep.sweep_proj(frames, 150, 150, initcrop=initcrop)
+    line = sweep.sweep_line(frames, 150, 150, toavg=[0, 2], initcrop=initcrop)
+    xlist, ylist, _ = dataset.full_set_proj(frames, 150, 150, initcrop=initcrop)
+    np.testing.assert_allclose(proj['xFWHM'], xlist)
+    np.testing.assert_allclose(proj['yFWHM'], ylist)
+    xlist, ylist, _ = dataset.full_set_line(frames, 150, 150, initcrop=initcrop)
+    np.testing.assert_allclose(line['xFWHM'][line['toavg'] == 0], xlist)
+    np.testing.assert_allclose(line['yFWHM'][line['toavg'] == 0], ylist)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Created on Sat Oct  17 14:00:00 2026
+
+@author: leahghartman
+
+Description : Tests of the live watch mode: new files analyzed like single_image_proj() does, the CSV it appends to, stopping at exactly maxframes frames,
+falling back to polling without inotify and forgetting files that are gone.
+"""
+# import random needed packages that should already be installed
+import csv
+import numpy as np
+
+# import from other modules in the package
+from gaussbean.analysis import single, watch
+from gaussbean.utils import synth_utils
+
+#########################
+### START OF FUNCTIONS
+#########################
+
+def _frames(nframes, seed=0):
+    """ Returns a few small synthetic frames. This function shouldn't be called by the user at any point.
+    """
+    return(synth_utils.beam_stack(nframes, 400, 500, seed=seed)[0])
+
+########################################################
+
+def test_watch_polling_writes_csv(tmp_path):
+    """ Polling, new files are analyzed exactly like single_image_proj() does and appended to the CSV, whose header is only written once.
+    """
+    (tmp_path / 'run').mkdir()
+    outpath = tmp_path / 'out.csv'
+    with watch.LiveWatch(str(tmp_path / 'run'), 60, 60, initcrop='auto', output=str(outpath), useinotify=False, interval=0.01) as live:
+        assert not live.inotify
+        paths = synth_utils.save_frames(_frames(3), tmp_path / 'run')
+        assert live.run(duration=5, maxframes=3) == 3
+
+    with watch.LiveWatch(str(tmp_path / 'run'), 60, 60, initcrop='auto', output=str(outpath), useinotify=False, interval=0.01) as live:
+        paths += synth_utils.save_frames(_frames(2, seed=1), tmp_path / 'run', prefix='b')
+        assert live.run(duration=5, maxframes=2) == 2
+
+    with open(outpath) as f:
+        rows = list(csv.DictReader(f))
+    assert [row['filename'] for row in rows] == [path.split('/')[-1] for path in paths]
+    for row, path in zip(rows, paths):
+        xFWHM, yFWHM = single.single_image_proj(60, 60, imgpath=path, initcrop='auto')[:2]
+        assert np.isclose(float(row['xFWHM']), xFWHM) and np.isclose(float(row['yFWHM']), yFWHM)
+
+########################################################
+
+def test_watch_stops_at_maxframes(tmp_path):
+    """ With more frames complete than asked for in one go, run() handles exactly maxframes of them and leaves the others for the next call.
+    """
+    frames = _frames(5)
+    with watch.LiveWatch(str(tmp_path), 60, 60, initcrop='auto') as live:
+        synth_utils.save_frames(frames, tmp_path)
+        assert live.run(duration=5, maxframes=2) == 2
+        assert len(live.results) == 2
+        assert live.run(duration=5, maxframes=3) == 3
+        assert [result[0] for result in live.results] == [str(i) + '.tiff' for i in range(1, 6)]
+
+########################################################
+
+def test_watch_falls_back_to_polling(tmp_path, monkeypatch):
+    """ Without inotify, the directory is polled and new files are still found.
+    """
+    monkeypatch.setattr(watch, '_inotify', lambda directory: None)
+    with watch.LiveWatch(str(tmp_path), 60, 60, initcrop='auto', interval=0.01) as live:
+        assert not live.inotify
+        synth_utils.save_frames(_frames(2), tmp_path)
+        assert live.run(duration=5, maxframes=2) == 2
+        assert all(np.isfinite(result[1]) for result in live.results)
+
+########################################################
+
+def test_watch_forgets_removed_files(tmp_path):
+    """ Polling, the names of files that have left the directory are forgotten, and the files still there are not analyzed twice.
+    """
+    paths = synth_utils.save_frames(_frames(3), tmp_path)
+    with watch.LiveWatch(str(tmp_path), 60, 60, initcrop='auto', useinotify=False, interval=0.01, existing=True) as live:
+        assert live.run(duration=5, maxframes=3) == 3
+        for path in paths[:2]:
+            (tmp_path / path.split('/')[-1]).unlink()
+        assert live.poll() == []
+        assert list(live._done) == ['3.tiff']